@@ -0,0 +1,293 @@
+"""
+Sudoku Benchmarks
+Times every solver backend on the bundled puzzle corpora, solution counting
+on them, the generator on every difficulty, then generation and solving on
+bigger boards (16x16, 25x25), saves the results as JSON and compares them
+with a baseline (baseline.json, committed next to this file).
+
+Usage (from the repository root):
+    python benchmarks/bench.py                  # run, print and save results.json
+    python benchmarks/bench.py --save-baseline  # also store the run as the baseline
+    python benchmarks/bench.py --compare        # exit 1 if a hot path regressed
+    python benchmarks/bench.py --sizes 4        # only 16x16 as the bigger board
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+
+from generator import PuzzleGenerator, DIFFICULTY_REMOVALS  # noqa: E402
+from solver import SudokuSolver, BACKENDS, parse_puzzle  # noqa: E402
+from stats import SearchStats  # noqa: E402
+
+CORPORA_DIR = os.path.join(HERE, "corpora")
+CORPORA = ("easy", "hard", "adversarial")
+DEFAULT_RESULTS = os.path.join(HERE, "results.json")
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+
+# Corpora a backend is run on; the original backtracking takes minutes on hard inputs
+BACKEND_CORPORA = {"backtracking": ("easy",)}
+
+# Bigger boards: box sizes, the difficulty generated and the backends timed on them
+# (logic and bitmask search with dlx on these sizes, backtracking is hopeless)
+LARGE_BOXES = (4, 5)
+LARGE_DIFFICULTY = "hard"
+LARGE_BACKENDS = ("bitmask", "dlx")
+
+# Backends timed on count_solutions (it only counts on the bitmask engine or
+# the exact-cover matrix) and the limit: 2 is the uniqueness check
+COUNT_BACKENDS = ("bitmask", "dlx")
+COUNT_LIMIT = 2
+
+# Metrics checked against the baseline: lower is better for all of them but
+# the ones in HIGHER_IS_BETTER
+REGRESSION_KEYS = ("p50_ms", "p95_ms", "p99_ms", "per_sec", "peak_kb")
+HIGHER_IS_BETTER = ("per_sec",)
+
+# Smaller differences than these are never regressions: the tail of a path
+# that takes a tenth of a millisecond moves by more than the threshold from
+# scheduler jitter alone. Throughput is compared as ms per item
+NOISE_MS = 0.5
+NOISE_KB = 4.0
+
+
+def load_corpus(name):
+    """Return the puzzle strings of a bundled corpus."""
+    with open(os.path.join(CORPORA_DIR, name + ".txt")) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[k]
+
+
+def latency_summary(times):
+    """p50/p95/p99 and throughput for a list of per-item times (seconds)."""
+    ms = sorted(t * 1000 for t in times)
+    total = sum(times)
+    return {
+        "count": len(times),
+        "p50_ms": round(percentile(ms, 50), 4),
+        "p95_ms": round(percentile(ms, 95), 4),
+        "p99_ms": round(percentile(ms, 99), 4),
+        "per_sec": round(len(times) / total, 2) if total else 0.0,
+    }
+
+
+def bench_solver(puzzles, backend, repeat=1, count=False):
+    """
+    Latency, throughput, search nodes and peak memory of one backend on a
+    corpus, solving every puzzle or with count, counting its solutions up to
+    COUNT_LIMIT.
+    """
+    boards = [parse_puzzle(p) for p in puzzles]
+
+    def work(solver):
+        return solver.count_solutions(COUNT_LIMIT) if count else solver.solve()
+
+    times = []
+    for _ in range(repeat):
+        for board in boards:
+            solver = SudokuSolver(board, backend)
+            start = time.perf_counter()
+            work(solver)
+            times.append(time.perf_counter() - start)
+
+    # Search counters are collected in a separate pass so they don't skew the timings
+    nodes = []
+    for board in boards:
+        stats = SearchStats()
+        work(SudokuSolver(board, backend, stats))
+        nodes.append(stats.nodes)
+
+    # Peak memory gets its own pass, tracemalloc slows everything down
+    tracemalloc.start()
+    for board in boards:
+        work(SudokuSolver(board, backend))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = latency_summary(times)
+    result["mean_nodes"] = round(sum(nodes) / len(nodes), 1)
+    result["max_nodes"] = max(nodes)
+    result["peak_kb"] = round(peak / 1024, 1)
+    return result
+
+
+def bench_generator(difficulty, count, seed=0):
+    """Latency and throughput of generating count puzzles of one difficulty."""
+    generator = PuzzleGenerator(seed)
+    times = []
+    for _ in range(count):
+        start = time.perf_counter()
+        generator.generate(difficulty, max_attempts=None)
+        times.append(time.perf_counter() - start)
+    return latency_summary(times)
+
+
+def bench_large(box, count, seed=0):
+    """
+    Generate count puzzles on a board with box x box boxes (seeded, so every run
+    gets the same ones) and time the generator and LARGE_BACKENDS on them.
+    """
+    generator = PuzzleGenerator(seed, box=box)
+    times, puzzles = [], []
+    for _ in range(count):
+        start = time.perf_counter()
+        puzzle, _ = generator.generate(LARGE_DIFFICULTY, max_attempts=None)
+        times.append(time.perf_counter() - start)
+        puzzles.append(puzzle)
+
+    result = {"generate": latency_summary(times), "solve": {}}
+    for backend in LARGE_BACKENDS:
+        times = []
+        for puzzle in puzzles:
+            solver = SudokuSolver(puzzle, backend)
+            start = time.perf_counter()
+            solver.solve()
+            times.append(time.perf_counter() - start)
+        result["solve"][backend] = latency_summary(times)
+    return result
+
+
+def run(backends=BACKENDS, corpora=CORPORA, repeat=1, generate_count=20, sizes=LARGE_BOXES, large_count=3):
+    """Run the whole suite and return the results as a JSON-ready dict."""
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "solve": {},
+        "count": {},
+        "generate": {},
+        "large": {},
+    }
+
+    for corpus in corpora:
+        puzzles = load_corpus(corpus)
+        results["solve"][corpus] = {}
+        for backend in backends:
+            if corpus not in BACKEND_CORPORA.get(backend, corpora):
+                continue
+            results["solve"][corpus][backend] = bench_solver(puzzles, backend, repeat)
+        results["count"][corpus] = {}
+        for backend in COUNT_BACKENDS:
+            if backend in backends:
+                results["count"][corpus][backend] = bench_solver(puzzles, backend, repeat, count=True)
+
+    for difficulty in DIFFICULTY_REMOVALS:
+        results["generate"][difficulty] = bench_generator(difficulty, generate_count)
+
+    for box in sizes:
+        n = box * box
+        results["large"][f"{n}x{n}"] = bench_large(box, large_count)
+
+    return results
+
+
+def _flatten(results):
+    """Yield (name, metrics) for every measured hot path."""
+    for corpus, by_backend in results.get("solve", {}).items():
+        for backend, metrics in by_backend.items():
+            yield f"solve/{corpus}/{backend}", metrics
+    for corpus, by_backend in results.get("count", {}).items():
+        for backend, metrics in by_backend.items():
+            yield f"count/{corpus}/{backend}", metrics
+    for difficulty, metrics in results.get("generate", {}).items():
+        yield f"generate/{difficulty}", metrics
+    for size, large in results.get("large", {}).items():
+        yield f"large/{size}/generate", large["generate"]
+        for backend, metrics in large["solve"].items():
+            yield f"large/{size}/solve/{backend}", metrics
+
+
+def compare(results, baseline, threshold):
+    """Return a message for every metric more than threshold (0.25 = 25%) and the noise worse than the baseline."""
+    old = dict(_flatten(baseline))
+    regressions = []
+    for name, metrics in _flatten(results):
+        if name not in old:
+            continue
+        for key in REGRESSION_KEYS:
+            before, after = old[name].get(key), metrics.get(key)
+            if not before or after is None:
+                continue
+            if _worse(key, before, after, threshold):
+                regressions.append(f"{name} {key}: {before} -> {after} ({(after / before - 1) * 100:+.0f}%)")
+    return regressions
+
+
+def _worse(key, before, after, threshold):
+    """True if after is more than threshold worse than before, and by more than the noise."""
+    if key in HIGHER_IS_BETTER:
+        if not after:
+            return False
+        before, after = 1000 / before, 1000 / after
+    noise = NOISE_KB if key.endswith("_kb") else NOISE_MS
+    return after > before * (1 + threshold) and after - before > noise
+
+
+def print_results(results):
+    """Print a table of the results."""
+    print(f"{'path':32} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'per sec':>10} {'nodes':>9} {'peak KB':>9}")
+    for name, m in _flatten(results):
+        print(f"{name:32} {m['p50_ms']:>9} {m['p95_ms']:>9} {m['p99_ms']:>9} {m['per_sec']:>10} "
+              f"{m.get('mean_nodes', '-'):>9} {m.get('peak_kb', '-'):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Sudoku solver and generator.")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--corpora", nargs="+", default=list(CORPORA), choices=CORPORA)
+    parser.add_argument("--repeat", type=int, default=1, help="timed passes over each corpus")
+    parser.add_argument("--generate-count", type=int, default=20, help="puzzles generated per difficulty")
+    parser.add_argument("--sizes", nargs="*", type=int, default=list(LARGE_BOXES), choices=LARGE_BOXES,
+                        help="box sizes of the bigger boards (4: 16x16, 5: 25x25), none to skip them")
+    parser.add_argument("--large-count", type=int, default=3, help="puzzles generated per bigger board size")
+    parser.add_argument("--output", default=DEFAULT_RESULTS, help="where to write the JSON results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--compare", action="store_true", help="fail if slower than the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before failing (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = run(args.backends, args.corpora, args.repeat, args.generate_count, args.sizes, args.large_count)
+    print_results(results)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"\nNo baseline at {args.baseline}, run with --save-baseline first")
+            return 1
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\n✗ Regressions against baseline:")
+            for message in regressions:
+                print("  " + message)
+            return 1
+        print("\n✓ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
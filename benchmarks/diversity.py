@@ -0,0 +1,98 @@
+"""
+Sudoku Generator Diversity Check
+Full grids come from random symmetry transforms of a fixed set of base grids
+(see generator.py). This checks that what comes out still looks random
+enough to play: no repeated grids or puzzles, every digit about as likely in
+every cell, two grids agreeing on about 1 cell in 9, and the same seed giving
+the same puzzles. Exits 1 if a check fails.
+
+Usage (from the repository root):
+    python benchmarks/diversity.py
+    python benchmarks/diversity.py --grids 20000 --puzzles 100
+"""
+
+import argparse
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+
+from generator import PuzzleGenerator  # noqa: E402
+
+# Largest z-score of a chi-square statistic still taken as uniform: for all
+# cells pooled, and for the worst of the 81 cells on their own
+MAX_Z = 5.0
+MAX_CELL_Z = 6.0
+
+# Allowed distance of the mean cell agreement of two grids from 1/9
+AGREEMENT_TOLERANCE = 0.01
+
+
+def chi_square_z(counts, expected):
+    """z-score of the chi-square statistic of counts against a flat expected count."""
+    chi2 = sum((c - expected) ** 2 / expected for c in counts)
+    df = len(counts) - 1
+    return (chi2 - df) / (2 * df) ** 0.5
+
+
+def check_grids(count, seed):
+    """Return (name, passed, detail) for each check on count full grids."""
+    generator = PuzzleGenerator(seed)
+    grids = [bytes(generator.full_grid().cells) for _ in range(count)]
+    results = []
+
+    distinct = len(set(grids))
+    results.append(("distinct grids", distinct == count, f"{distinct}/{count}"))
+
+    # Digit frequencies of every cell against a flat 1/9, cell by cell and pooled
+    counts = [[0] * 10 for _ in range(81)]
+    for grid in grids:
+        for i, num in enumerate(grid):
+            counts[i][num] += 1
+    worst = max(abs(chi_square_z(cell[1:], count / 9)) for cell in counts)
+    results.append(("digits per cell", worst < MAX_CELL_Z, f"worst |z| {worst:.2f}"))
+
+    z = chi_square_z([n for cell in counts for n in cell[1:]], count / 9)
+    results.append(("digits overall", abs(z) < MAX_Z, f"z {z:.2f}"))
+
+    # Cells two random grids agree on; 1/9 for independent uniform grids
+    rng = random.Random(seed)
+    pairs = min(count * 4, 20000)
+    same = sum(sum(a == b for a, b in zip(*rng.sample(grids, 2))) for _ in range(pairs))
+    agreement = same / (pairs * 81)
+    results.append(("grid agreement", abs(agreement - 1 / 9) < AGREEMENT_TOLERANCE,
+                    f"{agreement:.4f} (1/9 = {1 / 9:.4f})"))
+    return results
+
+
+def check_puzzles(count, seed):
+    """Return (name, passed, detail) for the puzzle checks."""
+    def medium(k):
+        return PuzzleGenerator(seed + k).generate("medium", max_attempts=None)[0].to_string()
+
+    puzzles = [medium(k) for k in range(count)]
+    again = [medium(k) for k in range(count)]
+    distinct = len(set(puzzles))
+    return [
+        ("distinct puzzles", distinct == count, f"{distinct}/{count}"),
+        ("same seed, same puzzle", puzzles == again, f"{sum(a == b for a, b in zip(puzzles, again))}/{count}"),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that generated grids and puzzles stay diverse.")
+    parser.add_argument("--grids", type=int, default=5000, help="full grids drawn")
+    parser.add_argument("--puzzles", type=int, default=10, help="medium puzzles generated (twice each)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = check_grids(args.grids, args.seed) + check_puzzles(args.puzzles, args.seed)
+    for name, passed, detail in results:
+        print(f"{'✓' if passed else '✗'} {name:24} {detail}")
+    return 0 if all(passed for _, passed, _ in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Sudoku Service Load Test
+Starts the solving service (src/server.py) on localhost, or uses one already
+running, and drives it with many concurrent pipelined connections. Reports
+throughput, latency percentiles and how many requests were rejected as busy,
+and checks every solution returned against the corpus.
+
+Usage (from the repository root):
+    python benchmarks/load_test.py                          # spawn a server and test it
+    python benchmarks/load_test.py --connections 200 --pipeline 32
+    python benchmarks/load_test.py --port 8765 --no-spawn   # test a running server
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from collections import deque
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, "..", "src")
+
+from bench import CORPORA, load_corpus, latency_summary  # noqa: E402
+
+
+def is_solution(puzzle, answer):
+    """Return True if answer is a valid grid that keeps every given of puzzle."""
+    if len(answer) != 81 or any(p not in ".0" and p != a for p, a in zip(puzzle, answer)):
+        return False
+    units = ([answer[r * 9:r * 9 + 9] for r in range(9)]
+             + [answer[c::9] for c in range(9)]
+             + [answer[r + c:r + c + 3] + answer[r + c + 9:r + c + 12] + answer[r + c + 18:r + c + 21]
+                for r in (0, 27, 54) for c in (0, 3, 6)])
+    return all(sorted(unit) == list("123456789") for unit in units)
+
+
+async def run_connection(host, port, puzzles, pipeline, results):
+    """Send puzzles over one connection, keeping up to pipeline requests in flight."""
+    reader, writer = await asyncio.open_connection(host, port)
+    window = asyncio.Semaphore(pipeline)
+    sent = deque()  # (puzzle, send time) in the order answers will come back
+
+    async def send():
+        for puzzle in puzzles:
+            await window.acquire()
+            sent.append((puzzle, time.perf_counter()))
+            writer.write(puzzle.encode("ascii") + b"\n")
+            await writer.drain()
+
+    sender = asyncio.create_task(send())
+    for _ in range(len(puzzles)):
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        puzzle, started = sent.popleft()
+        window.release()
+
+        answer = line.decode("ascii").strip()
+        if answer == "ERR busy":
+            results["busy"] += 1
+        elif answer.startswith("ERR"):
+            results["errors"] += 1
+        elif is_solution(puzzle, answer):
+            results["times"].append(time.perf_counter() - started)
+        else:
+            results["wrong"] += 1
+
+    await sender
+    writer.close()
+    await writer.wait_closed()
+
+
+async def load_test(host, port, puzzles, connections, pipeline):
+    """Spread puzzles over connections running at the same time and collect the results."""
+    results = {"times": [], "busy": 0, "errors": 0, "wrong": 0}
+    shares = [puzzles[k::connections] for k in range(connections)]
+    start = time.perf_counter()
+    await asyncio.gather(*(run_connection(host, port, share, pipeline, results) for share in shares if share))
+    results["elapsed"] = time.perf_counter() - start
+    return results
+
+
+def spawn_server(port, args):
+    """Start src/server.py in a child process and wait until it is listening."""
+    command = [sys.executable, "server.py", "--port", str(port), "--max-queue", str(args.max_queue)]
+    if args.workers:
+        command += ["--workers", str(args.workers)]
+    server = subprocess.Popen(command, cwd=SRC, stdout=subprocess.PIPE, text=True)
+    server.stdout.readline()  # "Solving on ..." once the socket is open
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the local Sudoku solving service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--no-spawn", action="store_true", help="use a server that is already running")
+    parser.add_argument("--corpus", default="easy", choices=CORPORA)
+    parser.add_argument("--requests", type=int, default=20000, help="puzzles sent in total")
+    parser.add_argument("--connections", type=int, default=50)
+    parser.add_argument("--pipeline", type=int, default=16, help="requests in flight per connection")
+    parser.add_argument("--workers", type=int, default=None, help="solver processes of the spawned server")
+    parser.add_argument("--max-queue", type=int, default=4096, help="queue bound of the spawned server")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    puzzles = [corpus[k % len(corpus)] for k in range(args.requests)]
+
+    server = None if args.no_spawn else spawn_server(args.port, args)
+    try:
+        results = asyncio.run(load_test(args.host, args.port, puzzles, args.connections, args.pipeline))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    times = results["times"]
+    summary = latency_summary(times) if times else {}
+    print(f"{args.requests} requests over {args.connections} connections "
+          f"(pipeline {args.pipeline}) in {results['elapsed']:.2f}s")
+    print(f"  solved     {len(times)} ({len(times) / results['elapsed']:.0f}/s)")
+    print(f"  busy       {results['busy']}")
+    print(f"  errors     {results['errors']}")
+    print(f"  wrong      {results['wrong']}")
+    if summary:
+        print(f"  latency ms p50 {summary['p50_ms']}  p95 {summary['p95_ms']}  p99 {summary['p99_ms']}")
+    return 1 if results["wrong"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Sudoku Background Jobs
+Runs one heavy call (generating a puzzle, solving one) in its own process so
+the pygame loop keeps drawing while it works. The loop polls for the result
+without blocking, and a job that is no longer wanted is cancelled by
+stopping its process.
+"""
+
+import multiprocessing
+
+from generator import PuzzleGenerator
+from solver import SudokuSolver
+
+
+def _run(conn, target, args):
+    """Process side: call target(*args) and send back ("ok", result) or ("error", exception)."""
+    try:
+        conn.send(("ok", target(*args)))
+    except Exception as error:
+        conn.send(("error", error))
+    finally:
+        conn.close()
+
+
+def generate_job(difficulty, box=3):
+    """Return (puzzle, solution) Boards of a fresh puzzle of the given difficulty and box size."""
+    return PuzzleGenerator(box=box).generate(difficulty, max_attempts=None)
+
+
+def solve_job(puzzle):
+    """Return the solution of puzzle (a Board) as a Board, or None if it has none."""
+    solver = SudokuSolver(puzzle)
+    return solver.board if solver.solve() else None
+
+
+class BackgroundJob:
+
+    def __init__(self, target, *args):
+        """Start target(*args) in a new process; target and args must be picklable."""
+        self.conn, child_conn = multiprocessing.Pipe(duplex=False)
+        self.process = multiprocessing.Process(target=_run, args=(child_conn, target, args), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.outcome = None
+
+    def done(self):
+        """Return True once the result is in (never blocks)."""
+        if self.outcome is None and self.conn.poll():
+            try:
+                self.outcome = self.conn.recv()
+            except EOFError:
+                self.outcome = ("error", RuntimeError("background job died without a result"))
+            self.process.join()
+        return self.outcome is not None
+
+    def result(self):
+        """Return what the call returned, or raise what it raised. Only valid once done()."""
+        status, value = self.outcome
+        if status == "error":
+            raise value
+        return value
+
+    def cancel(self):
+        """Stop the job if it is still running; its result is thrown away."""
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.conn.close()
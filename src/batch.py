@@ -0,0 +1,185 @@
+"""
+Sudoku Solver - Batched NumPy Propagation
+Loads N puzzles into one (N, 9, 9) int8 array and applies naked and hidden
+singles to the whole batch at once. Only the puzzles that propagation cannot
+finish are handed to the per-puzzle search in SudokuSolver.
+
+Candidates are kept as an (N, 9, 9) int16 tensor of digit bitmasks (digit d is
+bit 1 << d, like in the bitmask engine), so every step is a handful of
+vectorized bit operations over the whole batch.
+"""
+
+import numpy as np
+
+from board import Board
+from budget import EXHAUSTED
+from solver import SudokuSolver
+
+ALL_DIGITS = np.int16(0x3FE)
+
+# Digit for every single-bit mask
+BIT_TO_DIGIT = np.zeros(1 << 10, dtype=np.int8)
+for _d in range(1, 10):
+    BIT_TO_DIGIT[1 << _d] = _d
+
+
+def load_puzzles(puzzles):
+    """
+    Build an (N, 9, 9) int8 array from 81-char strings ('0' or '.' for empty),
+    Boards or 9x9 lists of lists. An existing array is returned as an int8 copy.
+    A string that isn't 81 characters of 0-9 and '.' raises ValueError naming
+    its line.
+    """
+    if isinstance(puzzles, np.ndarray):
+        return puzzles.reshape(-1, 9, 9).astype(np.int8)
+
+    puzzles = list(puzzles)
+    if puzzles and isinstance(puzzles[0], str):
+        texts = [p.strip() for p in puzzles]
+        for k, text in enumerate(texts):
+            if len(text) != 81:
+                _bad_line(k, text)
+        raw = np.frombuffer("".join(texts).encode("ascii", "replace"), dtype=np.uint8)
+        bad = ((raw < ord("0")) | (raw > ord("9"))) & (raw != ord("."))
+        if bad.any():
+            k = int(bad.argmax()) // 81
+            _bad_line(k, texts[k])
+        grids = raw.astype(np.int8) - ord("0")
+        grids[raw == ord(".")] = 0
+        return grids.reshape(-1, 9, 9)
+
+    if puzzles and isinstance(puzzles[0], Board):
+        raw = b"".join(board.snapshot() for board in puzzles)
+        return np.frombuffer(raw, dtype=np.int8).reshape(-1, 9, 9).copy()
+
+    return np.array(puzzles, dtype=np.int8).reshape(-1, 9, 9)
+
+
+def _bad_line(k, text):
+    raise ValueError(f"Line {k + 1}: expected 81 characters from 0-9 or '.', got {text!r}")
+
+
+def _units(x):
+    """
+    View an (N, 9, 9) tensor as its rows, columns and boxes, each shaped
+    (N, 9 units, 9 cells).
+    """
+    boxes = x.reshape(-1, 3, 3, 3, 3).transpose(0, 1, 3, 2, 4).reshape(-1, 9, 9)
+    return x, x.transpose(0, 2, 1), boxes
+
+
+def _unboxed(x):
+    """Inverse of the box view: (N, 9 boxes, 9 cells) -> (N, 9, 9) grid."""
+    return x.reshape(-1, 3, 3, 3, 3).transpose(0, 1, 3, 2, 4).reshape(-1, 9, 9)
+
+
+def _once_twice(unit):
+    """For (N, 9, 9) unit masks, return the bits seen at least once and at least twice per unit."""
+    once = np.zeros(unit.shape[:2], dtype=np.int16)
+    twice = np.zeros_like(once)
+    for k in range(9):
+        x = unit[:, :, k]
+        twice |= once & x
+        once |= x
+    return once, twice
+
+
+def digit_bits(grids):
+    """(N, 9, 9) digits -> (N, 9, 9) single-bit masks, 0 for empty cells."""
+    return np.left_shift(np.int16(1), grids.astype(np.int16)) & ALL_DIGITS
+
+
+def candidate_masks(grids):
+    """
+    Return the (N, 9, 9) int16 candidate tensor: the bitmask of digits that
+    can still go in each empty cell (0 for filled cells).
+    """
+    rows, cols, boxes = _units(digit_bits(grids))
+    used = (np.bitwise_or.reduce(rows, axis=2)[:, :, None]
+            | np.bitwise_or.reduce(cols, axis=2)[:, None, :]
+            | _unboxed(np.repeat(np.bitwise_or.reduce(boxes, axis=2)[:, :, None], 9, axis=2)))
+    return np.where(grids == 0, ~used & ALL_DIGITS, 0).astype(np.int16)
+
+
+def propagate(grids):
+    """
+    Apply naked and hidden singles to every puzzle until nothing changes.
+    grids is filled in place. Return a bool array flagging puzzles found to be
+    contradictory (and therefore unsolvable).
+    """
+    broken = np.zeros(len(grids), dtype=bool)
+    active = np.arange(len(grids))
+
+    while len(active):
+        sub = grids[active]
+        cand = candidate_masks(sub)
+        bits = digit_bits(sub)
+
+        errors = ((sub == 0) & (cand == 0)).any(axis=(1, 2))
+        assign = np.where(cand & (cand - 1), 0, cand)  # naked singles
+
+        for placed, unit_cand, back in zip(_units(bits), _units(cand), (None, "T", "box")):
+            # A digit placed twice, or neither placed nor possible, breaks the unit
+            once, twice = _once_twice(placed)
+            possible = np.bitwise_or.reduce(unit_cand, axis=2)
+            errors |= (twice != 0).any(axis=1) | ((once | possible) != ALL_DIGITS).any(axis=1)
+
+            # Hidden singles: digits with exactly one place left in the unit
+            c_once, c_twice = _once_twice(unit_cand)
+            hidden = unit_cand & (c_once & ~c_twice)[:, :, None]
+            if back == "T":
+                hidden = hidden.transpose(0, 2, 1)
+            elif back == "box":
+                hidden = _unboxed(hidden)
+            assign |= hidden
+
+        # Two different singles for the same cell means there is no solution
+        errors |= ((assign & (assign - 1)) != 0).any(axis=(1, 2))
+        broken[active[errors]] = True
+
+        assign[errors] = 0
+        progress = assign.any(axis=(1, 2))
+        if not progress.any():
+            break
+
+        fill = assign != 0
+        sub[fill] = BIT_TO_DIGIT[assign[fill]]
+        grids[active] = sub
+
+        # Keep going on puzzles that moved; one that just got filled takes
+        # one more pass so its last placements are checked too
+        active = active[progress]
+
+    return broken
+
+
+def solve_batch(puzzles, backend="logic", block_size=4096, max_nodes=None, deadline=None):
+    """
+    Solve a batch of puzzles. Return (solutions, solved, exhausted): an
+    (N, 9, 9) int8 array and two (N,) bool arrays. Puzzles that propagation
+    leaves open are finished by SudokuSolver with the given backend, each
+    within max_nodes nodes and deadline seconds (see SudokuSolver.solve);
+    unsolvable ones have solved False, the ones that ran out of budget also
+    have exhausted True. The batch is processed block_size puzzles at a time
+    to bound memory.
+    """
+    grids = load_puzzles(puzzles)
+    solved = np.zeros(len(grids), dtype=bool)
+    exhausted = np.zeros(len(grids), dtype=bool)
+
+    for start in range(0, len(grids), block_size):
+        block = grids[start:start + block_size]
+        broken = propagate(block)
+        done = ~broken & ~(block == 0).any(axis=(1, 2))
+        solved[start:start + len(block)] = done
+
+        for k in np.flatnonzero(~broken & ~done):
+            solver = SudokuSolver(block[k].tolist(), backend)
+            result = solver.solve(max_nodes, deadline)
+            if result.solved:
+                block[k] = solver.board.to_grid()
+                solved[start + k] = True
+            elif result.status == EXHAUSTED:
+                exhausted[start + k] = True
+
+    return grids, solved, exhausted
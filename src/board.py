@@ -0,0 +1,167 @@
+"""
+Sudoku Board
+A compact board stored as one byte per cell (0 for empty), with cheap
+snapshot/restore through a plain buffer copy. 9x9 by default; 16x16 and
+25x25 boards hold N * N cells and write digits above 9 as letters.
+"""
+
+from math import isqrt
+
+from geometry import DIGIT_CHARS, box_for_cells
+
+# '0'..'9' map to 0..9, 'A'..'P' (either case) to 10..25 and '.' to 0;
+# anything else is flagged with 255
+_FROM_TEXT = bytearray([255] * 256)
+for _d in range(10):
+    _FROM_TEXT[ord("0") + _d] = _d
+for _d in range(10, 26):
+    _FROM_TEXT[ord(DIGIT_CHARS[_d - 1])] = _d
+    _FROM_TEXT[ord(DIGIT_CHARS[_d - 1].lower())] = _d
+_FROM_TEXT[ord(".")] = 0
+_FROM_TEXT = bytes(_FROM_TEXT)
+
+_TO_TEXT = bytes.maketrans(bytes(range(26)), ("0" + DIGIT_CHARS).encode("ascii"))
+
+
+class Board:
+
+    __slots__ = ("cells",)
+
+    def __init__(self, cells=None, size=9):
+        """
+        Wrap N * N cell values (a bytearray or writable memoryview, used as is;
+        81 for the usual 9x9). Without cells the board starts empty with size
+        rows. Cell i is (row i // N, col i % N).
+        """
+        if cells is None:
+            cells = bytearray(size * size)
+        if len(cells) != 81:
+            box_for_cells(len(cells))  # raises ValueError for a size that isn't a board
+        self.cells = cells
+
+    @property
+    def size(self):
+        """N: the number of rows, columns, boxes and digits."""
+        return 9 if len(self.cells) == 81 else isqrt(len(self.cells))
+
+    @property
+    def box_size(self):
+        """b: boxes are b x b cells."""
+        return isqrt(self.size)
+
+    @classmethod
+    def from_string(cls, text):
+        """
+        Build a board from a puzzle string of N * N chars (81 for 9x9), '0' or
+        '.' for empty cells and 'A'.. for digits above 9.
+        """
+        if isinstance(text, str):
+            text = text.strip().encode("ascii")
+        cells = bytearray(text.translate(_FROM_TEXT))
+        if 255 in cells:
+            raise ValueError("Puzzle strings may only contain digits, letters A-P and '.'")
+        board = cls(cells)
+        if cells and max(cells) > board.size:
+            raise ValueError(f"Digit out of range for a {board.size}x{board.size} board")
+        return board
+
+    @classmethod
+    def from_buffer(cls, buffer, offset=0, size=9):
+        """
+        Build a board sharing memory with buffer: the N * N bytes at offset hold
+        the cell values directly. Nothing is copied, so writes go to buffer.
+        """
+        return cls(memoryview(buffer)[offset:offset + size * size])
+
+    @classmethod
+    def from_grid(cls, grid):
+        """Build a board from an N x N list of lists."""
+        return cls(bytearray(num for row in grid for num in row))
+
+    def _index(self, pos):
+        """Cell index of (row, col); IndexError when either is off the board."""
+        row, col = pos
+        if not (0 <= row < self.size and 0 <= col < self.size):
+            raise IndexError(f"({row}, {col}) is off a {self.size}x{self.size} board")
+        return row * self.size + col
+
+    def __getitem__(self, pos):
+        """board[row, col] -> digit (0 for empty)."""
+        return self.cells[self._index(pos)]
+
+    def __setitem__(self, pos, num):
+        """board[row, col] = digit."""
+        self.cells[self._index(pos)] = num
+
+    def __eq__(self, other):
+        if not isinstance(other, Board):
+            return NotImplemented
+        return bytes(self.cells) == bytes(other.cells)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __repr__(self):
+        return f"Board('{self.to_string()}')"
+
+    def copy(self):
+        """Return an independent copy of the board."""
+        return Board(bytearray(self.cells))
+
+    def snapshot(self):
+        """Return the cell values as an immutable bytes object (one buffer copy)."""
+        return bytes(self.cells)
+
+    def restore(self, snapshot):
+        """Overwrite every cell from a snapshot() or another Board."""
+        if isinstance(snapshot, Board):
+            snapshot = snapshot.cells
+        self.cells[:] = snapshot
+
+    def row(self, r):
+        """Return the digits of row r."""
+        n = self.size
+        return self.cells[r * n:r * n + n]
+
+    def col(self, c):
+        """Return the digits of column c."""
+        return self.cells[c::self.size]
+
+    def box(self, row, col):
+        """Return the digits of the box containing (row, col)."""
+        cells = self.cells
+        if len(cells) == 81:
+            start = 27 * (row // 3) + 3 * (col // 3)
+            return cells[start:start + 3] + cells[start + 9:start + 12] + cells[start + 18:start + 21]
+        n, b = self.size, self.box_size
+        start = n * b * (row // b) + b * (col // b)
+        return b"".join(bytes(cells[start + k * n:start + k * n + b]) for k in range(b))
+
+    def first_empty(self):
+        """Return the index of the first empty cell in row-major order, or -1."""
+        cells = self.cells
+        if isinstance(cells, bytearray):
+            return cells.find(0)
+        return bytes(cells).find(0)
+
+    def count_filled(self):
+        """Return the number of filled cells."""
+        return len(self.cells) - bytes(self.cells).count(0)
+
+    def to_grid(self):
+        """Return the board as an N x N list of lists."""
+        cells, n = self.cells, self.size
+        return [list(cells[r * n:r * n + n]) for r in range(n)]
+
+    def to_string(self):
+        """Return the board as a string of N * N chars, '0' for empty cells."""
+        return bytes(self.cells).translate(_TO_TEXT).decode("ascii")
+
+
+def flat_cells(board):
+    """Return the cells of a Board, an N x N list of lists or a puzzle string as a flat list of ints."""
+    if isinstance(board, Board):
+        return list(board.cells)
+    if isinstance(board, (str, bytes)):
+        return list(Board.from_string(board).cells)
+    return [num for row in board for num in row]
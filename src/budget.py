@@ -0,0 +1,137 @@
+"""
+Sudoku Solver - Search Budgets
+Limits on how long a search may run (nodes, wall-clock time, a cancel token
+another thread can trip) and the structured result of a bounded solve.
+A search given a SearchBudget charges it once per node and stops with
+BudgetExhausted as soon as one of the limits is hit.
+"""
+
+from time import monotonic
+
+# Status of a SolveResult
+SOLVED = "solved"
+UNSOLVABLE = "unsolvable"
+EXHAUSTED = "budget-exhausted"
+
+
+class CancelToken:
+    """Flag a search polls at every node; call cancel() (from any thread) to stop it."""
+
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class EventToken:
+    """
+    Cancel token shared with worker processes through a multiprocessing.Event.
+    Reading the Event takes a lock, so searches only look at it every
+    EVENT_POLL_NODES nodes.
+    """
+
+    EVENT_POLL_NODES = 64
+
+    def __init__(self, event):
+        self.event = event
+        self.checks = 0
+        self.is_set = False
+
+    @property
+    def cancelled(self):
+        if not self.is_set:
+            self.checks += 1
+            if self.checks % self.EVENT_POLL_NODES == 0:
+                self.is_set = self.event.is_set()
+        return self.is_set
+
+    def cancel(self):
+        self.event.set()
+        self.is_set = True
+
+
+class BudgetExhausted(Exception):
+    """Raised out of a search that hit a limit. reason is "max_nodes", "deadline" or "cancelled"."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class SearchBudget:
+
+    def __init__(self, max_nodes=None, deadline=None, token=None, deadline_at=None):
+        """
+        max_nodes:   search nodes allowed (None for no limit)
+        deadline:    seconds the search may run from now (None for no limit)
+        token:       a CancelToken (or EventToken), checked at every node
+        deadline_at: the deadline as a time.monotonic() value instead, so
+                     searches started later in other processes share one clock
+        """
+        self.max_nodes = max_nodes
+        # time.monotonic is system wide, so worker processes can check the same deadline
+        if deadline is not None:
+            deadline_at = monotonic() + deadline
+        self.deadline_at = deadline_at
+        self.token = token
+        self.nodes = 0
+
+    def charge(self):
+        """Count one search node; raise BudgetExhausted if a limit is reached."""
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            raise BudgetExhausted("max_nodes")
+        self.nodes += 1
+        if self.token is not None and self.token.cancelled:
+            raise BudgetExhausted("cancelled")
+        if self.deadline_at is not None and monotonic() > self.deadline_at:
+            raise BudgetExhausted("deadline")
+
+    def remaining_time(self):
+        """Seconds left before the deadline (None without one, never below 0)."""
+        if self.deadline_at is None:
+            return None
+        return max(0.0, self.deadline_at - monotonic())
+
+
+class SolveResult:
+
+    def __init__(self, status, board=None, nodes=0, elapsed=0.0, reason=None, stats=None, strategy=None):
+        """
+        status:   SOLVED, UNSOLVABLE or EXHAUSTED
+        board:    the solution Board when solved, else None
+        nodes:    search nodes visited
+        elapsed:  seconds spent
+        reason:   the BudgetExhausted reason when exhausted
+        stats:    the SearchStats of the solver, if it had one
+        strategy: name of the portfolio strategy that won (solve_portfolio only)
+        """
+        self.status = status
+        self.board = board
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.reason = reason
+        self.stats = stats
+        self.strategy = strategy
+
+    @property
+    def solved(self):
+        return self.status == SOLVED
+
+    def __bool__(self):
+        # `if solver.solve():` keeps working
+        return self.solved
+
+    def as_dict(self):
+        """Return the result as a plain dict (for logging or JSON)."""
+        return {
+            "status": self.status,
+            "solution": self.board.to_string() if self.board is not None else None,
+            "nodes": self.nodes,
+            "elapsed": self.elapsed,
+            "reason": self.reason,
+        }
+
+    def __repr__(self):
+        extra = f", reason={self.reason!r}" if self.reason else ""
+        return f"SolveResult({self.status!r}, nodes={self.nodes}, elapsed={self.elapsed:.4f}{extra})"
@@ -0,0 +1,234 @@
+"""
+Sudoku Bulk Generator
+Generates puzzles on every core for filling puzzle stores and files: each
+worker process runs the full generate-then-dig pipeline on chunks of seeds
+and keeps the puzzles that meet their target (difficulty, optionally a
+clue count range). Kept puzzles are streamed to a sink as
+their chunk comes back, and a report gives puzzles per second per core and
+how much work was thrown away.
+
+Every puzzle is generated by its own PuzzleGenerator(seed), with seeds drawn
+in order from one master random.Random: workers never share or continue an
+RNG stream, the output doesn't depend on how many workers there are, and
+the seed of a kept puzzle rebuilds it on its own (same as puzzle_store.fill).
+"""
+
+import os
+import random
+import time
+from collections import deque
+
+from board import Board
+from generator import PuzzleGenerator, GenerationFailed
+from logic import DIFFICULTIES, grade as logic_grade
+
+# Seeds handed to a worker at a time
+CHUNK_SIZE = 8
+
+# Chunks in flight per worker process
+CHUNKS_PER_WORKER = 2
+
+# A target is given up after this many tries per puzzle asked for
+MAX_TRIES_PER_PUZZLE = 200
+
+
+class Target:
+
+    def __init__(self, difficulty, count, min_clues=None, max_clues=None):
+        """count puzzles of difficulty, with min_clues..max_clues clues (inclusive) when given."""
+        if difficulty not in DIFFICULTIES:
+            raise ValueError(f"Unknown difficulty {difficulty!r}, expected one of {DIFFICULTIES}")
+        self.difficulty = difficulty
+        self.count = count
+        self.min_clues = min_clues
+        self.max_clues = max_clues
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        Parse "difficulty:count" or "difficulty:clues:count", clues being a
+        number or a range like "24-28": "hard:500", "medium:25-30:1000".
+        """
+        parts = spec.split(":")
+        if len(parts) not in (2, 3):
+            raise ValueError(f"Bad target {spec!r}, expected difficulty[:clues]:count")
+        min_clues = max_clues = None
+        if len(parts) == 3:
+            low, _, high = parts[1].partition("-")
+            min_clues, max_clues = int(low), int(high or low)
+        return cls(parts[0], int(parts[-1]), min_clues, max_clues)
+
+    def __str__(self):
+        if self.min_clues is None:
+            return self.difficulty
+        if self.min_clues == self.max_clues:
+            return f"{self.difficulty}:{self.min_clues}"
+        return f"{self.difficulty}:{self.min_clues}-{self.max_clues}"
+
+
+def _generate_chunk(difficulty, min_clues, max_clues, seeds):
+    """
+    Worker side: generate one puzzle of difficulty per seed, dug to a clue
+    count in range when one is given; a seed whose generator gives up is
+    skipped. Return (kept (puzzle, solution, grade, seed) tuples with strings
+    for boards, full grids dug, CPU seconds spent).
+    """
+    start = time.process_time()
+    kept, grids = [], 0
+    for seed in seeds:
+        generator = PuzzleGenerator(seed)
+        try:
+            puzzle, solution = generator.generate(difficulty, min_clues=min_clues, max_clues=max_clues)
+        except GenerationFailed:
+            continue
+        finally:
+            grids += generator.grids
+        grade = logic_grade(puzzle)  # the technique name stored with it, the difficulty is already right
+        kept.append((puzzle.to_string(), solution.to_string(), grade, seed))
+    return kept, grids, time.process_time() - start
+
+
+class LineSink:
+    """Writes one "puzzle" or "puzzle,solution" line per puzzle to a binary file."""
+
+    def __init__(self, out, with_solutions=False):
+        self.out = out
+        self.with_solutions = with_solutions
+
+    def add(self, puzzle, solution, grade, seed):
+        line = puzzle + "," + solution if self.with_solutions else puzzle
+        self.out.write(line.encode("ascii") + b"\n")
+
+    def flush(self):
+        self.out.flush()
+
+
+class StoreSink:
+    """Appends puzzles to a PuzzleStore, with their grade and seed."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def add(self, puzzle, solution, grade, seed):
+        self.store.append(Board.from_string(puzzle), Board.from_string(solution), grade, seed)
+
+    def flush(self):
+        self.store.flush()
+
+
+class BulkReport:
+
+    def __init__(self, targets, workers):
+        self.targets = targets
+        self.workers = workers
+        self.kept = {target: 0 for target in targets}
+        self.tried = {target: 0 for target in targets}  # puzzles generated
+        self.grids = 0          # full grids dug, including the ones generate() retried
+        self.surplus = 0        # kept by a worker after their target was already met
+        self.elapsed = 0.0      # wall clock seconds
+        self.busy = 0.0         # CPU seconds the workers spent generating, summed
+
+    @property
+    def accepted(self):
+        return sum(self.kept.values())
+
+    @property
+    def per_sec(self):
+        return self.accepted / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def per_core(self):
+        """Puzzles per second of one busy core: what each extra core adds."""
+        return self.accepted / self.busy if self.busy else 0.0
+
+    @property
+    def rejection_rate(self):
+        """Share of the full grids dug that didn't end up as a kept puzzle."""
+        return 1 - (self.accepted + self.surplus) / self.grids if self.grids else 0.0
+
+    def short(self):
+        """Targets that were given up before reaching their count."""
+        return [target for target in self.targets if self.kept[target] < target.count]
+
+    def lines(self):
+        """The report as text lines."""
+        lines = [f"{str(t):16} {self.kept[t]:>7}/{t.count:<7} tried {self.tried[t]}" for t in self.targets]
+        lines.append(f"{self.accepted} puzzles in {self.elapsed:.2f}s on {self.workers} workers: "
+                     f"{self.per_sec:.1f}/s, {self.per_core:.1f}/s per core, "
+                     f"rejection rate {self.rejection_rate:.1%} ({self.grids} grids dug)")
+        return lines
+
+
+def generate_bulk(targets, sink, workers=None, seed=None, chunksize=CHUNK_SIZE):
+    """
+    Generate puzzles until every Target has its count (or is given up after
+    MAX_TRIES_PER_PUZZLE tries per puzzle), handing each kept puzzle to
+    sink.add(puzzle, solution, grade, seed) as soon as its chunk is in.
+    workers is the number of processes (None for all cores, 1 to stay in this
+    one). Return a BulkReport.
+
+    Each target draws its seeds from its own stream and its chunks are taken
+    in order, so with a given seed the puzzles kept for a target don't depend
+    on the number of workers (only how targets interleave in the output does).
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    master = random.Random(seed)
+    streams = {target: random.Random(master.getrandbits(64)) for target in targets}
+    report = BulkReport(targets, workers)
+    submitted = {target: 0 for target in targets}
+    turn = [0]
+
+    def next_chunk():
+        """(target, seeds) of the next chunk, round robin over the targets still open, or None."""
+        for _ in range(len(targets)):
+            target = targets[turn[0] % len(targets)]
+            turn[0] += 1
+            # Seeds still out count as if each gave a puzzle, so a target never
+            # has more work out than it is missing puzzles (plus one chunk)
+            if report.kept[target] + submitted[target] - report.tried[target] < target.count \
+                    and submitted[target] < target.count * MAX_TRIES_PER_PUZZLE:
+                submitted[target] += chunksize
+                return target, [streams[target].getrandbits(63) for _ in range(chunksize)]
+        return None
+
+    def take(target, result):
+        kept, grids, busy = result
+        report.tried[target] += chunksize
+        report.grids += grids
+        report.busy += busy
+        for puzzle, solution, grade, puzzle_seed in kept:
+            if report.kept[target] < target.count:
+                sink.add(puzzle, solution, grade, puzzle_seed)
+                report.kept[target] += 1
+            else:
+                report.surplus += 1
+
+    start = time.perf_counter()
+    if workers <= 1:
+        chunk = next_chunk()
+        while chunk is not None:
+            target, seeds = chunk
+            take(target, _generate_chunk(target.difficulty, target.min_clues, target.max_clues, seeds))
+            chunk = next_chunk()
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                # Keep every worker busy, a few chunks ahead of the results
+                while len(pending) < workers * CHUNKS_PER_WORKER:
+                    chunk = next_chunk()
+                    if chunk is None:
+                        break
+                    target, seeds = chunk
+                    pending.append((target, pool.submit(_generate_chunk, target.difficulty,
+                                                        target.min_clues, target.max_clues, seeds)))
+                if not pending:
+                    break
+                target, future = pending.popleft()
+                take(target, future.result())
+    sink.flush()
+    report.elapsed = time.perf_counter() - start
+    return report
@@ -0,0 +1,82 @@
+"""
+Sudoku Conflict Tracker
+Incremental validation state for a board being edited: filled-cell count,
+per-unit digit counts and the set of cells that clash with another cell.
+Every change costs O(1) (one cell and its 20 peers at most on 9x9), so
+completion and error checks are plain reads.
+"""
+
+from geometry import geometry, box_for_cells
+
+# 9x9 tables; units are numbered 0..8 rows, 9..17 columns, 18..26 boxes
+UNITS_OF = geometry(3).UNITS_OF
+CELLS_OF_UNIT = geometry(3).UNITS
+
+
+class ConflictTracker:
+
+    def __init__(self, board):
+        """Build the state from a Board of any size."""
+        geo = geometry(box_for_cells(len(board.cells)))
+        self.units_of, self.cells_of_unit = geo.UNITS_OF, geo.UNITS
+        self.cells = [0] * geo.cells
+        self.counts = [[0] * (geo.size + 1) for _ in range(3 * geo.size)]  # counts[unit][digit]
+        self.filled = 0
+        self.conflicts = set()
+        for i, num in enumerate(board.cells):
+            if num:
+                self.set(i, num)
+
+    def set(self, i, num):
+        """
+        Record that cell i now holds num (0 to clear it). Return the set of cells
+        whose conflict status changed.
+        """
+        old = self.cells[i]
+        if old == num:
+            return set()
+
+        UNITS_OF, CELLS_OF_UNIT = self.units_of, self.cells_of_unit
+        touched = set()
+        if old:
+            self.filled -= 1
+            for u in UNITS_OF[i]:
+                self.counts[u][old] -= 1
+                touched.update(CELLS_OF_UNIT[u])
+        self.cells[i] = num
+        if num:
+            self.filled += 1
+            for u in UNITS_OF[i]:
+                self.counts[u][num] += 1
+                touched.update(CELLS_OF_UNIT[u])
+
+        # Only cells sharing a unit with i can change status
+        changed = set()
+        for j in touched:
+            now = self.in_conflict(j)
+            if now != (j in self.conflicts):
+                changed.add(j)
+                if now:
+                    self.conflicts.add(j)
+                else:
+                    self.conflicts.discard(j)
+        return changed
+
+    def in_conflict(self, i):
+        """Return True if cell i holds a digit repeated in one of its units."""
+        num = self.cells[i]
+        if not num:
+            return False
+        counts = self.counts
+        return any(counts[u][num] > 1 for u in self.units_of[i])
+
+    def sync(self, board):
+        """Bring the state in line with board, touching only the cells that changed."""
+        cells = self.cells
+        for i, num in enumerate(board.cells):
+            if cells[i] != num:
+                self.set(i, num)
+
+    def is_complete(self):
+        """Return True if every cell is filled and nothing clashes."""
+        return self.filled == len(self.cells) and not self.conflicts
@@ -0,0 +1,266 @@
+"""
+Sudoku Solver - Dancing Links Backend
+Encodes the puzzle as a 324-column exact-cover matrix (4 * N * N columns for
+an N x N board) and solves it with Knuth's Algorithm X on a doubly linked
+node grid (Dancing Links).
+"""
+
+from board import flat_cells
+from geometry import geometry, box_for_cells
+
+# Column layout for 9x9: 4 blocks of 81 constraints
+#   0..80     cell (r, c) is filled
+#   81..161   row r contains digit d
+#   162..242  column c contains digit d
+#   243..323  box b contains digit d
+# Other sizes use the same 4 blocks of N * N.
+N_COLUMNS = 324
+
+
+def matrix_columns(cell, num, geo=geometry(3)):
+    """Return the 4 constraint columns covered by putting num in cell."""
+    n, cells = geo.size, geo.cells
+    d = num - 1
+    return (cell, cells + geo.ROW_OF[cell] * n + d, 2 * cells + geo.COL_OF[cell] * n + d,
+            3 * cells + geo.BOX_OF[cell] * n + d)
+
+
+class DancingLinks:
+
+    def __init__(self, board, stats=None):
+        """
+        Build the exact-cover matrix for a board (Board or list of lists, 0 for
+        empty cells; 9x9, 16x16 or 25x25). Givens are selected right away;
+        clashing givens set self.consistent to False.
+        Pass a SearchStats as stats to collect counters and call its hooks.
+        """
+        cells = flat_cells(board)
+        self.geo = geometry(box_for_cells(len(cells)))
+        self.size = self.geo.size
+        columns = 4 * len(cells)
+
+        # Node 0 is the root, nodes 1..columns are the column headers,
+        # every other node is a 1 in the matrix. Links are kept in flat lists.
+        n = columns + 1
+        self.L = [i - 1 for i in range(n)]
+        self.R = [i + 1 for i in range(n)]
+        self.L[0] = columns
+        self.R[columns] = 0
+        self.U = list(range(n))
+        self.D = list(range(n))
+        self.C = list(range(n))
+        self.S = [0] * n
+        self.ROW = [-1] * n
+
+        self.cells = cells
+        self.givens = cells[:]
+        self.consistent = True
+        self.stats = stats
+
+        # One matrix row per (cell, digit); a given only gets its own digit
+        given_nodes = []
+        for cell, num in enumerate(cells):
+            if num:
+                given_nodes.append(self._add_row(cell, num))
+            else:
+                for d in range(1, self.size + 1):
+                    self._add_row(cell, d)
+
+        # Select the givens: cover every column their rows satisfy
+        covered = set()
+        for node in given_nodes:
+            j = node
+            while True:
+                col = self.C[j]
+                if col in covered:
+                    self.consistent = False
+                    return
+                covered.add(col)
+                self.cover(col)
+                j = self.R[j]
+                if j == node:
+                    break
+
+        self.solution = []
+
+    def _add_row(self, cell, num):
+        """Append the matrix row for (cell, num) and return its first node."""
+        L, R, U, D, C, S, ROW = self.L, self.R, self.U, self.D, self.C, self.S, self.ROW
+        row_id = cell * self.size + num - 1
+        first = len(L)
+
+        for k, col in enumerate(matrix_columns(cell, num, self.geo)):
+            node = first + k
+            h = col + 1
+
+            # Link vertically at the bottom of the column
+            U.append(U[h])
+            D.append(h)
+            D[U[h]] = node
+            U[h] = node
+            C.append(h)
+            ROW.append(row_id)
+            S[h] += 1
+
+            # Link horizontally into a circular row of 4 nodes
+            L.append(node - 1 if k else first + 3)
+            R.append(node + 1 if k < 3 else first)
+
+        return first
+
+    def cover(self, col):
+        """Remove a column header and every row that intersects it."""
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        R[L[col]] = R[col]
+        L[R[col]] = L[col]
+
+        i = D[col]
+        while i != col:
+            j = R[i]
+            while j != i:
+                D[U[j]] = D[j]
+                U[D[j]] = U[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, col):
+        """Undo cover(col), relinking nodes in reverse order."""
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+
+        i = U[col]
+        while i != col:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                D[U[j]] = j
+                U[D[j]] = j
+                j = L[j]
+            i = U[i]
+
+        R[L[col]] = col
+        L[R[col]] = col
+
+    def choose_column(self):
+        """Return the uncovered column with the fewest remaining rows."""
+        R, S = self.R, self.S
+        best, best_size = 0, self.size + 1
+        c = R[0]
+        while c != 0:
+            if S[c] < best_size:
+                best, best_size = c, S[c]
+                if best_size <= 1:
+                    break
+            c = R[c]
+        return best
+
+    def _select_row(self, r):
+        """Add row r to the solution, covering the other columns it satisfies."""
+        R, C = self.R, self.C
+        self.solution.append(self.ROW[r])
+        j = R[r]
+        while j != r:
+            self.cover(C[j])
+            j = R[j]
+
+    def _unselect_row(self, r):
+        """Undo _select_row(r)."""
+        L, C = self.L, self.C
+        j = L[r]
+        while j != r:
+            self.uncover(C[j])
+            j = L[j]
+        self.solution.pop()
+
+    def search(self, limit, budget=None):
+        """
+        Algorithm X, with an explicit stack instead of recursion. Return the
+        number of solutions found, stopping at limit (None means no limit). The
+        first solution found is kept in self.cells. A SearchBudget passed as
+        budget is charged per node and may raise BudgetExhausted; the matrix is
+        restored either way.
+        """
+        stats = self.stats
+        R, D, S = self.R, self.D, self.S
+        n = self.size
+        stack = []  # per level: [covered column, row of it being tried]
+        try:
+            while True:
+                if R[0] == 0:
+                    if self.found == 0:
+                        for row_id in self.solution:
+                            self.cells[row_id // n] = row_id % n + 1
+                    if stats is not None:
+                        stats.solution(self.solution_cells())
+                    self.found += 1
+                    if limit is not None and self.found >= limit:
+                        return self.found
+                else:
+                    if budget is not None:
+                        budget.charge()
+                    if stats is None:
+                        col = self.choose_column()
+                    else:
+                        stats.node(len(stack))
+                        col = stats.timed_select(self.choose_column)
+                        if S[col] == 1:
+                            stats.propagations += 1
+
+                    if S[col]:
+                        self.cover(col)
+                        r = D[col]
+                        self._select_row(r)
+                        stack.append([col, r])
+                        if stats is not None:
+                            row_id = self.ROW[r]
+                            stats.assign(row_id // n, row_id % n + 1)
+                        continue
+
+                # Backtrack to the deepest column with a row left to try
+                while stack:
+                    level = stack[-1]
+                    col, r = level
+                    self._unselect_row(r)
+                    if stats is not None:
+                        row_id = self.ROW[r]
+                        stats.backtrack(row_id // n, row_id % n + 1)
+                    r = D[r]
+                    if r != col:
+                        self._select_row(r)
+                        level[1] = r
+                        if stats is not None:
+                            row_id = self.ROW[r]
+                            stats.assign(row_id // n, row_id % n + 1)
+                        break
+                    self.uncover(col)
+                    stack.pop()
+                else:
+                    return self.found
+        finally:
+            # Stopped early (limit or budget): put the matrix back as it was
+            while stack:
+                col, r = stack.pop()
+                self._unselect_row(r)
+                self.uncover(col)
+
+    def solution_cells(self):
+        """Return the cells of the current (partial) selection, givens included."""
+        cells = self.givens[:]
+        n = self.size
+        for row_id in self.solution:
+            cells[row_id // n] = row_id % n + 1
+        return cells
+
+    def solve(self, budget=None):
+        """Find one solution. Return True and fill self.cells if there is one."""
+        if not self.consistent:
+            return False
+        self.found = 0
+        return self.search(1, budget) > 0
+
+    def count(self, limit=None, budget=None):
+        """Count solutions, stopping as soon as limit is reached."""
+        if not self.consistent:
+            return 0
+        self.found = 0
+        return self.search(limit, budget)
@@ -0,0 +1,288 @@
+"""
+Sudoku Solver - Bitmask Engine
+Keeps one digit bitmask per row, column and box, updated as digits are placed
+and undone, and always branches on the most constrained empty cell (MRV).
+"""
+
+from board import flat_cells
+from geometry import geometry, box_for_cells
+
+# 9x9 tables. Cells are indexed 0..80 in row-major order (index = row * 9 + col);
+# other sizes use the same tables from geometry.py
+_GEO = geometry(3)
+ROW_OF = _GEO.ROW_OF
+COL_OF = _GEO.COL_OF
+BOX_OF = _GEO.BOX_OF
+
+# Digit d is stored as bit (1 << d), so bits 1..9 are used
+ALL_DIGITS = _GEO.ALL_DIGITS
+
+# Number of set bits for every possible mask
+POPCOUNT = _GEO.POPCOUNT
+
+
+class BitmaskEngine:
+
+    def __init__(self, board, stats=None):
+        """
+        Load a board (Board or list of lists, 0 for empty cells; 9x9, 16x16 or
+        25x25) into the engine. If the givens already clash, self.consistent is
+        False and search() fails. Pass a SearchStats as stats to collect
+        counters and call its hooks.
+        """
+        self.cells = flat_cells(board)
+        self.geo = geo = _GEO if len(self.cells) == 81 else geometry(box_for_cells(len(self.cells)))
+        self.size = n = geo.size
+        ROW_OF, COL_OF, BOX_OF = geo.ROW_OF, geo.COL_OF, geo.BOX_OF
+        self.rows = [0] * n
+        self.cols = [0] * n
+        self.boxes = [0] * n
+        self.empty = []
+        self.consistent = True
+        self.stats = stats
+
+        for i, num in enumerate(self.cells):
+            if num == 0:
+                self.empty.append(i)
+                continue
+
+            bit = 1 << num
+            r, c, b = ROW_OF[i], COL_OF[i], BOX_OF[i]
+            if (self.rows[r] | self.cols[c] | self.boxes[b]) & bit:
+                self.consistent = False
+            self.rows[r] |= bit
+            self.cols[c] |= bit
+            self.boxes[b] |= bit
+
+    def candidates(self, i):
+        """Return the bitmask of digits that can still go in cell i."""
+        geo = self.geo
+        return geo.ALL_DIGITS & ~(self.rows[geo.ROW_OF[i]] | self.cols[geo.COL_OF[i]] | self.boxes[geo.BOX_OF[i]])
+
+    def place(self, i, num):
+        """Put num in the empty cell i and update the masks."""
+        geo = self.geo
+        ROW_OF, COL_OF, BOX_OF = geo.ROW_OF, geo.COL_OF, geo.BOX_OF
+        bit = 1 << num
+        self.rows[ROW_OF[i]] |= bit
+        self.cols[COL_OF[i]] |= bit
+        self.boxes[BOX_OF[i]] |= bit
+        self.cells[i] = num
+        self.empty.remove(i)
+
+    def remove(self, i):
+        """Clear cell i and give its digit back to its row, column and box."""
+        geo = self.geo
+        ROW_OF, COL_OF, BOX_OF = geo.ROW_OF, geo.COL_OF, geo.BOX_OF
+        bit = 1 << self.cells[i]
+        self.rows[ROW_OF[i]] ^= bit
+        self.cols[COL_OF[i]] ^= bit
+        self.boxes[BOX_OF[i]] ^= bit
+        self.cells[i] = 0
+        self.empty.append(i)
+
+    def select_cell(self):
+        """
+        Return (position in self.empty, candidate mask) of the empty cell with
+        the fewest candidates. Stops early on a cell with 0 or 1 candidates.
+        Works out the candidates and picks the cell in one pass; with stats
+        the search uses empty_candidates and fewest_candidates instead, to
+        time the two apart.
+        """
+        rows, cols, boxes = self.rows, self.cols, self.boxes
+        geo = self.geo
+        ROW_OF, COL_OF, BOX_OF, ALL_DIGITS, POPCOUNT = geo.ROW_OF, geo.COL_OF, geo.BOX_OF, geo.ALL_DIGITS, geo.POPCOUNT
+        best_pos, best_mask, best_count = -1, 0, self.size + 1
+
+        for pos, i in enumerate(self.empty):
+            mask = ALL_DIGITS & ~(rows[ROW_OF[i]] | cols[COL_OF[i]] | boxes[BOX_OF[i]])
+            count = POPCOUNT[mask]
+            if count < best_count:
+                best_pos, best_mask, best_count = pos, mask, count
+                if count <= 1:
+                    break
+
+        return best_pos, best_mask
+
+    def empty_candidates(self):
+        """Candidate masks of the cells in self.empty, in the same order."""
+        rows, cols, boxes = self.rows, self.cols, self.boxes
+        geo = self.geo
+        ROW_OF, COL_OF, BOX_OF, ALL_DIGITS = geo.ROW_OF, geo.COL_OF, geo.BOX_OF, geo.ALL_DIGITS
+        return [ALL_DIGITS & ~(rows[ROW_OF[i]] | cols[COL_OF[i]] | boxes[BOX_OF[i]]) for i in self.empty]
+
+    def fewest_candidates(self, masks):
+        """Pick from empty_candidates() the same cell as select_cell, return (position, mask)."""
+        POPCOUNT = self.geo.POPCOUNT
+        best_pos, best_mask, best_count = -1, 0, self.size + 1
+        for pos, mask in enumerate(masks):
+            count = POPCOUNT[mask]
+            if count < best_count:
+                best_pos, best_mask, best_count = pos, mask, count
+                if count <= 1:
+                    break
+        return best_pos, best_mask
+
+    def _walk(self, budget=None, keep=False):
+        """
+        Depth-first search with an explicit stack instead of recursion, so its
+        depth has nothing to do with Python's recursion limit. A generator that
+        yields (nothing) every time the cells hold a solution; the search goes
+        on when it is resumed.
+
+        The board is put back as loaded when the walk ends, is closed or runs
+        out of budget, except that with keep=True closing it while it stands
+        on a solution leaves that solution in place.
+        """
+        stats = self.stats
+        empty = self.empty
+        rows, cols, boxes, cells = self.rows, self.cols, self.boxes, self.cells
+        geo = self.geo
+        ROW_OF, COL_OF, BOX_OF, POPCOUNT = geo.ROW_OF, geo.COL_OF, geo.BOX_OF, geo.POPCOUNT
+        stack = []  # per level: (cell, row, col, box, digits not tried yet); cells[cell] is the digit tried
+        at_solution = False
+        try:
+            while True:
+                if not empty:
+                    if stats is not None:
+                        stats.solution(cells)
+                    at_solution = True
+                    yield
+                    at_solution = False
+                else:
+                    if budget is not None:
+                        budget.charge()
+                    if stats is None:
+                        pos, mask = self.select_cell()
+                    else:
+                        stats.node(len(stack))
+                        masks = stats.timed_check(self.empty_candidates)
+                        pos, mask = stats.timed_select(self.fewest_candidates, masks)
+                        if POPCOUNT[mask] == 1:
+                            stats.propagations += 1
+
+                    if mask:
+                        # Take the chosen cell out of the empty list (swap with the
+                        # last one) and try its lowest digit first
+                        i = empty[pos]
+                        empty[pos] = empty[-1]
+                        empty.pop()
+                        r, c, b = ROW_OF[i], COL_OF[i], BOX_OF[i]
+                        bit = mask & -mask
+                        rows[r] |= bit
+                        cols[c] |= bit
+                        boxes[b] |= bit
+                        cells[i] = bit.bit_length() - 1
+                        stack.append((i, r, c, b, mask ^ bit))
+                        if stats is not None:
+                            stats.assign(i, cells[i])
+                        continue
+
+                # Backtrack to the deepest cell with a digit left to try
+                while stack:
+                    i, r, c, b, mask = stack[-1]
+                    bit = 1 << cells[i]
+                    rows[r] ^= bit
+                    cols[c] ^= bit
+                    boxes[b] ^= bit
+                    if stats is not None:
+                        stats.backtrack(i, cells[i])
+                    if mask:
+                        bit = mask & -mask
+                        rows[r] |= bit
+                        cols[c] |= bit
+                        boxes[b] |= bit
+                        cells[i] = bit.bit_length() - 1
+                        stack[-1] = (i, r, c, b, mask ^ bit)
+                        if stats is not None:
+                            stats.assign(i, cells[i])
+                        break
+                    cells[i] = 0
+                    empty.append(i)
+                    stack.pop()
+                else:
+                    return
+        finally:
+            if not (keep and at_solution):
+                while stack:
+                    i, r, c, b, _ = stack.pop()
+                    bit = 1 << cells[i]
+                    rows[r] ^= bit
+                    cols[c] ^= bit
+                    boxes[b] ^= bit
+                    cells[i] = 0
+                    empty.append(i)
+
+    def search(self, budget=None):
+        """
+        Fill the empty cells by backtracking. Return True if a solution was
+        found (it is left in the cells). A SearchBudget passed as budget is
+        charged per node and may raise BudgetExhausted, leaving the board as loaded.
+        """
+        walk = self._walk(budget, keep=True)
+        found = next(walk, False) is None
+        walk.close()
+        return found
+
+    def count(self, limit=None, budget=None):
+        """
+        Count solutions, stopping as soon as limit is reached (None means no limit).
+        The board is left as it was loaded.
+        """
+        if not self.consistent:
+            return 0
+        total = 0
+        walk = self._walk(budget)
+        for _ in walk:
+            total += 1
+            if limit is not None and total >= limit:
+                break
+        walk.close()
+        return total
+
+    def solutions(self, budget=None):
+        """
+        Yield every solution as a new list of digits (one per cell), in search order.
+        The board is left as loaded once the generator is exhausted or closed.
+        """
+        if not self.consistent:
+            return
+        walk = self._walk(budget)
+        try:
+            for _ in walk:
+                yield list(self.cells)
+        finally:
+            walk.close()
+
+    def split(self):
+        """
+        Branch once on the most constrained cell. Return the boards of the
+        children as flat lists of digits (empty if this board is a dead end).
+        A solved board has no children and is returned as its own only child.
+        """
+        if not self.consistent:
+            return []
+        if not self.empty:
+            return [list(self.cells)]
+
+        pos, mask = self.select_cell()
+        i = self.empty[pos]
+        children = []
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            child = list(self.cells)
+            child[i] = bit.bit_length() - 1
+            children.append(child)
+        return children
+
+    def solve(self, budget=None):
+        """Solve the loaded board in place. Return True if solved."""
+        if not self.consistent:
+            return False
+        return self.search(budget)
+
+    def to_board(self):
+        """Return the current cells as an N x N list of lists."""
+        n = self.size
+        return [self.cells[r * n:r * n + n] for r in range(n)]
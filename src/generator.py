@@ -0,0 +1,340 @@
+"""
+Sudoku Generator - Headless Version
+Builds full grids and digs them into puzzles with a unique solution.
+Does not need pygame, so it can be used from scripts and worker processes.
+
+Difficulty is graded by the logical techniques a puzzle needs (see logic.py),
+not only by how many cells were removed: a "hard" puzzle is one that singles
+and locked candidates can't finish. Bigger boards (16x16, 25x25) aren't
+graded: their difficulty only sets how many cells are removed.
+"""
+
+import random
+
+from board import Board
+from dlx import DancingLinks
+from engine import BitmaskEngine
+from geometry import geometry
+from logic import LogicSolver, DIFFICULTIES, techniques_for
+from symmetry import random_transform
+
+# Minimum number of cells removed for each difficulty
+DIFFICULTY_REMOVALS = {"easy": 35, "medium": 45, "hard": 55}
+
+# Share of the cells removed on 16x16 and 25x25 boards. Lower than on 9x9:
+# past about 55% the uniqueness checks get very slow on these sizes
+BIG_BOARD_REMOVALS = {"easy": 0.35, "medium": 0.45, "hard": 0.5}
+
+# Digs generate() tries by default before giving up on a grade
+MAX_ATTEMPTS = 50
+
+# Removal orders generate() tries on one full grid before drawing the next one.
+# A dig that misses its grade mostly ends on a puzzle that is still too easy,
+# and another order on the same grid does as well as a fresh grid
+DIGS_PER_GRID = 4
+
+# Full 9x9 grids from 32 different symmetry classes (found by search_grid()).
+# full_grid() hands out random transforms of them: up to 1.2 * 10 ** 12
+# distinct grids per base grid, and no search
+BASE_GRIDS = (
+    "153486279429537618768921534915362847274859361386174925692715483537248196841693752",
+    "174658923962347581583192674827936415645721839319485267751264398238519746496873152",
+    "176328945349615728825794613651237894783946251294851376912563487568479132437182569",
+    "187642593246935718395871264769513842432789651851426937624198375573264189918357426",
+    "192546387643987521875213694986175243251439876734862159318724965567398412429651738",
+    "239176548581439267746258139658714392193862754472593816914387625327645981865921473",
+    "291465738438791256567283941183947625945632817726518493854126379372859164619374582",
+    "413285967876913524925467183592371846764859312138642759247598631659134278381726495",
+    "419753268785126349326849157168475932947362815532918476873594621254681793691237584",
+    "431582769897613542265974183684231957523749618179856234918325476356497821742168395",
+    "481732965375946182296851743718365429632479518549128376827594631963217854154683297",
+    "492168357785243169361975824824731695539826741176459283248517936913684572657392418",
+    "513682794268947513497153862972538641385416279641729385756294138134865927829371456",
+    "562741839978253641341689257285496173719532468634817925196325784823174596457968312",
+    "573148296926375184841269537482693751157824963639517428218456379395781642764932815",
+    "624831975817592364359467218192745836483629751765183429541378692978216543236954187",
+    "629183574154276389738549612982631745341957268576428931817392456265714893493865127",
+    "632784195154392786789156324876249513495631278321578649218963457967425831543817962",
+    "643729581178563429295148673582374196417986352936215748751832964324697815869451237",
+    "674152983239864571185397462916725834547938126823416795461289357758643219392571648",
+    "674823591135697284928145367286479153793581642451362978362758419849216735517934826",
+    "691354278328917645457628319873245961149863752265791834586472193712539486934186527",
+    "712684539345912678869357214137268495694571823258439167521893746483726951976145382",
+    "749318526352679481618254379465937218197825643283461795834796152576182934921543867",
+    "751426938683791452942358617327184569814569273569237841276843195438915726195672384",
+    "754219386632875419198436275489527631376194528215368794527941863861753942943682157",
+    "798315642532486719416297538953861427674532981281749365345928176867153294129674853",
+    "876132459149568732235794186592486317684317925713259864367921548921845673458673291",
+    "892543617574186392136279458421865973785932146369714825918627534253498761647351289",
+    "895236147627419853413857629956782314238164975741395286184973562362541798579628431",
+    "914867235876253941235914867467185392352749618189326574591438726623571489748692153",
+    "973425618241876539586319274759648123318257946462193785125984367837562491694731852",
+)
+
+
+class GenerationFailed(RuntimeError):
+    """Raised by generate() when none of its digs reached the difficulty asked for."""
+
+
+def is_unique(board, stats=None):
+    """Return True if the board has exactly one solution."""
+    return BitmaskEngine(board, stats).count(2) == 1
+
+
+def solvable_with(cells, techniques, until=None):
+    """
+    Return True if logic limited to techniques solves the 81 cells (9x9 only),
+    or fills all the cells of until when given.
+    """
+    return LogicSolver(Board(bytearray(cells))).solve(techniques, until)
+
+
+def is_single(engine, cell, num):
+    """
+    Return True if num is forced into the empty cell of engine (a BitmaskEngine)
+    by a single: it is the last digit the cell can take (naked), or the cell is
+    the last place for num in one of its units (hidden).
+    """
+    if engine.candidates(cell) == 1 << num:
+        return True
+    geo, cells, bit = engine.geo, engine.cells, 1 << num
+    for u in geo.UNITS_OF[cell]:
+        if not any(j != cell and not cells[j] and engine.candidates(j) & bit for j in geo.UNITS[u]):
+            return True
+    return False
+
+
+def singles_restore(engine, removed):
+    """
+    Return True if singles alone put back every (cell, num) of removed, one
+    after another, starting from the puzzle in engine. The engine is left as
+    it was.
+
+    Every technique of logic.py only removes candidates, and removing more
+    never stops one from applying, so what a set of techniques can solve
+    doesn't depend on the order it works in. With singles among them, a
+    puzzle that they put the removed cells back into is solved by them
+    exactly when the puzzle before the removal was, and it is unique.
+    """
+    pending = list(removed)
+    placed = []
+    try:
+        while pending:
+            for k, (cell, num) in enumerate(pending):
+                if is_single(engine, cell, num):
+                    engine.place(cell, num)
+                    placed.append(cell)
+                    del pending[k]
+                    break
+            else:
+                return False
+        return True
+    finally:
+        for cell in placed:
+            engine.remove(cell)
+
+
+class PuzzleGenerator:
+
+    def __init__(self, seed=None, stats=None, box=3):
+        """
+        Create a generator; pass a seed to get a reproducible sequence of puzzles.
+        A SearchStats passed as stats collects the counters of every search run,
+        including the uniqueness checks. box is the box size: 3 for 9x9 puzzles,
+        4 for 16x16, 5 for 25x25.
+        """
+        self.rng = random.Random(seed)
+        self.stats = stats
+        self.geo = geometry(box)
+        self.grids = 0  # full grids drawn by generate(), the ones thrown away included
+
+    def full_grid(self):
+        """
+        Return a random, completely filled valid Board: a random symmetry
+        transform (see symmetry.py) of one of the BASE_GRIDS, in O(81) and
+        drawn from self.rng only, so the same seed gives the same grids.
+        """
+        if self.geo.size != 9:
+            return self.pattern_grid()
+        base = Board.from_string(self.rng.choice(BASE_GRIDS))
+        return random_transform(self.rng).apply(base)
+
+    def search_grid(self):
+        """
+        Return a random full 9x9 Board found by search: the diagonal boxes are
+        filled at random and the bitmask engine completes the rest. Slower than
+        full_grid(), but not limited to the symmetry classes of BASE_GRIDS.
+        """
+        board = Board()
+
+        # The three diagonal boxes don't share any unit, fill them at random
+        for box in range(0, 9, 3):
+            nums = list(range(1, 10))
+            self.rng.shuffle(nums)
+            for k, num in enumerate(nums):
+                board[box + k // 3, box + k % 3] = num
+
+        engine = BitmaskEngine(board, self.stats)
+        engine.solve()
+        return Board(bytearray(engine.cells))
+
+    def pattern_grid(self):
+        """
+        Return a full Board of any size without searching: the shifted-rows
+        pattern grid with its digits relabeled, rows shuffled within bands,
+        bands shuffled, the same for columns and stacks, and maybe transposed.
+        Filling 16x16 and 25x25 grids by search has a very long tail (minutes
+        for some 25x25 starts), this takes O(N * N).
+        """
+        rng, b, n = self.rng, self.geo.box, self.geo.size
+
+        def lines():
+            return [b * band + k for band in rng.sample(range(b), b) for k in rng.sample(range(b), b)]
+
+        rows, cols = lines(), lines()
+        digits = rng.sample(range(1, n + 1), n)
+        grid = [[digits[(b * (r % b) + r // b + c) % n] for c in cols] for r in rows]
+        if rng.random() < 0.5:
+            grid = zip(*grid)
+        return Board(bytearray(num for row in grid for num in row))
+
+    def dig(self, solution, cells_to_remove, difficulty=None, max_removed=None):
+        """
+        Remove cells in symmetric pairs from a full board while the puzzle keeps a
+        unique solution. The engine holding the puzzle is updated in place, so no
+        board is copied or reloaded between removal attempts. A removal whose
+        cells singles put straight back is decided from the engine's masks
+        alone (see singles_restore): it keeps the puzzle unique and its grade
+        unchanged, so logic and search only run on the other ones.
+
+        With a difficulty, removals that would make the puzzle harder than that
+        are reverted, and digging goes on past cells_to_remove until the puzzle
+        is no longer solvable by the techniques of the easier difficulties.
+        No more than max_removed cells are removed when it is given.
+        Boards other than 9x9 are only checked for uniqueness.
+        Return (puzzle Board, True if it reached the difficulty).
+        """
+        graded = self.geo.size == 9
+        allowed = easier = None
+        if difficulty is not None and graded:
+            level = DIFFICULTIES.index(difficulty)
+            if level + 1 < len(DIFFICULTIES):
+                allowed = techniques_for(difficulty)
+            if level > 0:
+                easier = techniques_for(DIFFICULTIES[level - 1])
+
+        engine = BitmaskEngine(solution, self.stats)
+        last = self.geo.cells - 1
+        positions = list(range(last + 1))
+        self.rng.shuffle(positions)
+
+        removed = 0
+        reached = easier is None
+        graded_here = False  # the grade check already ran on an equivalent puzzle
+        while positions and (removed < cells_to_remove or not reached):
+            if max_removed is not None and removed >= max_removed:
+                break
+            i = positions.pop()
+            if engine.cells[i] == 0:
+                continue
+
+            # Symmetric pair: (N-1 - row, N-1 - col) is cell N*N-1 - i
+            pair = [i] if 2 * i == last else [i, last - i]
+            if max_removed is not None and removed + len(pair) > max_removed:
+                continue
+            backup = [(cell, engine.cells[cell]) for cell in pair]
+
+            # Try removing
+            for cell in pair:
+                engine.remove(cell)
+
+            # Most removals that get reverted leave a second solution, which the
+            # search finds faster than logic gets stuck, so it runs first. Once
+            # logic has put the pair back it is at the puzzle before the
+            # removal, which already passed, so it can stop there
+            forced = singles_restore(engine, backup)
+            if forced:
+                keep = True
+            elif graded:
+                keep = not self.has_other_solution(engine, backup)
+                if keep and allowed is not None:
+                    keep = solvable_with(engine.cells, allowed, pair)
+            else:
+                # Count: plain MRV can get lost for a long time on a wrong digit in
+                # a big board, the exact-cover columns also see hidden singles
+                keep = DancingLinks(Board(bytearray(engine.cells)), self.stats).count(2) == 1
+
+            if not keep:
+                # Revert
+                for cell, num in backup:
+                    engine.place(cell, num)
+                continue
+
+            removed += len(pair)
+            graded_here = graded_here and forced
+            if not reached and removed >= cells_to_remove and not graded_here:
+                reached = not solvable_with(engine.cells, easier)
+                graded_here = True
+
+        # Ran out of cells before the removal target: the grade still decides
+        if not reached and removed < cells_to_remove:
+            reached = not solvable_with(engine.cells, easier)
+
+        return Board(bytearray(engine.cells)), reached
+
+    def has_other_solution(self, engine, removed):
+        """
+        The puzzle in engine was unique before the (cell, num) pairs in removed
+        were cleared. Any other solution must now differ on one of those cells, so
+        try each wrong digit there and stop at the first solution found.
+        """
+        pinned = []
+        try:
+            for cell, num in removed:
+                mask = engine.candidates(cell) & ~(1 << num)
+                while mask:
+                    bit = mask & -mask
+                    mask ^= bit
+
+                    engine.place(cell, bit.bit_length() - 1)
+                    found = engine.count(1) > 0
+                    engine.remove(cell)
+                    if found:
+                        return True
+
+                # Every other solution has to keep num here, pin it and move on
+                engine.place(cell, num)
+                pinned.append(cell)
+            return False
+        finally:
+            for cell in pinned:
+                engine.remove(cell)
+
+    def generate(self, difficulty="medium", max_attempts=MAX_ATTEMPTS, min_clues=None, max_clues=None):
+        """
+        Return (puzzle, solution) Boards for the given difficulty ("easy", "medium"
+        or "hard"). A dig that misses the grade is tried again along another
+        removal order, DIGS_PER_GRID times on each full grid, and
+        GenerationFailed is raised after max_attempts digs (None tries until
+        one works). Bigger boards take their removal target from
+        BIG_BOARD_REMOVALS. min_clues and max_clues (inclusive, both or
+        neither) replace the removal target: digging goes down to max_clues
+        and never below min_clues.
+        """
+        if max_clues is not None:
+            removals = self.geo.cells - max_clues
+        elif self.geo.size == 9:
+            removals = DIFFICULTY_REMOVALS[difficulty]
+        else:
+            removals = int(BIG_BOARD_REMOVALS[difficulty] * self.geo.cells)
+        max_removed = None if min_clues is None else self.geo.cells - min_clues
+        attempts = 0
+        while max_attempts is None or attempts < max_attempts:
+            if attempts % DIGS_PER_GRID == 0:
+                self.grids += 1
+                solution = self.full_grid()
+            attempts += 1
+            puzzle, reached = self.dig(solution, removals, difficulty, max_removed)
+            if reached and (max_clues is None or puzzle.count_filled() <= max_clues):
+                return puzzle, solution
+        raise GenerationFailed(f"no {difficulty} puzzle in {max_attempts} digs")
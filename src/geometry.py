@@ -0,0 +1,81 @@
+"""
+Sudoku Geometry
+Lookup tables for a board with boxes of b x b cells, so N = b * b rows,
+columns, boxes and digits (9x9, 16x16, 25x25...). Built once per box size and
+shared by every board, engine and tracker of that size.
+"""
+
+from math import isqrt
+
+# Text form of digits 1..25; '0' or '.' is an empty cell
+DIGIT_CHARS = "123456789ABCDEFGHIJKLMNOP"
+MAX_BOX = 5
+
+# Digit masks up to this many bits get a popcount lookup table (2 ** 17 entries for 16x16)
+TABLE_BITS = 17
+
+
+class _BitCount:
+    """Stands in for a popcount table where one would be too big: POPCOUNT[mask] is mask.bit_count()."""
+
+    __getitem__ = staticmethod(int.bit_count)
+
+
+class Geometry:
+
+    def __init__(self, box):
+        """
+        Tables for N x N boards with b x b boxes (b = box, N = b * b). Cells are
+        indexed 0..N*N-1 in row-major order, digit d is bit (1 << d) of a mask.
+        """
+        if not 2 <= box <= MAX_BOX:
+            raise ValueError(f"Box size must be between 2 and {MAX_BOX}, got {box}")
+        n = box * box
+        self.box = box
+        self.size = n
+        self.cells = n * n
+
+        self.ROW_OF = [i // n for i in range(self.cells)]
+        self.COL_OF = [i % n for i in range(self.cells)]
+        self.BOX_OF = [box * (i // (n * box)) + (i % n) // box for i in range(self.cells)]
+        self.ALL_DIGITS = ((1 << n) - 1) << 1
+
+        # Units are numbered 0..N-1 rows, N..2N-1 columns, 2N..3N-1 boxes
+        self.UNITS = ([[r * n + c for c in range(n)] for r in range(n)]
+                      + [[r * n + c for r in range(n)] for c in range(n)]
+                      + [[i for i in range(self.cells) if self.BOX_OF[i] == b] for b in range(n)])
+        self.UNITS_OF = [(self.ROW_OF[i], n + self.COL_OF[i], 2 * n + self.BOX_OF[i]) for i in range(self.cells)]
+        self.PEERS = [sorted({j for u in self.UNITS_OF[i] for j in self.UNITS[u]} - {i}) for i in range(self.cells)]
+
+        self._popcount = None
+
+    @property
+    def POPCOUNT(self):
+        """popcount of every digit mask, a list when small enough (built on first use)."""
+        if self._popcount is None:
+            bits = self.size + 1
+            self._popcount = [m.bit_count() for m in range(1 << bits)] if bits <= TABLE_BITS else _BitCount()
+        return self._popcount
+
+    def to_char(self, num):
+        """Text form of a digit, '0' for empty."""
+        return DIGIT_CHARS[num - 1] if num else "0"
+
+
+_GEOMETRIES = {}
+
+
+def geometry(box=3):
+    """Return the shared Geometry for box size box."""
+    geo = _GEOMETRIES.get(box)
+    if geo is None:
+        geo = _GEOMETRIES[box] = Geometry(box)
+    return geo
+
+
+def box_for_cells(count):
+    """Return the box size of a board with count cells (81 -> 3, 256 -> 4, 625 -> 5)."""
+    box = isqrt(isqrt(count))
+    if box ** 4 != count or not 2 <= box <= MAX_BOX:
+        raise ValueError(f"{count} cells is not a square board with square boxes")
+    return box
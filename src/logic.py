@@ -0,0 +1,358 @@
+"""
+Sudoku Solver - Logical Techniques
+Solves as far as possible the way a person would, with candidate bitmasks and
+a ladder of techniques tried from the cheapest up: singles, naked and hidden
+pairs/triples, pointing/claiming, X-Wing and Swordfish. After every step that
+makes progress the ladder starts again from the bottom, so the hardest
+technique used is also a fair measure of how hard the puzzle is.
+"""
+
+from itertools import combinations
+
+from board import flat_cells
+from engine import ROW_OF, COL_OF, BOX_OF, ALL_DIGITS, POPCOUNT
+
+# Units are numbered 0..8 rows, 9..17 columns, 18..26 boxes
+UNITS = ([[r * 9 + c for c in range(9)] for r in range(9)]
+         + [[r * 9 + c for r in range(9)] for c in range(9)]
+         + [[i for i in range(81) if BOX_OF[i] == b] for b in range(9)])
+UNITS_OF = [(ROW_OF[i], 9 + COL_OF[i], 18 + BOX_OF[i]) for i in range(81)]
+PEERS = [sorted({j for u in UNITS_OF[i] for j in UNITS[u]} - {i}) for i in range(81)]
+# Position of cell i in each of its units: UNITS[UNITS_OF[i][n]][UNIT_POS[i][n]] == i
+UNIT_POS = [(COL_OF[i], ROW_OF[i], 3 * (ROW_OF[i] % 3) + COL_OF[i] % 3) for i in range(81)]
+
+# Positions (bits of a where() mask) of each row and column inside a box; for
+# a row or column unit BOX_ROW[k] is also the part that lies in its k-th box
+BOX_ROW = (0b000000111, 0b000111000, 0b111000000)
+BOX_COL = (0b001001001, 0b010010010, 0b100100100)
+
+# Digits in every candidate mask
+DIGITS_OF = [tuple(d for d in range(1, 10) if m >> d & 1) for m in range(1 << 10)]
+
+# Techniques from the cheapest to the most expensive
+TECHNIQUES = (
+    "naked_single",
+    "hidden_single",
+    "naked_pair",
+    "hidden_pair",
+    "naked_triple",
+    "hidden_triple",
+    "pointing",
+    "claiming",
+    "x_wing",
+    "swordfish",
+)
+
+# Grade of a puzzle that logic alone can't finish
+SEARCH = "search"
+
+# Difficulty shown to players for the hardest technique a puzzle needs
+GRADE_DIFFICULTY = {
+    "naked_single": "easy",
+    "hidden_single": "easy",
+    "naked_pair": "medium",
+    "hidden_pair": "medium",
+    "naked_triple": "medium",
+    "hidden_triple": "medium",
+    "pointing": "medium",
+    "claiming": "medium",
+    "x_wing": "hard",
+    "swordfish": "hard",
+    SEARCH: "hard",
+}
+
+# Difficulties from the easiest up
+DIFFICULTIES = ("easy", "medium", "hard")
+
+
+def techniques_for(difficulty):
+    """Return the techniques a puzzle of the given difficulty may need, cheapest first."""
+    level = DIFFICULTIES.index(difficulty)
+    return tuple(name for name in TECHNIQUES if DIFFICULTIES.index(GRADE_DIFFICULTY[name]) <= level)
+
+
+class LogicSolver:
+
+    def __init__(self, board, stats=None):
+        """
+        Load a board (Board, 9x9 list of lists or 81-char string, 0 for empty).
+        If the givens clash, self.consistent is False.
+        A SearchStats passed as stats counts every placement as a propagation.
+        """
+        self.cells = flat_cells(board)
+        self.cand = [0] * 81
+        self.consistent = True
+        self.stats = stats
+        self.used = {}  # technique -> number of steps it made
+        self._where = None  # where() table, built on first use and kept up to date after that
+
+        # Digits already placed in each unit, a clash makes the board inconsistent
+        unit_digits = [0] * 27
+        for i, num in enumerate(self.cells):
+            if num:
+                bit = 1 << num
+                for u in UNITS_OF[i]:
+                    if unit_digits[u] & bit:
+                        self.consistent = False
+                    unit_digits[u] |= bit
+        for i, num in enumerate(self.cells):
+            if num == 0:
+                r, c, b = UNITS_OF[i]
+                self.cand[i] = ALL_DIGITS & ~(unit_digits[r] | unit_digits[c] | unit_digits[b])
+
+    def place(self, i, num):
+        """Put num in the empty cell i and remove it from the candidates of its peers."""
+        bit = 1 << num
+        cand = self.cand
+        if not cand[i] & bit:
+            self.consistent = False
+            return
+        self.cells[i] = num
+        self._drop(i, cand[i])
+        cand[i] = 0
+        for j in PEERS[i]:
+            if cand[j] & bit:
+                cand[j] ^= bit
+                self._drop(j, bit)
+        if self.stats is not None:
+            self.stats.propagations += 1
+
+    def eliminate(self, cells, mask):
+        """Remove the digits in mask from the candidates of cells. Return True if any was removed."""
+        cand = self.cand
+        changed = False
+        for i in cells:
+            dropped = cand[i] & mask
+            if dropped:
+                cand[i] ^= dropped
+                self._drop(i, dropped)
+                changed = True
+        return changed
+
+    def _drop(self, i, mask):
+        """Keep where() in step with the digits of mask leaving the candidates of cell i."""
+        where = self._where
+        if where is None:
+            return
+        (r, c, b), (pr, pc, pb) = UNITS_OF[i], UNIT_POS[i]
+        spots_r, spots_c, spots_b = where[r], where[c], where[b]
+        for num in DIGITS_OF[mask]:
+            spots_r[num] &= ~(1 << pr)
+            spots_c[num] &= ~(1 << pc)
+            spots_b[num] &= ~(1 << pb)
+
+    def solved(self):
+        return 0 not in self.cells
+
+    def check(self):
+        """Flag the board inconsistent if an empty cell has no candidate left."""
+        cells, cand = self.cells, self.cand
+        for i in range(81):
+            if not cells[i] and not cand[i]:
+                self.consistent = False
+                return
+
+    # Techniques: each one looks for a single kind of deduction and returns
+    # True if it placed a digit or removed a candidate
+
+    def naked_single(self):
+        """A cell with one candidate left takes it."""
+        progress = False
+        for i in range(81):
+            mask = self.cand[i]
+            if mask and POPCOUNT[mask] == 1:
+                self.place(i, mask.bit_length() - 1)
+                progress = True
+        return progress
+
+    def where(self):
+        """
+        Return where[u][num]: the bitmask of positions k (cells UNITS[u][k]) of
+        unit u where num is still a candidate. Built once, then place() and
+        eliminate() clear the spots of every candidate they remove.
+        """
+        if self._where is not None:
+            return self._where
+        cand = self.cand
+        where = []
+        for unit in UNITS:
+            spots = [0] * 10
+            for k, i in enumerate(unit):
+                for num in DIGITS_OF[cand[i]]:
+                    spots[num] |= 1 << k
+            where.append(spots)
+        self._where = where
+        return where
+
+    def hidden_single(self):
+        """A digit with one possible cell left in a unit goes there."""
+        cells = self.cells
+        where = self.where()  # live: later units see the digits this pass already placed
+        progress = False
+        for u, unit in enumerate(UNITS):
+            placed = 0
+            for i in unit:
+                placed |= 1 << cells[i]
+            for num in range(1, 10):
+                spots = where[u][num]
+                if not spots:
+                    if not placed & (1 << num):
+                        self.consistent = False  # nowhere left for num in this unit
+                        return False
+                elif not spots & (spots - 1):
+                    i = unit[spots.bit_length() - 1]
+                    if cells[i] != num:
+                        self.place(i, num)
+                        progress = True
+        return progress
+
+    def naked_subset(self, n):
+        """n cells of a unit sharing exactly n candidates: those digits go nowhere else in the unit."""
+        cand = self.cand
+        for unit in UNITS:
+            open_cells = [i for i in unit if cand[i] and POPCOUNT[cand[i]] <= n]
+            for group in combinations(open_cells, n):
+                mask = 0
+                for i in group:
+                    mask |= cand[i]
+                if POPCOUNT[mask] == n:
+                    others = [i for i in unit if i not in group and cand[i]]
+                    if self.eliminate(others, mask):
+                        return True
+        return False
+
+    def hidden_subset(self, n):
+        """n digits confined to the same n cells of a unit: those cells can't hold anything else."""
+        where = self.where()
+        for u, unit in enumerate(UNITS):
+            spots = where[u]
+            digits = [num for num in range(1, 10) if 2 <= POPCOUNT[spots[num]] <= n]
+            for group in combinations(digits, n):
+                positions = mask = 0
+                for num in group:
+                    positions |= spots[num]
+                    mask |= 1 << num
+                if POPCOUNT[positions] == n:
+                    cells = [unit[k] for k in range(9) if positions >> k & 1]
+                    if self.eliminate(cells, ALL_DIGITS & ~mask):
+                        return True
+        return False
+
+    def naked_pair(self):
+        return self.naked_subset(2)
+
+    def hidden_pair(self):
+        return self.hidden_subset(2)
+
+    def naked_triple(self):
+        return self.naked_subset(3)
+
+    def hidden_triple(self):
+        return self.hidden_subset(3)
+
+    def pointing(self):
+        """A digit confined to one row or column inside a box is removed from the rest of that line."""
+        where = self.where()
+        for b in range(9):
+            for num in range(1, 10):
+                spots = where[18 + b][num]
+                if POPCOUNT[spots] < 2:
+                    continue
+                for k in range(3):
+                    if not spots & ~BOX_ROW[k]:
+                        line = 3 * (b // 3) + k
+                    elif not spots & ~BOX_COL[k]:
+                        line = 9 + 3 * (b % 3) + k
+                    else:
+                        continue
+                    others = [i for i in UNITS[line] if BOX_OF[i] != b]
+                    if self.eliminate(others, 1 << num):
+                        return True
+        return False
+
+    def claiming(self):
+        """A digit confined to one box inside a row or column is removed from the rest of that box."""
+        where = self.where()
+        for line in range(18):
+            for num in range(1, 10):
+                spots = where[line][num]
+                if POPCOUNT[spots] < 2:
+                    continue
+                for k in range(3):
+                    if not spots & ~BOX_ROW[k]:
+                        box = 18 + BOX_OF[UNITS[line][3 * k]]
+                        others = [i for i in UNITS[box] if UNITS_OF[i][line // 9] != line]
+                        if self.eliminate(others, 1 << num):
+                            return True
+        return False
+
+    def fish(self, n):
+        """
+        A digit whose spots in n rows all fall in the same n columns (or the
+        other way round) is removed from those columns everywhere else.
+        """
+        where = self.where()
+        for num in range(1, 10):
+            bit = 1 << num
+            for base, cover in ((0, 9), (9, 0)):
+                # Position k in row r is column k and the other way round
+                lines = [k for k in range(9) if 2 <= POPCOUNT[where[base + k][num]] <= n]
+                for group in combinations(lines, n):
+                    crossing = 0
+                    for k in group:
+                        crossing |= where[base + k][num]
+                    if POPCOUNT[crossing] != n:
+                        continue
+                    others = [UNITS[cover + c][k] for c in range(9) if crossing >> c & 1
+                              for k in range(9) if k not in group]
+                    if self.eliminate(others, bit):
+                        return True
+        return False
+
+    def x_wing(self):
+        return self.fish(2)
+
+    def swordfish(self):
+        return self.fish(3)
+
+    def solve(self, techniques=TECHNIQUES, until=None):
+        """
+        Apply the techniques cheapest first, going back to the cheapest after
+        each step that made progress, until the board is solved or none of
+        them helps. Return True if the board was solved. With until (a list
+        of cells), also stop and return True once all of those are filled.
+        """
+        cells = self.cells
+        while self.consistent and not self.solved():
+            if until is not None and all(cells[i] for i in until):
+                return True
+            for name in techniques:
+                if getattr(self, name)():
+                    self.used[name] = self.used.get(name, 0) + 1
+                    self.check()
+                    break
+            else:
+                break
+        return self.consistent and self.solved()
+
+    def hardest(self):
+        """Return the hardest technique used so far, or None if none was needed."""
+        used = [name for name in TECHNIQUES if name in self.used]
+        return used[-1] if used else None
+
+
+def grade(board):
+    """
+    Return the hardest technique needed to solve board by logic, SEARCH when
+    logic alone can't finish it, or None when the board is contradictory.
+    """
+    logic = LogicSolver(board)
+    if logic.solve():
+        return logic.hardest() or TECHNIQUES[0]
+    return SEARCH if logic.consistent else None
+
+
+def difficulty_of(board):
+    """Return "easy", "medium" or "hard" for board from its grade (None when contradictory)."""
+    hardest = grade(board)
+    return None if hardest is None else GRADE_DIFFICULTY[hardest]
@@ -0,0 +1,396 @@
+"""
+Sudoku Portfolio Solver
+Races several solver configurations on the same puzzle in worker processes:
+different backends, cell orders, digit orders and randomized restarts. The
+first definitive answer (solved or unsolvable) wins and the other workers are
+stopped through a shared Event. A single fixed strategy can be thousands of
+times slower on an unlucky puzzle than another one, so racing a few of them
+cuts the tail. Easy cases don't pay for the race: the first strategy gets a
+small node budget in the calling process first, and the worker processes are
+started once and kept for the next races.
+
+Orders are changed without touching the engines: the puzzle is reshuffled
+into an equivalent one (rows and columns moved inside their bands and
+stacks, digits relabeled), solved as is, and the solution is mapped back.
+Relabeling digits changes the order digits are tried in, moving rows and
+columns changes the order cells are visited and how ties are broken.
+"""
+
+import json
+import os
+import random
+import time
+
+from board import Board
+from budget import SearchBudget, SolveResult, EventToken, EXHAUSTED
+from geometry import box_for_cells
+from solver import SudokuSolver, BACKENDS
+
+DEFAULT_STATS_PATH = os.path.join(os.path.expanduser("~"), ".sudoku_solver", "portfolio_stats.json")
+
+# Digit orders and cell orders a Strategy can use
+VALUE_ORDERS = ("ascending", "descending", "random")
+CELL_ORDERS = ("row-major", "reversed", "transposed", "random")
+
+# Seconds between two checks of the cancel token and the deadline while the race runs
+POLL_INTERVAL = 0.05
+
+# Nodes the first strategy gets in the calling process before the race starts
+QUICK_NODES = 1000
+
+
+class Strategy:
+
+    def __init__(self, name, backend="bitmask", values="ascending", cells="row-major", seed=0):
+        """
+        One configuration of the portfolio. name identifies it in the win
+        statistics, backend is one of solver.BACKENDS, values one of
+        VALUE_ORDERS and cells one of CELL_ORDERS; seed drives the "random"
+        orders, so the same strategy always searches the same way.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+        if values not in VALUE_ORDERS:
+            raise ValueError(f"Unknown value order {values!r}, expected one of {VALUE_ORDERS}")
+        if cells not in CELL_ORDERS:
+            raise ValueError(f"Unknown cell order {cells!r}, expected one of {CELL_ORDERS}")
+        self.name = name
+        self.backend = backend
+        self.values = values
+        self.cells = cells
+        self.seed = seed
+
+    def reorder(self, box):
+        """Return the Reorder of this strategy for boards with box x box boxes."""
+        n = box * box
+        rng = random.Random(self.seed)
+
+        digits = list(range(n + 1))
+        if self.values == "descending":
+            digits = [0] + list(range(n, 0, -1))
+        elif self.values == "random":
+            digits[1:] = rng.sample(range(1, n + 1), n)
+
+        lines = list(range(n))
+        rows, cols, transpose = lines, lines, False
+        if self.cells == "reversed":
+            rows = cols = lines[::-1]
+        elif self.cells == "transposed":
+            transpose = True
+        elif self.cells == "random":
+            def shuffled():
+                bands = rng.sample(range(box), box)
+                return [box * band + k for band in bands for k in rng.sample(range(box), box)]
+            rows, cols, transpose = shuffled(), shuffled(), rng.random() < 0.5
+
+        cells = []
+        for r in range(n):
+            for c in range(n):
+                src_r, src_c = rows[r], cols[c]
+                cells.append(src_c * n + src_r if transpose else src_r * n + src_c)
+        return Reorder(cells, digits)
+
+    def __repr__(self):
+        return f"Strategy({self.name!r}, {self.backend!r}, values={self.values!r}, cells={self.cells!r}, seed={self.seed})"
+
+
+def randomized(backend, count, seed=0):
+    """Return count randomized restarts of backend: random cell and digit orders, one seed each."""
+    return [Strategy(f"{backend}-random-{k}", backend, "random", "random", seed + k) for k in range(count)]
+
+
+# The default portfolio: logic and dlx as they are, bitmask search with both
+# orders turned around, column-major backtracking and two randomized restarts
+DEFAULT_STRATEGIES = (
+    Strategy("logic", "logic"),
+    Strategy("dlx", "dlx"),
+    Strategy("bitmask-reversed", "bitmask", "descending", "reversed"),
+    Strategy("backtracking-transposed", "backtracking", "ascending", "transposed"),
+) + tuple(randomized("bitmask", 2))
+
+
+class Reorder:
+
+    __slots__ = ("cells", "digits")
+
+    def __init__(self, cells, digits):
+        """
+        cells[i] is the cell of the input that lands in cell i of the output,
+        digits[d] the digit d becomes (digits[0] is always 0).
+        """
+        self.cells = cells
+        self.digits = digits
+
+    def apply(self, board):
+        """Return the reordered copy of a Board."""
+        cells, digits = board.cells, self.digits
+        return Board(bytearray(digits[cells[i]] for i in self.cells))
+
+    def undo(self, board):
+        """Return the Board this one was reordered from."""
+        original = [0] * len(self.digits)
+        for d, new in enumerate(self.digits):
+            original[new] = d
+        out = bytearray(len(self.cells))
+        for i, src in enumerate(self.cells):
+            out[src] = original[board.cells[i]]
+        return Board(out)
+
+
+# Set in race worker processes by _init_race_worker
+_race_stop = None
+
+
+def _init_race_worker(stop):
+    """Pool initializer of race(): every search of this worker stops once stop (an Event) is set."""
+    global _race_stop
+    _race_stop = stop
+
+
+def _run_strategy(strategy, text, max_nodes, deadline_at, token):
+    """Solve one reordered copy of the puzzle, return (status, solution string, nodes, reason)."""
+    puzzle = Board.from_string(text)
+    reorder = strategy.reorder(box_for_cells(len(puzzle)))
+    solver = SudokuSolver(reorder.apply(puzzle), strategy.backend)
+    deadline = None if deadline_at is None else max(0.0, deadline_at - time.monotonic())
+    result = solver.solve(max_nodes, deadline, token)
+    solution = reorder.undo(result.board).to_string() if result.solved else None
+    return result.status, solution, result.nodes, result.reason
+
+
+def _race_worker(strategy, text, max_nodes, deadline_at):
+    """Worker side of race(): run one strategy, stopping when the race is over."""
+    # A new token each time: a token stays cancelled once it saw the Event set,
+    # and the worker lives on for the next races
+    return _run_strategy(strategy, text, max_nodes, deadline_at, EventToken(_race_stop))
+
+
+# The worker pool is started by the first race that needs it and kept for the
+# next ones: starting processes costs more than most solves
+_pool = None
+_pool_size = 0
+_stop = None
+
+
+def _pool_size_for(workers, strategies):
+    """Processes race() uses: workers, by default one per strategy but no more than the cores."""
+    if workers is None:
+        # More processes than cores only split the cores between them
+        workers = min(len(strategies), os.cpu_count() or 1)
+    return max(1, workers)
+
+
+def _race_pool(workers):
+    """Return (pool, stop Event) with workers processes, starting or resizing it when needed."""
+    global _pool, _pool_size, _stop
+    if _pool is None or _pool_size != workers:
+        shutdown()
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import Event
+        _stop = Event()
+        _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_race_worker, initargs=(_stop,))
+        _pool_size = workers
+    return _pool, _stop
+
+
+def start(workers=None, strategies=DEFAULT_STRATEGIES):
+    """Start the worker processes race() would use now, so the first race doesn't wait for them."""
+    from concurrent.futures import wait
+
+    pool, _ = _race_pool(_pool_size_for(workers, strategies))
+    wait([pool.submit(int) for _ in range(_pool_size)])
+
+
+def shutdown():
+    """Stop the worker processes kept between races (the next race starts new ones)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+class PortfolioStats:
+
+    def __init__(self, path=None):
+        """
+        Win counts of the strategies over many races, loaded from path when
+        given (DEFAULT_STATS_PATH is the usual place). wins[name] is how many
+        races a strategy won and win_time[name] the seconds those took.
+        """
+        self.path = path
+        self.races = 0
+        self.wins = {}
+        self.win_time = {}
+        self.load()
+
+    def record(self, name, elapsed):
+        """Count a race won by the strategy called name in elapsed seconds."""
+        self.races += 1
+        self.wins[name] = self.wins.get(name, 0) + 1
+        self.win_time[name] = self.win_time.get(name, 0.0) + elapsed
+
+    def ranked(self, strategies):
+        """Return strategies sorted by wins, most first; ties keep their order."""
+        return sorted(strategies, key=lambda strategy: -self.wins.get(strategy.name, 0))
+
+    def load(self):
+        """Read the counts saved by a previous session. A missing or broken file keeps them at zero."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+            races = int(saved["races"])
+            wins = {name: int(n) for name, n in saved["wins"].items()}
+            win_time = {name: float(t) for name, t in saved["win_time"].items()}
+        except (OSError, ValueError, KeyError, AttributeError, TypeError):
+            return
+        self.races, self.wins, self.win_time = races, wins, win_time
+
+    def save(self):
+        """Write the counts to disk."""
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.as_dict(), f)
+        os.replace(tmp_path, self.path)
+
+    def as_dict(self):
+        """Return the counts as a plain dict (for logging or JSON)."""
+        return {"races": self.races, "wins": dict(self.wins), "win_time": dict(self.win_time)}
+
+    def lines(self):
+        """Lines of text, one per strategy that won at least once, most wins first."""
+        lines = []
+        for name, wins in sorted(self.wins.items(), key=lambda item: -item[1]):
+            share = wins / self.races * 100 if self.races else 0.0
+            mean = self.win_time[name] / wins * 1000
+            lines.append(f"{name:28} {wins:>7} wins {share:5.1f}%  mean {mean:.3f} ms")
+        return lines
+
+
+def race(board, strategies=DEFAULT_STRATEGIES, workers=None, max_nodes=None, deadline=None, token=None,
+         stats=None):
+    """
+    Solve board (a Board) with every strategy at once and return a
+    SolveResult whose strategy is the name of the winner (None when nobody
+    won). The first strategy to report solved or unsolvable wins and the
+    others are stopped.
+
+    The first strategy gets QUICK_NODES nodes in this process before any
+    worker is involved: most puzzles are done by then and never pay for
+    talking to other processes. Only when that runs out do all of them race
+    in a pool of worker processes kept between races.
+
+    workers caps how many strategies run at the same time (None for one per
+    core, up to all of them); the next one starts when a worker gives up.
+    max_nodes is the budget of each strategy, deadline (seconds) and token (a
+    CancelToken) bound the whole race. A strategy whose worker fails counts as
+    having lost. When every strategy ran out of nodes (or failed), or the race
+    is stopped, the result is EXHAUSTED. With a PortfolioStats as stats,
+    strategies that won most often start first and the win is recorded.
+    """
+    start = time.perf_counter()
+    budget = SearchBudget(deadline=deadline, token=token)
+    if stats is not None:
+        strategies = stats.ranked(strategies)
+    strategies = list(strategies)
+    if not strategies:
+        raise ValueError("The portfolio needs at least one strategy")
+    workers = _pool_size_for(workers, strategies)
+    text = board.to_string()
+
+    def result(status, solution=None, nodes=0, reason=None, winner=None):
+        return SolveResult(status, solution, nodes, time.perf_counter() - start, reason, strategy=winner)
+
+    def won(strategy, status, solution, nodes):
+        if stats is not None:
+            stats.record(strategy.name, time.perf_counter() - start)
+        solution = Board.from_string(solution) if solution is not None else None
+        return result(status, solution, nodes, winner=strategy.name)
+
+    # Quick try in this process
+    first = strategies[0]
+    quick = QUICK_NODES if max_nodes is None else min(QUICK_NODES, max_nodes)
+    status, solution, nodes, reason = _run_strategy(first, text, quick, budget.deadline_at, token)
+    if status != EXHAUSTED:
+        return won(first, status, solution, nodes)
+    if reason != "max_nodes":
+        return result(EXHAUSTED, nodes=nodes, reason=reason)
+    if quick == max_nodes:
+        strategies = strategies[1:]  # it already had its whole budget
+        if not strategies:
+            return result(EXHAUSTED, nodes=nodes, reason=reason)
+    else:
+        strategies = strategies[1:] + [first]  # it had a head start, the others go first
+
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    from concurrent.futures.process import BrokenProcessPool
+
+    pool, stop = _race_pool(workers)
+    pending = {}  # future -> (strategy, True when it has a pool of its own)
+    orphans, solo_pools, lost = [], [], 0
+
+    def submit(strategy, executor, alone=False):
+        pending[executor.submit(_race_worker, strategy, text, max_nodes, budget.deadline_at)] = strategy, alone
+
+    try:
+        try:
+            for strategy in strategies:
+                submit(strategy, pool)
+        except BrokenProcessPool:
+            # A worker of the kept pool died since the last race
+            shutdown()
+            pool, stop = _race_pool(workers)
+            pending.clear()
+            for strategy in strategies:
+                submit(strategy, pool)
+
+        while pending:
+            if token is not None and token.cancelled:
+                return result(EXHAUSTED, nodes=nodes, reason="cancelled")
+            if budget.remaining_time() == 0:
+                return result(EXHAUSTED, nodes=nodes, reason="deadline")
+
+            done, _ = wait(pending, POLL_INTERVAL, FIRST_COMPLETED)
+            for future in done:
+                strategy, alone = pending.pop(future)
+                try:
+                    status, solution, worker_nodes, worker_reason = future.result()
+                except BrokenProcessPool:
+                    if alone:
+                        lost += 1  # its own worker died
+                    else:
+                        orphans.append(strategy)
+                    continue
+                except Exception:
+                    lost += 1  # the strategy raised: it is out, the others go on
+                    continue
+                nodes += worker_nodes
+                if status != EXHAUSTED:
+                    return won(strategy, status, solution, worker_nodes)
+                if worker_reason != "max_nodes":
+                    reason = worker_reason
+
+            if orphans and all(alone for _, alone in pending.values()):
+                # A worker process died and took the kept pool down with it.
+                # There is no telling which strategy did it, so the ones that
+                # were still out go on in a process each
+                shutdown()
+                for strategy in orphans:
+                    solo_pools.append(ProcessPoolExecutor(1, initializer=_init_race_worker, initargs=(stop,)))
+                    submit(strategy, solo_pools[-1], alone=True)
+                orphans = []
+        return result(EXHAUSTED, nodes=nodes, reason="failed" if lost == len(strategies) else reason)
+    finally:
+        # Losers still running give up at their next nodes; they have to be
+        # gone before the Event is cleared for the next race
+        stop.set()
+        for future in pending:
+            future.cancel()
+        wait(pending)
+        stop.clear()
+        for solo in solo_pools:
+            solo.shutdown()
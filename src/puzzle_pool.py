@@ -0,0 +1,163 @@
+"""
+Sudoku Puzzle Pool
+Keeps a stock of ready puzzles per difficulty, topped up to a watermark by a
+background worker process and saved to disk between sessions.
+"""
+
+import json
+import multiprocessing
+import os
+import queue
+from collections import deque
+
+from board import Board
+from conflicts import ConflictTracker
+from generator import PuzzleGenerator, DIFFICULTY_REMOVALS
+
+DEFAULT_POOL_PATH = os.path.join(os.path.expanduser("~"), ".sudoku_solver", "puzzle_pool.json")
+
+
+def _pool_worker(requests, results):
+    """Worker process: generate one puzzle per requested difficulty until told to stop (None)."""
+    generator = PuzzleGenerator()
+    while True:
+        difficulty = requests.get()
+        if difficulty is None:
+            break
+        puzzle, solution = generator.generate(difficulty, max_attempts=None)
+        results.put((difficulty, puzzle.to_string(), solution.to_string()))
+
+
+def _valid_entry(entry):
+    """True for a saved [puzzle, solution] of 9x9 strings: a complete solution the puzzle's clues agree with."""
+    if not isinstance(entry, (list, tuple)) or len(entry) != 2:
+        return False
+    if not all(isinstance(text, str) for text in entry):
+        return False
+    try:
+        puzzle, solution = Board.from_string(entry[0]), Board.from_string(entry[1])
+    except ValueError:
+        return False
+    if len(puzzle.cells) != 81 or len(solution.cells) != 81:
+        return False
+    if not ConflictTracker(solution).is_complete():
+        return False
+    return all(num in (0, answer) for num, answer in zip(puzzle.cells, solution.cells))
+
+
+class PuzzlePool:
+
+    def __init__(self, path=DEFAULT_POOL_PATH, watermark=5):
+        """
+        Load the saved pool from path (if any). The worker keeps each difficulty
+        filled up to watermark puzzles once start() is called. path=None keeps
+        the pool in memory only.
+        """
+        self.path = path
+        self.watermark = watermark
+        self.puzzles = {difficulty: deque() for difficulty in DIFFICULTY_REMOVALS}
+        self.requested = {difficulty: 0 for difficulty in DIFFICULTY_REMOVALS}
+
+        self.requests = None
+        self.results = None
+        self.worker = None
+        self.load()
+
+    def load(self):
+        """
+        Read puzzles saved by a previous session. A missing or broken file gives
+        an empty pool, and entries that aren't a valid puzzle and solution are
+        dropped.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if not isinstance(saved, dict):
+            return
+        for difficulty, entries in saved.items():
+            if difficulty in self.puzzles and isinstance(entries, list):
+                self.puzzles[difficulty].extend(tuple(entry) for entry in entries if _valid_entry(entry))
+
+    def save(self):
+        """Write the puzzles currently in stock to disk."""
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({d: list(entries) for d, entries in self.puzzles.items()}, f)
+        os.replace(tmp_path, self.path)
+
+    def start(self):
+        """Start the background worker process and ask it to fill the pool."""
+        if self.worker is not None:
+            return
+        self.requests = multiprocessing.Queue()
+        self.results = multiprocessing.Queue()
+        self.requested = {difficulty: 0 for difficulty in DIFFICULTY_REMOVALS}
+        self.worker = multiprocessing.Process(target=_pool_worker, args=(self.requests, self.results), daemon=True)
+        self.worker.start()
+        self.top_up()
+
+    def top_up(self):
+        """Request enough puzzles to bring every difficulty back to the watermark."""
+        if self.worker is None:
+            return
+        for difficulty, stock in self.puzzles.items():
+            while len(stock) + self.requested[difficulty] < self.watermark:
+                self.requests.put(difficulty)
+                self.requested[difficulty] += 1
+
+    def collect(self):
+        """
+        Move every puzzle the worker has finished so far into the pool (never
+        blocks). A worker that died is replaced by a new one, which gets asked
+        again for the puzzles the old one still owed.
+        """
+        if self.worker is None:
+            return
+        self._drain()
+        if not self.worker.is_alive():
+            self.worker = None
+            self.start()
+
+    def _drain(self):
+        """Take the finished puzzles off the results queue."""
+        while True:
+            try:
+                difficulty, puzzle, solution = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.requested[difficulty] -= 1
+            self.puzzles[difficulty].append((puzzle, solution))
+
+    def pop(self, difficulty):
+        """
+        Return (puzzle, solution) Boards for the difficulty, or None if the pool
+        has none ready (the caller should then generate one on the spot).
+        """
+        self.collect()
+        stock = self.puzzles[difficulty]
+        entry = stock.popleft() if stock else None
+        self.top_up()
+
+        if entry is None:
+            return None
+        puzzle, solution = entry
+        return Board.from_string(puzzle), Board.from_string(solution)
+
+    def close(self):
+        """Stop the worker and save what is in stock for the next session."""
+        if self.worker is not None:
+            self._drain()
+            self.requests.put(None)
+            self.worker.join(timeout=1)
+            if self.worker.is_alive():
+                self.worker.terminate()
+            self.worker = None
+        self.save()
@@ -0,0 +1,291 @@
+"""
+Sudoku Puzzle Store
+A compact on-disk puzzle database. Cells are packed 4 bits each, so a puzzle
+takes 41 bytes and puzzle plus solution 82; every record also carries the
+clue count, the logic grade and the seed that regenerates it. Records have a
+fixed size after a fixed header, so record i is read in O(1) straight from
+an mmap of the file, and one sidecar index per difficulty (a flat list of
+record numbers) lets a random puzzle of any difficulty be drawn without
+reading the rest of the file.
+
+File layout (little endian):
+    header   16 bytes: magic "SUDOKUDB", version (u16), record size (u16), 4 reserved
+    records  RECORD_SIZE bytes each: puzzle (41), solution (41), clues (u8),
+             grade (u8, index in GRADES), seed (u64)
+Index files <path>.<difficulty>.idx hold u32 record numbers.
+"""
+
+import mmap
+import os
+import random
+import struct
+
+from board import Board
+from logic import TECHNIQUES, SEARCH, GRADE_DIFFICULTY, DIFFICULTIES, grade as logic_grade
+
+MAGIC = b"SUDOKUDB"
+VERSION = 1
+HEADER = struct.Struct("<8sHH4x")
+RECORD = struct.Struct("<41s41sBBQ")
+RECORD_SIZE = RECORD.size  # 92
+INDEX_ENTRY = struct.Struct("<I")
+
+# Grade byte: position in GRADES, or UNKNOWN
+GRADES = TECHNIQUES + (SEARCH,)
+UNKNOWN = 255
+NO_SEED = (1 << 64) - 1
+
+DEFAULT_STORE_PATH = os.path.join(os.path.expanduser("~"), ".sudoku_solver", "puzzles.sdb")
+
+# Nibble tables for packing and unpacking
+_HIGH = bytes((b << 4) & 0xFF for b in range(256))
+_TOP = bytes(b >> 4 for b in range(256))
+_BOTTOM = bytes(b & 0x0F for b in range(256))
+
+
+def pack_cells(cells):
+    """Pack 81 cell values (0..9) into 41 bytes, two cells per byte, high nibble first."""
+    cells = bytes(cells)
+    high = cells[0::2].translate(_HIGH)
+    low = cells[1::2] + b"\0"
+    # No nibble carries into its neighbour, so one big OR joins them all
+    return (int.from_bytes(high, "big") | int.from_bytes(low, "big")).to_bytes(41, "big")
+
+
+def unpack_cells(data):
+    """Inverse of pack_cells: return the 81 cell values as a bytearray."""
+    cells = bytearray(82)
+    cells[0::2] = data.translate(_TOP)
+    cells[1::2] = data.translate(_BOTTOM)
+    del cells[81]
+    return cells
+
+
+class StoredPuzzle:
+
+    __slots__ = ("index", "puzzle", "solution", "clues", "grade", "seed")
+
+    def __init__(self, index, puzzle, solution, clues, grade, seed):
+        self.index = index        # record number in the store
+        self.puzzle = puzzle      # Board
+        self.solution = solution  # Board
+        self.clues = clues
+        self.grade = grade        # hardest technique (see logic.py), SEARCH, or None if unknown
+        self.seed = seed          # PuzzleGenerator seed that rebuilds it, or None
+
+    @property
+    def difficulty(self):
+        return None if self.grade is None else GRADE_DIFFICULTY[self.grade]
+
+    def __repr__(self):
+        return f"StoredPuzzle({self.index}, {self.puzzle.to_string()!r}, grade={self.grade!r}, seed={self.seed})"
+
+
+class PuzzleStore:
+
+    def __init__(self, path=DEFAULT_STORE_PATH, writable=True):
+        """
+        Open the store at path, creating it if writable and missing. A read-only
+        store sees records appended by a writer in another process as they
+        are flushed.
+        """
+        self.path = path
+        self.writable = writable
+        self.index_paths = {d: f"{path}.{d}.idx" for d in DIFFICULTIES}
+
+        if writable and not os.path.exists(path):
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE))
+            for index_path in self.index_paths.values():
+                open(index_path, "wb").close()
+
+        self.file = open(path, "r+b" if writable else "rb")
+        magic, version, record_size = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            self.file.close()
+            raise ValueError(f"{path} is not a version {VERSION} puzzle store")
+
+        self.map = None
+        self.index_maps = {}
+        self.index_files = {}
+        self.records = self._records_on_disk()  # kept up to date by append() when writable
+        if writable:
+            self._check_indexes()
+            self.file.seek(HEADER.size + self.records * RECORD_SIZE)
+            self.index_files = {d: open(p, "ab") for d, p in self.index_paths.items()}
+
+    # Reading
+
+    def _records_on_disk(self):
+        return (os.fstat(self.file.fileno()).st_size - HEADER.size) // RECORD_SIZE
+
+    def _view(self, index):
+        """Return an mmap covering record index, remapping if the file grew since."""
+        end = HEADER.size + (index + 1) * RECORD_SIZE
+        if self.map is None or len(self.map) < end:
+            if self.writable:
+                self.file.flush()
+            if self.map is not None:
+                self.map.close()
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self.map) < end:
+                raise IndexError(f"record {index} out of range")
+        return self.map
+
+    def __len__(self):
+        if self.writable:
+            return self.records
+        return self._records_on_disk()
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if index < 0:
+            raise IndexError(f"record {index} out of range")
+        puzzle, solution, clues, grade, seed = RECORD.unpack_from(self._view(index), HEADER.size + index * RECORD_SIZE)
+        return StoredPuzzle(index, Board(unpack_cells(puzzle)), Board(unpack_cells(solution)), clues,
+                            None if grade == UNKNOWN else GRADES[grade], None if seed == NO_SEED else seed)
+
+    def _index_map(self, difficulty):
+        """Return an up to date mmap of the index file of difficulty (None while it is empty)."""
+        if self.writable:
+            self.index_files[difficulty].flush()
+        path = self.index_paths[difficulty]
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        size -= size % INDEX_ENTRY.size
+        current = self.index_maps.get(difficulty)
+        if current is None or len(current) < size:
+            if current is not None:
+                current.close()
+            if size == 0:
+                return None
+            with open(path, "rb") as f:
+                current = self.index_maps[difficulty] = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        return current
+
+    def count(self, difficulty=None):
+        """Number of records, or of records of one difficulty."""
+        if difficulty is None:
+            return len(self)
+        index = self._index_map(difficulty)
+        return 0 if index is None else len(index) // INDEX_ENTRY.size
+
+    def sample(self, difficulty=None, rng=random):
+        """
+        Return a random StoredPuzzle, of the given difficulty if one is given,
+        or None if the store has none. Only the index entry and the record
+        drawn are read.
+        """
+        if difficulty is None:
+            total = len(self)
+            return self[rng.randrange(total)] if total else None
+
+        index = self._index_map(difficulty)
+        if index is None:
+            return None
+
+        # Entries come in record order: skip the last few if a writer flushed
+        # them before their records
+        total = len(self)
+        entries = len(index) // INDEX_ENTRY.size
+        while entries and INDEX_ENTRY.unpack_from(index, (entries - 1) * INDEX_ENTRY.size)[0] >= total:
+            entries -= 1
+        if not entries:
+            return None
+        k = rng.randrange(entries)
+        return self[INDEX_ENTRY.unpack_from(index, k * INDEX_ENTRY.size)[0]]
+
+    # Writing
+
+    def append(self, puzzle, solution, grade=None, seed=None):
+        """
+        Add a puzzle and its solution (Boards) and return its record number.
+        grade is the hardest technique it needs (see logic.grade, worked out
+        here when not given); seed the PuzzleGenerator seed that rebuilds it.
+        """
+        if not self.writable:
+            raise ValueError("store opened read-only")
+        if grade is None:
+            grade = logic_grade(puzzle)
+        index = self.records
+        self.file.write(RECORD.pack(pack_cells(puzzle.cells), pack_cells(solution.cells), puzzle.count_filled(),
+                                    GRADES.index(grade) if grade is not None else UNKNOWN,
+                                    NO_SEED if seed is None else seed))
+        self.records += 1
+        if grade is not None:
+            self.index_files[GRADE_DIFFICULTY[grade]].write(INDEX_ENTRY.pack(index))
+        return index
+
+    def flush(self):
+        """Push buffered records to disk (records before their index entries)."""
+        if not self.writable:
+            return
+        self.file.flush()
+        for f in self.index_files.values():
+            f.flush()
+
+    def _check_indexes(self):
+        """
+        Drop a half-written last record and rebuild the index files if they don't
+        match the records (both only happen after a crash). Records without a
+        grade aren't indexed, so they always trigger a rebuild; a file holding
+        them is better filled with graded records.
+        """
+        self.file.truncate(HEADER.size + self.records * RECORD_SIZE)
+        indexed = sum(os.path.getsize(p) // INDEX_ENTRY.size for p in self.index_paths.values() if os.path.exists(p))
+        if indexed == self.records:
+            return
+
+        entries = {d: bytearray() for d in DIFFICULTIES}
+        for index in range(self.records):
+            self.file.seek(HEADER.size + index * RECORD_SIZE + 83)  # grade byte
+            grade = self.file.read(1)[0]
+            if grade != UNKNOWN:
+                entries[GRADE_DIFFICULTY[GRADES[grade]]] += INDEX_ENTRY.pack(index)
+        for difficulty, data in entries.items():
+            with open(self.index_paths[difficulty], "wb") as f:
+                f.write(data)
+
+    def close(self):
+        """Flush and close the store."""
+        self.flush()
+        for f in self.index_files.values():
+            f.close()
+        for m in self.index_maps.values():
+            m.close()
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def fill(store, difficulty, count, seed=None, flush_every=100):
+    """
+    Generate count puzzles of difficulty into store. Each puzzle gets its own
+    seed drawn from seed, so StoredPuzzle.seed regenerates it exactly with
+    PuzzleGenerator(seed).generate(difficulty); seeds it gives up on are
+    skipped.
+    """
+    from generator import PuzzleGenerator, GenerationFailed
+
+    rng = random.Random(seed)
+    n = 0
+    while n < count:
+        puzzle_seed = rng.getrandbits(63)
+        try:
+            puzzle, solution = PuzzleGenerator(puzzle_seed).generate(difficulty)
+        except GenerationFailed:
+            continue
+        n += 1
+        store.append(puzzle, solution, seed=puzzle_seed)
+        if n % flush_every == 0:
+            store.flush()
+    store.flush()
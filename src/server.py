@@ -0,0 +1,328 @@
+"""
+Sudoku Solving Service
+A local asyncio server so several programs can share one solver instead of
+each blocking its own thread on SudokuSolver.
+
+Protocol (TCP or Unix socket), one request per line:
+    client: an 81-char puzzle ('0' or '.' for empty cells)
+    server: the 81-char solution, or "ERR <reason>" where reason is
+            "invalid" (not a puzzle), "unsolvable", "budget" (gave up on it
+            after the per-puzzle node or time budget), "busy" (overloaded)
+            or "internal" (the solver failed)
+Requests can be pipelined; answers come back in the order they were sent.
+
+Puzzles from all connections are collected into micro-batches for
+solve_batch (batch.py), which runs in a process pool. The queue in front of
+the batcher is bounded: once it is full new requests get "ERR busy" right
+away, so memory stays flat however hard the server is pushed.
+
+Usage (from the src folder):
+    python server.py --port 8765
+    python server.py --unix /tmp/sudoku.sock
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Requests a single connection may have in flight before the server stops reading from it
+PIPELINE_DEPTH = 64
+
+# Longest request line accepted (an 81-char puzzle plus a \r\n)
+MAX_LINE = 128
+
+# Seconds of search a single puzzle may take before it gets "ERR budget", so a
+# pathological one can't hold a worker (and the rest of its batch) for long
+PUZZLE_DEADLINE = 1.0
+
+# Returned by _solve_texts for a puzzle that ran out of budget
+BUDGET = "budget"
+
+PUZZLE_CHARS = frozenset("0123456789.")
+
+
+class Overloaded(Exception):
+    """Raised by SolveService.submit when the request queue is full."""
+
+
+def _warm_up():
+    """Worker side: load the batched solver (and numpy) before the first request."""
+    import batch  # noqa: F401
+
+
+def _solve_texts(texts, backend, max_nodes, deadline):
+    """
+    Worker side: solve a micro-batch of puzzle strings, each within the
+    budget. Return their solutions, None for unsolvable ones and BUDGET for
+    the ones that ran out of it.
+    """
+    from batch import solve_batch
+
+    grids, solved, exhausted = solve_batch(texts, backend, max_nodes=max_nodes, deadline=deadline)
+    flat = grids.reshape(len(texts), 81) + ord("0")
+    return [flat[k].tobytes().decode("ascii") if solved[k] else BUDGET if exhausted[k] else None
+            for k in range(len(texts))]
+
+
+class SolveService:
+
+    def __init__(self, workers=None, batch_size=256, batch_delay=0.002, max_queue=4096, backend="logic",
+                 max_nodes=None, deadline=PUZZLE_DEADLINE):
+        """
+        workers processes (all cores by default) solve micro-batches of up to
+        batch_size puzzles. A batch is sent once it is full or batch_delay
+        seconds after its first puzzle arrived. At most max_queue puzzles wait
+        for a batch; past that submit() raises Overloaded. Each puzzle gets at
+        most max_nodes search nodes and deadline seconds (None for no limit).
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_queue = max_queue
+        self.backend = backend
+        self.max_nodes = max_nodes
+        self.deadline = deadline
+
+        self.queue = None
+        self.pool = None
+        self.batcher = None
+        self.in_flight = None
+
+        # Counters
+        self.accepted = 0
+        self.rejected = 0
+        self.batches = 0
+        self.solved = 0
+        self.exhausted = 0
+
+    async def start(self):
+        self.queue = asyncio.Queue(self.max_queue)
+        # Two batches per worker: one being solved, one ready to go
+        self.in_flight = asyncio.Semaphore(2 * self.workers)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        # Start every worker now, before any socket is open for them to inherit
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _warm_up) for _ in range(self.workers)))
+        self.batcher = asyncio.create_task(self._run_batcher())
+
+    async def stop(self):
+        self.batcher.cancel()
+        try:
+            await self.batcher
+        except asyncio.CancelledError:
+            pass
+        self.pool.shutdown(cancel_futures=True)
+
+    def submit(self, text):
+        """
+        Queue a validated puzzle string and return a future for its solution
+        string (None when unsolvable, BUDGET when it ran out of budget). Raise
+        Overloaded if the queue is full.
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((text, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise Overloaded() from None
+        self.accepted += 1
+        return future
+
+    async def _run_batcher(self):
+        """Collect queued puzzles into batches and hand them to the pool."""
+        loop = asyncio.get_running_loop()
+        while True:
+            # Wait for a free pool slot first, so puzzles keep piling up in the
+            # (bounded) queue while every worker is busy and the batches get bigger
+            await self.in_flight.acquire()
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(batch) < self.batch_size:
+                if self.queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self.queue.get_nowait())
+
+            self.batches += 1
+            asyncio.create_task(self._solve(batch))
+
+    async def _solve(self, batch):
+        try:
+            texts = [text for text, _ in batch]
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.pool, _solve_texts, texts, self.backend, self.max_nodes, self.deadline)
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        finally:
+            self.in_flight.release()
+
+        for (_, future), solution in zip(batch, results):
+            if solution == BUDGET:
+                self.exhausted += 1
+            elif solution is not None:
+                self.solved += 1
+            # A client that went away may have left its futures cancelled
+            if not future.done():
+                future.set_result(solution)
+
+    def stats(self):
+        """Return the counters as a plain dict."""
+        return {
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "solved": self.solved,
+            "exhausted": self.exhausted,
+            "batches": self.batches,
+            "mean_batch": round(self.accepted / self.batches, 1) if self.batches else 0.0,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+        }
+
+
+def _answer(service, line):
+    """Turn one request line into a future for its answer line (without the newline)."""
+    loop = asyncio.get_running_loop()
+    text = line.strip().decode("ascii", "replace")
+    answer = loop.create_future()
+
+    if len(text) != 81 or not PUZZLE_CHARS.issuperset(text):
+        answer.set_result("ERR invalid")
+        return answer
+    try:
+        solution = service.submit(text)
+    except Overloaded:
+        answer.set_result("ERR busy")
+        return answer
+
+    def done(future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            answer.set_result("ERR internal")
+        elif future.result() == BUDGET:
+            answer.set_result("ERR budget")
+        else:
+            answer.set_result(future.result() or "ERR unsolvable")
+    solution.add_done_callback(done)
+    return answer
+
+
+async def handle_client(service, reader, writer):
+    """Serve one connection: read requests, write answers back in order."""
+    # The queue bound makes a client that pipelines too far wait for its own
+    # answers before more of its lines are read
+    answers = asyncio.Queue(PIPELINE_DEPTH)
+
+    async def write_answers():
+        while True:
+            answer = await answers.get()
+            if answer is None:
+                break
+            writer.write((await answer).encode("ascii") + b"\n")
+            if answers.empty():
+                await writer.drain()
+
+    sender = asyncio.create_task(write_answers())
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except (ValueError, asyncio.LimitOverrunError):
+                break  # line too long, not a client of this protocol
+            if not line:
+                break
+            if line.strip():
+                await answers.put(_answer(service, line))
+        await answers.put(None)
+        await sender
+    except (ConnectionError, asyncio.CancelledError):
+        sender.cancel()
+    finally:
+        writer.close()
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None, ready=None, **options):
+    """
+    Run the service until cancelled. options go to SolveService. ready, if
+    given, is an asyncio.Event set once the socket is listening.
+
+    SIGINT and SIGTERM stop it cleanly. Event loops without signal handlers
+    (the Proactor loop on Windows) get a plain signal.signal handler for
+    SIGTERM instead, and Ctrl+C comes through asyncio.run as KeyboardInterrupt,
+    which main() handles.
+    """
+    service = SolveService(**options)
+    await service.start()
+
+    def on_connect(reader, writer):
+        return handle_client(service, reader, writer)
+
+    if unix:
+        server = await asyncio.start_unix_server(on_connect, unix, limit=MAX_LINE)
+        where = unix
+    else:
+        server = await asyncio.start_server(on_connect, host, port, limit=MAX_LINE)
+        where = f"{host}:{server.sockets[0].getsockname()[1]}"
+
+    # SIGTERM stops the server cleanly, like Ctrl+C
+    loop = asyncio.get_running_loop()
+    serving = asyncio.ensure_future(server.serve_forever())
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, serving.cancel)
+        except NotImplementedError:
+            if sig == signal.SIGTERM:
+                signal.signal(sig, lambda signum, frame: loop.call_soon_threadsafe(serving.cancel))
+
+    print(f"Solving on {where} with {service.workers} workers", flush=True)
+    if ready is not None:
+        ready.set()
+    started = time.perf_counter()
+    try:
+        await serving
+    except asyncio.CancelledError:
+        pass
+    finally:
+        server.close()
+        await service.stop()
+        print(f"Stopped after {time.perf_counter() - started:.1f}s: {service.stats()}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Sudoku solving service.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="solver processes (default: all cores)")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--batch-delay", type=float, default=0.002, help="seconds to wait for a batch to fill")
+    parser.add_argument("--max-queue", type=int, default=4096, help="queued puzzles before rejecting")
+    parser.add_argument("--max-nodes", type=int, default=None, help="search nodes allowed per puzzle")
+    parser.add_argument("--deadline", type=float, default=PUZZLE_DEADLINE,
+                        help=f"seconds allowed per puzzle (default: {PUZZLE_DEADLINE})")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, workers=args.workers, batch_size=args.batch_size,
+                          batch_delay=args.batch_delay, max_queue=args.max_queue,
+                          max_nodes=args.max_nodes, deadline=args.deadline))
+    except KeyboardInterrupt:
+        pass  # Ctrl+C where the loop has no signal handlers; serve() already shut down
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Sudoku Solution Cache
+Bounded LRU of solved puzzles keyed by their canonical form (symmetry.py), so
+a puzzle that is a relabeled, shuffled or transposed copy of one solved
+before gets its solution back without any search. An optional SQLite file
+keeps a larger, size-capped second level that survives restarts.
+"""
+
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+from board import Board
+from symmetry import canonical_form
+
+
+class SolutionCache:
+
+    def __init__(self, capacity=10000, path=None, disk_capacity=1000000):
+        """
+        Keep up to capacity solutions in memory. With a path, solutions are also
+        written to an SQLite file holding at most disk_capacity of them; the
+        least recently used ones are evicted first on both levels.
+        """
+        self.capacity = capacity
+        self.entries = OrderedDict()  # canonical puzzle -> canonical solution (strings)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self._last = None  # (puzzle bytes, key, transform) of the last lookup
+
+        self.path = path
+        self.disk_capacity = disk_capacity
+        self.db = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.db = sqlite3.connect(path, isolation_level=None)
+            self.db.execute("CREATE TABLE IF NOT EXISTS solutions "
+                            "(puzzle TEXT PRIMARY KEY, solution TEXT NOT NULL, used REAL NOT NULL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS solutions_used ON solutions (used)")
+            self.disk_size = self.db.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def _canonical(self, board):
+        """Return (key, transform) for board, reusing the last result for the same puzzle."""
+        cells = bytes(board.cells)
+        if self._last is not None and self._last[0] == cells:
+            return self._last[1], self._last[2]
+        canonical, transform = canonical_form(board)
+        key = canonical.to_string()
+        self._last = (cells, key, transform)
+        return key, transform
+
+    def get(self, board):
+        """Return the solution of board as a new Board, or None if it isn't cached."""
+        key, transform = self._canonical(board)
+
+        solution = self.entries.get(key)
+        if solution is not None:
+            self.entries.move_to_end(key)
+        elif self.db is not None:
+            row = self.db.execute("SELECT solution FROM solutions WHERE puzzle = ?", (key,)).fetchone()
+            if row is not None:
+                solution = row[0]
+                self.db.execute("UPDATE solutions SET used = ? WHERE puzzle = ?", (time.time(), key))
+                self._remember(key, solution)
+
+        if solution is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return transform.inverse().apply(Board.from_string(solution))
+
+    def put(self, board, solution):
+        """Store the solution (a Board) of the puzzle board."""
+        key, transform = self._canonical(board)
+        solution = transform.apply(solution).to_string()
+        self._remember(key, solution)
+
+        if self.db is not None:
+            now = time.time()
+            if self.db.execute("INSERT OR IGNORE INTO solutions VALUES (?, ?, ?)", (key, solution, now)).rowcount:
+                self.disk_size += 1
+            else:
+                self.db.execute("UPDATE solutions SET used = ? WHERE puzzle = ?", (now, key))
+            excess = self.disk_size - self.disk_capacity
+            if excess > 0:
+                self.db.execute("DELETE FROM solutions WHERE puzzle IN "
+                                "(SELECT puzzle FROM solutions ORDER BY used LIMIT ?)", (excess,))
+                self.disk_evictions += excess
+                self.disk_size -= excess
+
+    def _remember(self, key, solution):
+        """Put an entry at the fresh end of the memory LRU, evicting the stalest if full."""
+        self.entries[key] = solution
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def hit_rate(self):
+        """Fraction of lookups answered from the cache (0.0 before any lookup)."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """Return the counters as a plain dict (for logging or monitoring)."""
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate(), 4),
+            "evictions": self.evictions,
+            "disk_size": self.disk_size if self.db is not None else 0,
+            "disk_evictions": self.disk_evictions,
+        }
+
+    def close(self):
+        """Close the SQLite file, if any."""
+        if self.db is not None:
+            self.db.close()
+            self.db = None
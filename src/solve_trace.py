@@ -0,0 +1,198 @@
+"""
+Sudoku Solver Traces
+A recording of a step-by-step search (SudokuSolver.steps()) that can be
+played back forward or backward and scrubbed to any step without running the
+search again, and saved to disk to share a slow case.
+
+Every event takes 2 bytes in an array, packed by encode(): cell << 6 |
+digit << 1 | backtrack (cells up to 1023 and digits up to 31, so 25x25
+boards fit too). Every KEYFRAME_INTERVAL events the whole board is stored
+as a keyframe, so the board at any step is rebuilt from the keyframe
+before it and at most KEYFRAME_INTERVAL events.
+
+File layout (little endian):
+    header     24 bytes: magic "SUDOKUTR", version (u16), cells (u16),
+               keyframe interval (u32), events (u32), keyframes (u32)
+    puzzle     one byte per cell
+    events     u16 each
+    keyframes  one byte per cell each
+"""
+
+import struct
+import sys
+from array import array
+
+from board import Board
+from budget import BudgetExhausted, SOLVED, UNSOLVABLE, EXHAUSTED
+from solver import ASSIGN, BACKTRACK
+
+MAGIC = b"SUDOKUTR"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIII")
+
+KEYFRAME_INTERVAL = 1024
+
+
+def encode(event, cell, num):
+    """Pack one (event, cell, digit) into 16 bits."""
+    return cell << 6 | num << 1 | (event == BACKTRACK)
+
+
+def decode(code):
+    """Inverse of encode: return (event, cell, digit)."""
+    return BACKTRACK if code & 1 else ASSIGN, code >> 6, code >> 1 & 31
+
+
+class Trace:
+
+    def __init__(self, puzzle, interval=KEYFRAME_INTERVAL):
+        """Start an empty trace of a search on puzzle (a Board)."""
+        self.puzzle = bytes(puzzle.cells)
+        self.interval = interval
+        self.events = array("H")
+        self.keyframes = bytearray(self.puzzle)  # keyframe k: the board before event k * interval
+        self.head = bytearray(self.puzzle)       # the board after the last event
+
+    @classmethod
+    def record(cls, solver, budget=None, interval=KEYFRAME_INTERVAL):
+        """
+        Run solver.steps(budget) and return (trace, status): SOLVED, UNSOLVABLE,
+        or EXHAUSTED when the budget ran out first, the trace then holding the
+        search up to there.
+        """
+        trace = cls(solver.board, interval)
+        try:
+            for event in solver.steps(budget):
+                trace.append(*event)
+        except BudgetExhausted:
+            return trace, EXHAUSTED
+        solved = solver.consistent and solver.board.first_empty() < 0
+        return trace, SOLVED if solved else UNSOLVABLE
+
+    def __len__(self):
+        return len(self.events)
+
+    def append(self, event, cell, num):
+        """Record one more event, as yielded by SudokuSolver.steps()."""
+        n = len(self.events)
+        if n and n % self.interval == 0:
+            self.keyframes += self.head
+        self.events.append(encode(event, cell, num))
+        self.head[cell] = num if event == ASSIGN else 0
+
+    def board_at(self, step):
+        """Return the cells (a bytearray) after the first step events."""
+        size = len(self.puzzle)
+        k = min(step // self.interval, len(self.keyframes) // size - 1)
+        cells = bytearray(self.keyframes[k * size:(k + 1) * size])
+        for code in self.events[k * self.interval:step]:
+            event, cell, num = decode(code)
+            cells[cell] = num if event == ASSIGN else 0
+        return cells
+
+    def save(self, path):
+        """Write the trace to path."""
+        events = array("H", self.events)
+        if sys.byteorder == "big":
+            events.byteswap()
+        size = len(self.puzzle)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, size, self.interval, len(events), len(self.keyframes) // size))
+            f.write(self.puzzle)
+            f.write(events.tobytes())
+            f.write(self.keyframes)
+
+    @classmethod
+    def load(cls, path):
+        """Read a trace written by save(). A damaged or truncated file raises ValueError."""
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path} is truncated")
+        magic, version, size, interval, count, keyframes = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} solver trace")
+        if not size or not interval or not keyframes:
+            raise ValueError(f"{path} is damaged")
+        # The header gives the length of every section, check them all before reading
+        if len(data) < HEADER.size + size + 2 * count + keyframes * size:
+            raise ValueError(f"{path} is truncated")
+        offset = HEADER.size
+        trace = cls(Board(bytearray(data[offset:offset + size])), interval)
+        offset += size
+        trace.events.frombytes(data[offset:offset + 2 * count])
+        if sys.byteorder == "big":
+            trace.events.byteswap()
+        offset += 2 * count
+        trace.keyframes = bytearray(data[offset:offset + keyframes * size])
+        trace.head = trace.board_at(count)
+        return trace
+
+
+class TracePlayer:
+
+    def __init__(self, trace, board=None):
+        """
+        Play trace on board (a Board, reset to the puzzle; a new one if not
+        given). self.position is the number of events applied, self.stack the
+        cells the search has filled, most recent last.
+        """
+        self.trace = trace
+        self.board = board if board is not None else Board(bytearray(trace.puzzle))
+        self.board.restore(trace.puzzle)
+        self.position = 0
+        self.stack = []
+
+    def at_end(self):
+        return self.position >= len(self.trace)
+
+    def forward(self):
+        """Apply the next event and return the cell it changed (None at the end)."""
+        if self.position >= len(self.trace):
+            return None
+        event, cell, num = decode(self.trace.events[self.position])
+        self.position += 1
+        if event == BACKTRACK:
+            self.board.cells[cell] = 0
+            self.stack.pop()
+        else:
+            self.board.cells[cell] = num
+            self.stack.append(cell)
+        return cell
+
+    def backward(self):
+        """Undo the last event applied and return the cell it changed (None at the start)."""
+        if self.position == 0:
+            return None
+        self.position -= 1
+        event, cell, num = decode(self.trace.events[self.position])
+        if event == BACKTRACK:
+            self.board.cells[cell] = num
+            self.stack.append(cell)
+        else:
+            self.board.cells[cell] = 0
+            self.stack.pop()
+        return cell
+
+    def seek(self, step):
+        """
+        Move to step (clamped to the trace) and return the set of cells that
+        changed. Nearby steps are walked to, farther ones are rebuilt from a
+        keyframe; the stack is then the filled cells in row-major order, which
+        is the order the backtracking search fills them in.
+        """
+        step = max(0, min(step, len(self.trace)))
+        if abs(step - self.position) <= self.trace.interval:
+            changed = set()
+            while self.position < step:
+                changed.add(self.forward())
+            while self.position > step:
+                changed.add(self.backward())
+            return changed
+
+        before = bytes(self.board.cells)
+        self.board.restore(self.trace.board_at(step))
+        self.position = step
+        puzzle, cells = self.trace.puzzle, self.board.cells
+        self.stack = [i for i, num in enumerate(cells) if num and not puzzle[i]]
+        return {i for i, num in enumerate(cells) if num != before[i]}
@@ -3,91 +3,547 @@ Sudoku Solver - Console Version
 Solves a Sudoku puzzle using backtracking algorithm
 """
 
+import os
+import sys
+import time
+from collections import deque
+from itertools import islice
+from math import isqrt
+
+from board import Board
+from budget import SearchBudget, SolveResult, BudgetExhausted, EventToken, SOLVED, UNSOLVABLE, EXHAUSTED
+from engine import BitmaskEngine
+from dlx import DancingLinks
+from geometry import geometry, box_for_cells
+from logic import LogicSolver
+
+# Available search backends:
+#   logic        - human techniques first (logic.py), bitmask search on what is left (default;
+#                  the techniques are 9x9 only, bigger boards go straight to dlx)
+#   bitmask      - digit bitmasks + most constrained cell first (9x9; without
+#                  hidden singles it gets lost on bigger boards, which go to dlx)
+#   dlx          - exact cover with Dancing Links (Algorithm X)
+#   backtracking - the original row-major, 1..9 backtracking
+BACKENDS = ("logic", "bitmask", "dlx", "backtracking")
+
+# Events yielded by SudokuSolver.steps() as (event, cell index, digit)
+ASSIGN = "assign"        # digit written into the cell
+BACKTRACK = "backtrack"  # digit taken back out of the cell
+
+# Parallel counting splits the search tree into about this many subproblems per worker
+SPLIT_FACTOR = 16
+
+# Seconds between two checks of the cancel token while waiting on worker processes
+POLL_INTERVAL = 0.05
+
+
+def parse_puzzle(text):
+    """
+    Turn a puzzle string ('0' or '.' for empty cells) into a list of lists:
+    81 chars for 9x9, 256 for 16x16 or 625 for 25x25 (digits above 9 as letters).
+    """
+    text = text.strip()
+    if len(text) != 81:
+        try:
+            box_for_cells(len(text))
+        except ValueError:
+            raise ValueError(f"Expected 81 characters, got {len(text)}") from None
+    return Board.from_string(text).to_grid()
+
+
+def format_puzzle(board):
+    """Turn a board (Board or list of lists) into a puzzle string, '0' for empty cells."""
+    if isinstance(board, Board):
+        return board.to_string()
+    return Board.from_grid(board).to_string()
+
+
+def _solve_chunk(texts, backend):
+    """Worker side of solve_many: solve a list of puzzle strings, None when unsolvable."""
+    results = []
+    for text in texts:
+        solver = SudokuSolver(Board.from_string(text), backend)
+        results.append(solver.board.to_string() if solver.solve() else None)
+    return results
+
+
+# Set in count_solutions worker processes by _init_count_worker
+_count_token = None
+
+
+def _init_count_worker(stop):
+    """Pool initializer of count_solutions: every subproblem of this worker stops once stop (an Event) is set."""
+    global _count_token
+    _count_token = EventToken(stop)
+
+
+def search_engine(board, stats=None):
+    """
+    Return the engine to search board with: the bitmask engine on 9x9, Dancing
+    Links on bigger boards, where the exact-cover columns also catch hidden
+    singles and plain MRV search can run for minutes.
+    """
+    if len(board) == 81:
+        return BitmaskEngine(board, stats)
+    return DancingLinks(board, stats)
+
+
+def _count_subproblem(text, limit, max_nodes, deadline_at):
+    """Worker side of count_solutions: return (solutions, nodes) of one subproblem."""
+    budget = SearchBudget(max_nodes, token=_count_token, deadline_at=deadline_at)
+    return search_engine(Board.from_string(text)).count(limit, budget), budget.nodes
+
+
+def _split_tasks(board, tasks):
+    """
+    Split the search tree of board breadth first, one most constrained cell per
+    level, until there are at least tasks open subproblems. Return (subproblem
+    strings, number of solutions already reached while splitting).
+    """
+    frontier = [board.copy()]
+    solved = 0
+    while frontier and len(frontier) < tasks:
+        children = []
+        for node in frontier:
+            engine = BitmaskEngine(node)
+            if not engine.consistent:
+                continue
+            if not engine.empty:
+                solved += 1
+                continue
+            children.extend(Board(bytearray(cells)) for cells in engine.split())
+        frontier = children
+    return [node.to_string() for node in frontier], solved
+
+
+def _chunked(puzzles, chunksize):
+    """
+    Lazily group puzzles into (start index, strings, converters) chunks.
+    Boards and grids are sent as strings since they are much cheaper to pickle;
+    the converter turns the solution string back into the input's form.
+    """
+    start, texts, convert = 0, [], []
+    for puzzle in puzzles:
+        if isinstance(puzzle, str):
+            texts.append(puzzle.strip())
+            convert.append(None)
+        elif isinstance(puzzle, Board):
+            texts.append(puzzle.to_string())
+            convert.append(Board.from_string)
+        else:
+            texts.append(format_puzzle(puzzle))
+            convert.append(parse_puzzle)
+
+        if len(texts) == chunksize:
+            yield start, texts, convert
+            start += chunksize
+            texts, convert = [], []
+
+    if texts:
+        yield start, texts, convert
+
+
+def _chunk_results(start, results, convert):
+    """Yield (index, solution) pairs, solutions in the same form as the input puzzle."""
+    for k, text in enumerate(results):
+        if text is not None and convert[k] is not None:
+            text = convert[k](text)
+        yield start + k, text
+
+
 class SudokuSolver:
 
-    def __init__(self, board):
+    def __init__(self, board, backend="logic", stats=None, cache=None):
         """
         Given an example board as arg, initialize the Sudoku solver with it. We use 0 for empty cells.
+        The board can be a Board, an N x N list of lists or a puzzle string
+        (9x9, 16x16 or 25x25); the solver works on its own Board copy (self.board).
+        backend selects the search algorithm, see BACKENDS.
+        Pass a SearchStats as stats to collect search counters and get hook callbacks.
+        Pass a SolutionCache as cache to reuse solutions of equivalent puzzles.
         """
-        board = [row[:] for row in board]
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+        self.backend = backend
+        self.stats = stats
+        self.cache = cache
+
+        if isinstance(board, Board):
+            board = board.copy()
+        elif isinstance(board, str):
+            board = Board.from_string(board)
+        else:
+            board = Board.from_grid(board)
         self.board = board
 
         # keep original
-        self.original_board = board
+        self.original_board = board.copy()
+        self.consistent = True  # False once steps() found givens that clash
 
 
     def is_valid(self, row, col, num):
         """Check if placing num at (row, col) is valid."""
 
         # Check row
-        if num in self.board[row]:
+        if num in self.board.row(row):
             return False
 
         # Check column
-        if num in [self.board[i][col] for i in range(9)]:
+        if num in self.board.col(col):
             return False
 
-        # Check 3x3 box
-        box_row, box_col = 3 * (row // 3), 3 * (col // 3)
-        for i in range(box_row, box_row + 3):
-            for j in range(box_col, box_col + 3):
-                if self.board[i][j] == num:
-                    return False
+        # Check box
+        if num in self.board.box(row, col):
+            return False
 
         return True
 
     def find_empty_cell(self):
         """Find an empty cell (a cell that have a value of 0)."""
-        for i in range(9):
-            for j in range(9):
-                if self.board[i][j] == 0:
-                    return (i, j)
-        return None
+        i = self.board.first_empty()
+        if i < 0:
+            return None
+        return divmod(i, self.board.size)
 
-    def solve(self):
-        """Solve the Sudoku puzzle using backtracking."""
+    def solve(self, max_nodes=None, deadline=None, token=None):
+        """
+        Solve the Sudoku puzzle with the selected backend and return a
+        SolveResult (true when solved). On success the solution is copied back
+        into self.board, otherwise the board is left as it was.
+
+        The search stops with status EXHAUSTED after max_nodes nodes, once
+        deadline seconds have passed or when token (a CancelToken) is
+        cancelled. With a cache, a cached solution is used as is and new ones
+        are stored.
+        """
+        start = time.perf_counter()
+        budget = SearchBudget(max_nodes, deadline, token)
 
-        # get the coordinates of an empty cell
-        # if no empty cell inside the board, the puzzle is solved
-        empty = self.find_empty_cell()
-        if not empty:
-            return True
+        def result(status, reason=None):
+            board = self.board.copy() if status == SOLVED else None
+            return SolveResult(status, board, budget.nodes, time.perf_counter() - start, reason, self.stats)
 
-        # else
-        row, col = empty
+        # The cache keys on 9x9 symmetry classes
+        cache = self.cache if len(self.board) == 81 else None
 
-        # Try numbers 1-9
-        for num in range(1, 10):
-            if self.is_valid(row, col, num):
-                self.board[row][col] = num
+        if cache is not None:
+            solution = cache.get(self.board)
+            if solution is not None:
+                self.board.restore(solution)
+                return result(SOLVED)
 
-                # Recursively try to solve
-                if self.solve():
-                    return True
+        puzzle = self.board.copy()
+        try:
+            solved = self._solve(budget)
+        except BudgetExhausted as stop:
+            self.board.restore(puzzle)
+            return result(EXHAUSTED, stop.reason)
+        if not solved:
+            return result(UNSOLVABLE)
 
-                # Backtrack if solution not found
-                self.board[row][col] = 0
+        if cache is not None:
+            cache.put(puzzle, self.board)
+        return result(SOLVED)
 
-        return False
+    def _solve(self, budget=None):
+        if self.backend == "backtracking":
+            return self.backtrack(budget)
+
+        if self.backend == "logic" and len(self.board) == 81:
+            logic = LogicSolver(self.board, self.stats)
+            if logic.solve():
+                self.board.restore(bytes(logic.cells))
+                return True
+            if not logic.consistent:
+                return False
+            # Only the cells logic couldn't fill are left to the search
+            engine = BitmaskEngine(Board(bytearray(logic.cells)), self.stats)
+        elif self.backend == "dlx":
+            engine = DancingLinks(self.board, self.stats)
+        else:
+            engine = search_engine(self.board, self.stats)
+
+        if not engine.solve(budget):
+            return False
+
+        self.board.restore(bytes(engine.cells))
+        return True
+
+    def backtrack(self, budget=None):
+        """Solve the Sudoku puzzle using plain backtracking (row-major, digits 1..N)."""
+        for _ in self.steps(budget):
+            pass
+        return self.consistent and self.board.first_empty() < 0
+
+    def steps(self, budget=None):
+        """
+        Run the backtracking search one move at a time: a generator of
+        (event, cell, num) tuples, (ASSIGN, i, num) when num is written into
+        cell i and (BACKTRACK, i, num) when it is taken back out. self.board
+        follows the events as they are yielded.
+
+        The empty cells are listed once up front and digits are checked
+        against row/column/box masks, so there is O(1) work between two events
+        and the caller decides the pace: one step at a time, thousands per
+        frame, or all of them. When the generator is exhausted the board is
+        solved if no empty cell is left. Givens that clash yield no event at
+        all and set self.consistent to False. A SearchBudget passed as budget
+        is charged per digit written and may raise BudgetExhausted mid-search.
+        """
+        cells = self.board.cells
+        stats = self.stats
+        geo = geometry(box_for_cells(len(cells)))
+        n, ROW_OF, COL_OF, BOX_OF = geo.size, geo.ROW_OF, geo.COL_OF, geo.BOX_OF
+
+        rows, cols, boxes = [0] * n, [0] * n, [0] * n
+        self.consistent = True
+        for i, num in enumerate(cells):
+            if num:
+                r, c, b, bit = ROW_OF[i], COL_OF[i], BOX_OF[i], 1 << num
+                if (rows[r] | cols[c] | boxes[b]) & bit:
+                    # A digit given twice in a unit: nothing to search
+                    self.consistent = False
+                    return
+                rows[r] |= bit
+                cols[c] |= bit
+                boxes[b] |= bit
+        empty = [i for i, num in enumerate(cells) if num == 0]
+
+        if stats is not None:
+            stats.node(0)
+        depth, start = 0, 1  # empty[depth] is the cell being filled, start the first digit to try
+        while depth < len(empty):
+            i = empty[depth]
+            r, c, b = ROW_OF[i], COL_OF[i], BOX_OF[i]
+            if stats is not None:
+                checked = time.perf_counter()
+            used = rows[r] | cols[c] | boxes[b]
+            num = start
+            while num <= n and used >> num & 1:
+                num += 1
+            if stats is not None:
+                stats.check_time += time.perf_counter() - checked
+
+            if num <= n:
+                if budget is not None:
+                    budget.charge()
+                bit = 1 << num
+                rows[r] |= bit
+                cols[c] |= bit
+                boxes[b] |= bit
+                cells[i] = num
+                depth, start = depth + 1, 1
+                if stats is not None:
+                    stats.assign(i, num)
+                    stats.node(depth)
+                yield ASSIGN, i, num
+                continue
+
+            # Dead end: take the previous cell's digit back and try its next one
+            depth -= 1
+            if depth < 0:
+                return
+            i = empty[depth]
+            num = cells[i]
+            bit = 1 << num
+            rows[ROW_OF[i]] ^= bit
+            cols[COL_OF[i]] ^= bit
+            boxes[BOX_OF[i]] ^= bit
+            cells[i] = 0
+            start = num + 1
+            if stats is not None:
+                stats.backtrack(i, num)
+            yield BACKTRACK, i, num
+
+        if stats is not None:
+            stats.solution(list(cells))
+
+    def solve_portfolio(self, strategies=None, workers=None, max_nodes=None, deadline=None, token=None,
+                        stats=None):
+        """
+        Solve by racing several strategies (backends, cell and digit orders,
+        randomized restarts) in worker processes, see portfolio.py; the first
+        definitive answer wins and the other workers are stopped. strategies
+        defaults to portfolio.DEFAULT_STRATEGIES, workers caps how many run at
+        once (None for one per core). Pass a PortfolioStats as stats to start the
+        strategies that won most often first and record the win.
+
+        Return a SolveResult like solve(), with the name of the winning strategy
+        in result.strategy (None when nobody won). max_nodes bounds each
+        worker, deadline and token the whole race. The backend and the cache of
+        this solver are not used, and the search stats stay in the workers.
+        """
+        # Only loaded when needed: it starts worker processes
+        from portfolio import race, DEFAULT_STRATEGIES
+
+        if strategies is None:
+            strategies = DEFAULT_STRATEGIES
+        result = race(self.board, strategies, workers, max_nodes, deadline, token, stats)
+        if result.solved:
+            self.board.restore(result.board)
+        return result
+
+    def solutions(self, limit=None, max_nodes=None, deadline=None, token=None):
+        """
+        Yield the solutions of the current board one at a time as Boards, at
+        most limit of them (None for all). Enumeration runs on the bitmask
+        engine whatever the backend. max_nodes, deadline and token bound the
+        whole enumeration like in solve(); hitting one raises BudgetExhausted.
+        """
+        engine = BitmaskEngine(self.board, self.stats)
+        budget = SearchBudget(max_nodes, deadline, token)
+        for cells in islice(engine.solutions(budget), limit):
+            yield Board(bytearray(cells))
+
+    def count_solutions(self, limit=None, workers=1, max_nodes=None, deadline=None, token=None):
+        """
+        Count the solutions of the current board, stopping once limit is reached
+        (None counts them all). A limit of 2 is enough to tell "none", "unique"
+        and "several" apart. The dlx backend, and every backend on boards
+        bigger than 9x9, counts on the exact-cover matrix, the others on the
+        bitmask engine (see search_engine).
+
+        With workers > 1 (None for all cores) the search tree is split a few
+        levels down into subproblems, handed to a pool of processes one at a
+        time as workers free up, so a worker stuck in a big subtree doesn't
+        hold the others back. Partial counts are added up as they arrive.
+        Search stats are only collected when counting in this process.
+
+        max_nodes, deadline and token bound the count like in solve(); hitting
+        one raises BudgetExhausted. In parallel, max_nodes is the total over
+        all subproblems (each one also stops on its own past it), every worker
+        checks the same deadline itself, and subproblems still running are
+        stopped before counting returns or raises.
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        budget = SearchBudget(max_nodes, deadline, token)
+        if workers <= 1:
+            if self.backend == "dlx":
+                return DancingLinks(self.board, self.stats).count(limit, budget)
+            return search_engine(self.board, self.stats).count(limit, budget)
+
+        tasks, total = _split_tasks(self.board, workers * SPLIT_FACTOR)
+        if limit is not None and total >= limit:
+            return limit
+
+        # Only loaded when needed: it takes longer to import than the whole solver
+        from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+        from multiprocessing import Event
+        stop = Event()
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_count_worker, initargs=(stop,))
+        try:
+            pending = {pool.submit(_count_subproblem, text, limit, max_nodes, budget.deadline_at)
+                       for text in tasks}
+            while pending:
+                done, pending = wait(pending, POLL_INTERVAL, FIRST_COMPLETED)
+                for future in done:
+                    count, nodes = future.result()
+                    total += count
+                    budget.nodes += nodes
+                if limit is not None and total >= limit:
+                    return limit
+                if max_nodes is not None and budget.nodes > max_nodes:
+                    raise BudgetExhausted("max_nodes")
+                if token is not None and token.cancelled:
+                    raise BudgetExhausted("cancelled")
+                if budget.remaining_time() == 0:
+                    raise BudgetExhausted("deadline")
+        finally:
+            # Subproblems still running when counting stops early give up at
+            # their next nodes; wait for the worker processes to exit
+            stop.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+        return total
+
+    @staticmethod
+    def solve_many(puzzles, workers=None, ordered=True, chunksize=64, backend="logic"):
+        """
+        Solve any iterable of puzzles (puzzle strings, Boards or lists of lists) and stream
+        back (index, solution) pairs. A solution has the same form as its puzzle,
+        or is None when the puzzle has no solution.
+
+        Chunks of chunksize puzzles are spread over a pool of workers processes
+        (all cores by default, workers=1 solves in this process). Only a few
+        chunks per worker are in flight at once, so memory stays flat however
+        long the input is. With ordered=False results come back as soon as
+        their chunk is done.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        chunks = _chunked(puzzles, chunksize)
+
+        if workers <= 1:
+            for start, texts, as_grid in chunks:
+                yield from _chunk_results(start, _solve_chunk(texts, backend), as_grid)
+            return
+
+        from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+        max_pending = workers * 4
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            if ordered:
+                pending = deque()
+                for start, texts, as_grid in chunks:
+                    pending.append((start, pool.submit(_solve_chunk, texts, backend), as_grid))
+                    if len(pending) >= max_pending:
+                        start, future, as_grid = pending.popleft()
+                        yield from _chunk_results(start, future.result(), as_grid)
+
+                while pending:
+                    start, future, as_grid = pending.popleft()
+                    yield from _chunk_results(start, future.result(), as_grid)
+            else:
+                pending = {}
+                for start, texts, as_grid in chunks:
+                    pending[pool.submit(_solve_chunk, texts, backend)] = (start, as_grid)
+                    while len(pending) >= max_pending:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            start, as_grid = pending.pop(future)
+                            yield from _chunk_results(start, future.result(), as_grid)
+
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        start, as_grid = pending.pop(future)
+                        yield from _chunk_results(start, future.result(), as_grid)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
 
     def print_board(self, title="Sudoku Board"):
         """Pretty print the Sudoku board."""
+        n = self.board.size
+        b = isqrt(n)
+        geo = geometry(b)
+        width = 4 * n + 1
         print(f"\n{title}")
-        print("=" * 37)
-        for i in range(9):
-            if i % 3 == 0 and i != 0:
-                print("-" * 37)
+        print("=" * width)
+        for i in range(n):
+            if i % b == 0 and i != 0:
+                print("-" * width)
 
             row_str = ""
-            for j in range(9):
-                if j % 3 == 0 and j != 0:
+            for j in range(n):
+                if j % b == 0 and j != 0:
                     row_str += " | "
 
-                num = self.board[i][j]
-                row_str += f" {num if num != 0 else '.'} "
+                num = self.board[i, j]
+                row_str += f" {geo.to_char(num) if num != 0 else '.'} "
 
             print(row_str)
-        print("=" * 37)
+        print("=" * width)
+
+
+def print_steps(solver, out=sys.stdout):
+    """Stream the backtracking search of solver as one line per event. Return True if solved."""
+    n = solver.board.size
+    for event, i, num in solver.steps():
+        out.write(f"{event:9} r{i // n + 1}c{i % n + 1} {num}\n")
+    return solver.consistent and solver.board.first_empty() < 0
 
 
 def main():
@@ -111,9 +567,10 @@ def main():
     # Print original puzzle
     solver.print_board("Original Puzzle")
 
-    # Solve the puzzle
+    # Solve the puzzle, "--steps" streams every move of the backtracking search
     print("\nSolving...")
-    if solver.solve():
+    solved = print_steps(solver) if "--steps" in sys.argv[1:] else solver.solve()
+    if solved:
         solver.print_board("✓ Solved Puzzle")
     else:
         print("\n✗ No solution exists for this puzzle!")
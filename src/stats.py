@@ -0,0 +1,85 @@
+"""
+Sudoku Solver - Search Statistics
+Optional counters and callback hooks filled in by the search engines.
+A search only touches this when it is given a SearchStats, so leaving it out
+costs one `is None` check per node.
+"""
+
+from time import perf_counter
+
+
+class SearchStats:
+
+    def __init__(self, on_assign=None, on_backtrack=None, on_solution=None):
+        """
+        Hooks (all optional):
+            on_assign(cell, num)     a digit was put in cell (index row * 9 + col)
+            on_backtrack(cell, num)  that digit was taken back out
+            on_solution(cells)       a full solution was reached (list of 81 digits)
+        """
+        self.on_assign = on_assign
+        self.on_backtrack = on_backtrack
+        self.on_solution = on_solution
+        self.reset()
+
+    def reset(self):
+        """Zero every counter, keeping the hooks."""
+        self.nodes = 0          # search nodes visited
+        self.backtracks = 0     # digits taken back out
+        self.propagations = 0   # forced moves (a cell or column with one option left)
+        self.solutions = 0      # solutions reached
+        self.max_depth = 0      # deepest level of the search
+        self.check_time = 0.0   # seconds spent working out which digits fit
+        self.select_time = 0.0  # seconds spent choosing the next cell / column
+
+    def node(self, depth):
+        """Record a visited search node at the given depth."""
+        self.nodes += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def assign(self, cell, num):
+        """Record a digit placed in cell."""
+        if self.on_assign is not None:
+            self.on_assign(cell, num)
+
+    def backtrack(self, cell, num):
+        """Record a digit taken back out of cell."""
+        self.backtracks += 1
+        if self.on_backtrack is not None:
+            self.on_backtrack(cell, num)
+
+    def solution(self, cells):
+        """Record a full solution."""
+        self.solutions += 1
+        if self.on_solution is not None:
+            self.on_solution(cells)
+
+    def timed_select(self, select, *args):
+        """Call a cell/column selection function and add its run time to select_time."""
+        start = perf_counter()
+        result = select(*args)
+        self.select_time += perf_counter() - start
+        return result
+
+    def timed_check(self, check, *args):
+        """Call a candidate / validity check and add its run time to check_time."""
+        start = perf_counter()
+        result = check(*args)
+        self.check_time += perf_counter() - start
+        return result
+
+    def as_dict(self):
+        """Return the counters as a plain dict (for logging or JSON)."""
+        return {
+            "nodes": self.nodes,
+            "backtracks": self.backtracks,
+            "propagations": self.propagations,
+            "solutions": self.solutions,
+            "max_depth": self.max_depth,
+            "check_time": self.check_time,
+            "select_time": self.select_time,
+        }
+
+    def __repr__(self):
+        return "SearchStats(" + ", ".join(f"{k}={v}" for k, v in self.as_dict().items()) + ")"
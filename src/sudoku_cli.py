@@ -0,0 +1,488 @@
+"""
+Sudoku Command Line
+Bulk solving, generation, validation and timing on puzzle files, without the
+GUI. Input files are memory-mapped and puzzles are read straight from the
+buffer in large blocks; results go out in one buffered write per block.
+Only the solver core is imported (never pygame), and numpy only for --batch.
+
+Puzzle files hold one 81-char puzzle per line ('0' or '.' for empty cells).
+Anything after the 81st char that follows a ',' or a space is ignored, so
+"puzzle,solution" files work too. Blank lines are skipped.
+
+Usage (from the src folder):
+    python -m sudoku_cli solve puzzles.txt -o solutions.txt --workers 4
+    python -m sudoku_cli generate --count 1000 --difficulty hard --seed 1
+    python -m sudoku_cli generate --count 1000 --store puzzles.sdb
+    python -m sudoku_cli generate --target hard:5000 --target medium:24-26:5000 --workers 8 --store puzzles.sdb
+    python -m sudoku_cli sample puzzles.sdb --difficulty hard --count 10
+    python -m sudoku_cli validate puzzles.txt
+    python -m sudoku_cli bench puzzles.txt --backend dlx
+    python -m sudoku_cli bench hard.txt --portfolio --portfolio-stats wins.json
+    python -m sudoku_cli trace 8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4.. slow.trace
+Use - as the file name to read from stdin.
+"""
+
+import argparse
+import mmap
+import os
+import sys
+import time
+from collections import Counter, deque
+
+from board import Board
+from budget import SOLVED, EXHAUSTED
+from dlx import DancingLinks
+from logic import LogicSolver
+from solver import SudokuSolver, BACKENDS, parse_puzzle
+
+# Input is handed out in blocks of about this many bytes (~12k puzzles)
+BLOCK_BYTES = 1 << 20
+
+# Output buffer size for files and stdout
+WRITE_BUFFER = 1 << 20
+
+# Blocks in flight per worker process
+BLOCKS_PER_WORKER = 2
+
+# '0'..'9' -> 0..9, '.' -> 0, anything else -> 255
+_FROM_TEXT = bytearray([255] * 256)
+for _d in range(10):
+    _FROM_TEXT[ord("0") + _d] = _d
+_FROM_TEXT[ord(".")] = 0
+_FROM_TEXT = bytes(_FROM_TEXT)
+
+_TO_TEXT = bytes.maketrans(bytes(range(10)), b"0123456789")
+_SEPARATORS = b", \t;"
+
+
+def open_input(path):
+    """Return a read-only buffer over the whole input: an mmap, or the bytes of stdin for "-"."""
+    if path == "-":
+        return sys.stdin.buffer.read()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        # The mapping stays valid after the file is closed
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def open_output(path):
+    """Return a binary writer with a large buffer: a file, or stdout for None / "-"."""
+    if path in (None, "-"):
+        return open(sys.stdout.fileno(), "wb", buffering=WRITE_BUFFER, closefd=False)
+    return open(path, "wb", buffering=WRITE_BUFFER)
+
+
+def blocks(buffer, size=BLOCK_BYTES):
+    """Yield the input as bytes blocks of about size bytes, each ending at a line break."""
+    start, end = 0, len(buffer)
+    while start < end:
+        stop = buffer.find(b"\n", min(start + size, end) - 1)
+        stop = end if stop < 0 else stop + 1
+        yield buffer[start:stop]
+        start = stop
+
+
+def scan(block):
+    """
+    Parse a block of lines. Return (cells, offsets): cells is the whole block
+    translated to cell values in one go, offsets has one entry per non-blank
+    line, the offset of its 81 cells in cells or -1 if the line isn't a puzzle.
+    No per-line string is ever built.
+    """
+    cells = block.translate(_FROM_TEXT)
+    offsets = []
+    start, end = 0, len(block)
+    while start < end:
+        stop = block.find(b"\n", start)
+        if stop < 0:
+            stop = end
+        line_end = stop
+        while line_end > start and block[line_end - 1] in b"\r \t":
+            line_end -= 1
+
+        if line_end > start:
+            fits = line_end - start == 81 or (line_end - start > 81 and block[start + 81] in _SEPARATORS)
+            offsets.append(start if fits and cells.find(255, start, start + 81) < 0 else -1)
+        start = stop + 1
+    return cells, offsets
+
+
+def _solve_block(block, backend, max_nodes, deadline, use_batch):
+    """
+    Worker side of solve: return (output bytes, Counter of statuses) for a
+    block. Each puzzle gives its solution line, or a line with its status:
+    "invalid", "unsolvable" or "budget-exhausted".
+    """
+    cells, offsets = scan(block)
+    lines = []
+    counts = Counter()
+    if use_batch:
+        solutions = _solve_batch(cells, [k for k in offsets if k >= 0], backend, max_nodes, deadline)
+    for k in offsets:
+        if k < 0:
+            counts["invalid"] += 1
+            lines.append(b"invalid")
+            continue
+
+        if use_batch:
+            status, solution = solutions.pop()
+        else:
+            result = SudokuSolver(Board.from_buffer(cells, k), backend).solve(max_nodes, deadline)
+            status = result.status
+            solution = bytes(result.board.cells) if result.solved else None
+        counts[status] += 1
+        lines.append(solution.translate(_TO_TEXT) if solution is not None else status.encode("ascii"))
+    lines.append(b"")
+    return b"\n".join(lines), counts
+
+
+def _solve_batch(cells, offsets, backend, max_nodes, deadline):
+    """
+    Solve the puzzles at offsets of cells with batch.solve_batch; (status,
+    solution bytes or None) pairs in reverse order.
+    """
+    import numpy as np
+    from batch import solve_batch
+
+    if not offsets:
+        return []
+    flat = np.frombuffer(cells, dtype=np.int8)
+    grids = flat[np.array(offsets)[:, None] + np.arange(81)]
+    solved_grids, solved, exhausted = solve_batch(grids, backend, max_nodes=max_nodes, deadline=deadline)
+    solved_grids = solved_grids.reshape(-1, 81)
+    results = []
+    for k in range(len(offsets) - 1, -1, -1):
+        if solved[k]:
+            results.append((SOLVED, solved_grids[k].tobytes()))
+        else:
+            results.append((EXHAUSTED if exhausted[k] else "unsolvable", None))
+    return results
+
+
+def _validate_block(block, max_nodes, deadline):
+    """
+    Worker side of validate: return (output bytes, Counter of statuses). Each
+    puzzle gets one of "invalid", "contradictory", "unsolvable", "unique",
+    "multiple" or "budget-exhausted".
+
+    Logic only makes deductions every solution agrees with, so a puzzle it
+    solves is unique and one it breaks is unsolvable: only the cells it
+    leaves are counted, on the exact-cover matrix, which beats MRV search
+    on the leftovers of hard puzzles.
+    """
+    from budget import SearchBudget, BudgetExhausted
+
+    cells, offsets = scan(block)
+    lines = []
+    counts = Counter()
+    for k in offsets:
+        if k < 0:
+            status = "invalid"
+        else:
+            budget = SearchBudget(max_nodes, deadline)
+            logic = LogicSolver(Board.from_buffer(cells, k))
+            if not logic.consistent:
+                status = "contradictory"
+            elif logic.solve():
+                status = "unique"
+            elif not logic.consistent:
+                status = "unsolvable"
+            else:
+                try:
+                    found = DancingLinks(Board(bytearray(logic.cells))).count(2, budget)
+                    status = ("unsolvable", "unique", "multiple")[found]
+                except BudgetExhausted:
+                    status = "budget-exhausted"
+        counts[status] += 1
+        lines.append(status.encode("ascii"))
+    lines.append(b"")
+    return b"\n".join(lines), counts
+
+
+def run_blocks(buffer, work, args, workers, out):
+    """
+    Run work(block, *args) on every block of buffer, in order, writing each
+    output to out as it comes. With workers > 1 blocks go to a process pool,
+    a few per worker at a time so memory stays flat. Return the total Counter.
+    """
+    totals = Counter()
+    if workers <= 1:
+        for block in blocks(buffer):
+            output, counts = work(block, *args)
+            out.write(output)
+            totals.update(counts)
+        return totals
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for block in blocks(buffer):
+            pending.append(pool.submit(work, block, *args))
+            if len(pending) >= workers * BLOCKS_PER_WORKER:
+                output, counts = pending.popleft().result()
+                out.write(output)
+                totals.update(counts)
+        while pending:
+            output, counts = pending.popleft().result()
+            out.write(output)
+            totals.update(counts)
+    return totals
+
+
+def summary(totals, elapsed):
+    """One line of totals for stderr."""
+    count = sum(totals.values())
+    parts = ", ".join(f"{name} {n}" for name, n in sorted(totals.items()))
+    rate = count / elapsed if elapsed > 0 else 0.0
+    return f"{count} puzzles in {elapsed:.2f}s ({rate:.0f}/s): {parts}"
+
+
+def cmd_solve(args):
+    buffer = open_input(args.input)
+    start = time.perf_counter()
+    with open_output(args.output) as out:
+        totals = run_blocks(buffer, _solve_block, (args.backend, args.max_nodes, args.deadline, args.batch),
+                            args.workers, out)
+    print(summary(totals, time.perf_counter() - start), file=sys.stderr)
+    return 0
+
+
+def cmd_validate(args):
+    buffer = open_input(args.input)
+    start = time.perf_counter()
+    with open_output(args.output) as out:
+        totals = run_blocks(buffer, _validate_block, (args.max_nodes, args.deadline), args.workers, out)
+    print(summary(totals, time.perf_counter() - start), file=sys.stderr)
+    return 0 if set(totals) <= {"unique"} else 1
+
+
+def cmd_generate(args):
+    from generator import PuzzleGenerator
+
+    if args.target or args.workers != 1:
+        return generate_bulk(args)
+
+    if args.store:
+        from puzzle_store import PuzzleStore, fill
+
+        start = time.perf_counter()
+        with PuzzleStore(args.store) as store:
+            fill(store, args.difficulty, args.count, args.seed)
+            total = len(store)
+        print(f"{args.count} {args.difficulty} puzzles added in {time.perf_counter() - start:.2f}s, "
+              f"{total} in {args.store}", file=sys.stderr)
+        return 0
+
+    generator = PuzzleGenerator(args.seed)
+    start = time.perf_counter()
+    with open_output(args.output) as out:
+        lines = []
+        for n in range(1, args.count + 1):
+            puzzle, solution = generator.generate(args.difficulty, max_attempts=None)
+            line = puzzle.to_string()
+            if args.with_solutions:
+                line += "," + solution.to_string()
+            lines.append(line)
+            if len(lines) == 1024 or n == args.count:
+                out.write(("\n".join(lines) + "\n").encode("ascii"))
+                lines = []
+    elapsed = time.perf_counter() - start
+    print(f"{args.count} {args.difficulty} puzzles in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+def generate_bulk(args):
+    """generate with --target or --workers: graded puzzles from a process pool (see bulk_generator.py)."""
+    import bulk_generator
+
+    targets = args.target or [bulk_generator.Target(args.difficulty, args.count)]
+    workers = args.workers or None
+    if args.store:
+        from puzzle_store import PuzzleStore
+
+        with PuzzleStore(args.store) as store:
+            report = bulk_generator.generate_bulk(targets, bulk_generator.StoreSink(store), workers, args.seed)
+    else:
+        with open_output(args.output) as out:
+            sink = bulk_generator.LineSink(out, args.with_solutions)
+            report = bulk_generator.generate_bulk(targets, sink, workers, args.seed)
+    print("\n".join(report.lines()), file=sys.stderr)
+    return 1 if report.short() else 0
+
+
+def cmd_sample(args):
+    import random
+    from puzzle_store import PuzzleStore
+
+    rng = random.Random(args.seed)
+    with PuzzleStore(args.store, writable=False) as store, open_output(args.output) as out:
+        lines = []
+        for _ in range(args.count):
+            stored = store.sample(args.difficulty, rng)
+            if stored is None:
+                print(f"No {args.difficulty or ''} puzzles in {args.store}", file=sys.stderr)
+                return 1
+            line = stored.puzzle.to_string()
+            if args.with_solutions:
+                line += "," + stored.solution.to_string()
+            lines.append(line)
+        out.write(("\n".join(lines) + "\n").encode("ascii"))
+    return 0
+
+
+def cmd_bench(args):
+    buffer = open_input(args.input)
+    boards = []
+    for block in blocks(buffer):
+        cells, offsets = scan(block)
+        boards.extend(Board.from_buffer(cells, k) for k in offsets if k >= 0)
+        if args.limit and len(boards) >= args.limit:
+            del boards[args.limit:]
+            break
+    if not boards:
+        print("No puzzles found", file=sys.stderr)
+        return 1
+
+    stats = None
+    if args.portfolio:
+        from portfolio import PortfolioStats, start
+
+        stats = PortfolioStats(args.portfolio_stats)
+        start()  # the worker processes are kept between races, don't time their start
+
+    times = []
+    totals = Counter()
+    for _ in range(args.repeat):
+        for board in boards:
+            solver = SudokuSolver(board, args.backend)
+            start = time.perf_counter()
+            if stats is not None:
+                result = solver.solve_portfolio(max_nodes=args.max_nodes, deadline=args.deadline, stats=stats)
+            else:
+                result = solver.solve(args.max_nodes, args.deadline)
+            times.append(time.perf_counter() - start)
+            totals[result.status] += 1
+
+    times.sort()
+    total = sum(times)
+
+    def ms(q):
+        return times[min(len(times) - 1, int(q / 100 * len(times)))] * 1000
+
+    name = "portfolio" if stats is not None else args.backend
+    print(f"{name}: {len(times)} solves in {total:.3f}s ({len(times) / total:.0f}/s), "
+          f"p50 {ms(50):.3f} ms, p95 {ms(95):.3f} ms, p99 {ms(99):.3f} ms, max {times[-1] * 1000:.3f} ms")
+    print(", ".join(f"{status} {n}" for status, n in sorted(totals.items())))
+    if stats is not None:
+        # Wins over every run saved in --portfolio-stats, not just this one
+        print("\n".join(stats.lines()))
+        stats.save()
+    return 0
+
+
+def cmd_trace(args):
+    from budget import SearchBudget
+    from solve_trace import Trace
+
+    solver = SudokuSolver(args.puzzle, "backtracking")
+    start = time.perf_counter()
+    trace, status = Trace.record(solver, SearchBudget(args.max_nodes, args.deadline))
+    elapsed = time.perf_counter() - start
+    trace.save(args.output)
+    print(f"{status}: {len(trace)} events in {elapsed:.2f}s, trace saved to {args.output}", file=sys.stderr)
+    return 0
+
+
+def _puzzle(text):
+    """argparse type of a puzzle string."""
+    try:
+        return Board.from_grid(parse_puzzle(text))
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+def _target(spec):
+    """argparse type of --target."""
+    from bulk_generator import Target
+
+    try:
+        return Target.parse(spec)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m sudoku_cli", description="Sudoku tools for puzzle files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def budget_options(command):
+        command.add_argument("--max-nodes", type=int, default=None, help="search nodes allowed per puzzle")
+        command.add_argument("--deadline", type=float, default=None, help="seconds allowed per puzzle")
+
+    solve = commands.add_parser("solve", help="solve every puzzle of a file")
+    solve.add_argument("input", help="puzzle file, - for stdin")
+    solve.add_argument("-o", "--output", help="output file (default: stdout)")
+    solve.add_argument("--backend", default="logic", choices=BACKENDS)
+    solve.add_argument("--workers", type=int, default=1, help="solver processes")
+    solve.add_argument("--batch", action="store_true", help="use the NumPy batched solver")
+    budget_options(solve)
+    solve.set_defaults(run=cmd_solve)
+
+    validate = commands.add_parser("validate", help="check that every puzzle has exactly one solution")
+    validate.add_argument("input", help="puzzle file, - for stdin")
+    validate.add_argument("-o", "--output", help="output file (default: stdout)")
+    validate.add_argument("--workers", type=int, default=1, help="checker processes")
+    budget_options(validate)
+    validate.set_defaults(run=cmd_validate)
+
+    generate = commands.add_parser("generate", help="generate puzzles")
+    generate.add_argument("--count", type=int, default=10)
+    generate.add_argument("--difficulty", default="medium", choices=("easy", "medium", "hard"))
+    generate.add_argument("--seed", type=int, default=None)
+    generate.add_argument("--with-solutions", action="store_true", help="write puzzle,solution lines")
+    generate.add_argument("-o", "--output", help="output file (default: stdout)")
+    generate.add_argument("--store", help="append to this puzzle store instead of writing lines")
+    generate.add_argument("--target", action="append", type=_target,
+                          help="difficulty[:clues]:count, e.g. hard:500 or medium:24-26:500 (repeatable); "
+                               "replaces --difficulty and --count")
+    generate.add_argument("--workers", type=int, default=1,
+                          help="generator processes (0 for all cores); with --target or more than one "
+                               "worker, puzzles are graded and the run is reported")
+    generate.set_defaults(run=cmd_generate)
+
+    sample = commands.add_parser("sample", help="draw random puzzles from a puzzle store")
+    sample.add_argument("store", help="puzzle store file")
+    sample.add_argument("--count", type=int, default=1)
+    sample.add_argument("--difficulty", default=None, choices=("easy", "medium", "hard"))
+    sample.add_argument("--seed", type=int, default=None)
+    sample.add_argument("--with-solutions", action="store_true", help="write puzzle,solution lines")
+    sample.add_argument("-o", "--output", help="output file (default: stdout)")
+    sample.set_defaults(run=cmd_sample)
+
+    bench = commands.add_parser("bench", help="time the solver on a puzzle file")
+    bench.add_argument("input", help="puzzle file, - for stdin")
+    bench.add_argument("--backend", default="logic", choices=BACKENDS)
+    bench.add_argument("--repeat", type=int, default=1, help="timed passes over the file")
+    bench.add_argument("--limit", type=int, default=None, help="only use the first LIMIT puzzles")
+    bench.add_argument("--portfolio", action="store_true",
+                       help="race the portfolio strategies on each puzzle instead of one backend")
+    bench.add_argument("--portfolio-stats", default=None,
+                       help="JSON file the portfolio win counts are added to (read first if it exists)")
+    budget_options(bench)
+    bench.set_defaults(run=cmd_bench)
+
+    trace = commands.add_parser("trace", help="record the backtracking search of one puzzle to a trace file "
+                                               "(play it back with sudoku_ui.py --trace)")
+    trace.add_argument("puzzle", type=_puzzle, help="puzzle string, '0' or '.' for empty cells")
+    trace.add_argument("output", help="trace file to write")
+    budget_options(trace)
+    trace.set_defaults(run=cmd_trace)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,22 +3,39 @@ Sudoku Game with GUI using Pygame
 Features: Play Sudoku, timer, solve button, input validation
 """
 
+import argparse
+import os
 import pygame
 import sys
 import time
-import random
+
+from background import BackgroundJob, generate_job, solve_job
+from board import Board
+from conflicts import ConflictTracker
+from geometry import DIGIT_CHARS
+from puzzle_pool import PuzzlePool
+from puzzle_store import PuzzleStore, DEFAULT_STORE_PATH
+from solve_trace import Trace, TracePlayer
+from solver import SudokuSolver
+from stats import SearchStats
+
+# Where 's' saves the trace of the visual solver
+TRACE_DIR = os.path.join(os.path.expanduser("~"), ".sudoku_solver", "traces")
 
 
 class SudokuGame:
 
-    def __init__(self):
+    def __init__(self, box=3):
+        """box is the box size: 3 plays 9x9 puzzles, 4 plays 16x16 and 5 plays 25x25."""
         pygame.init()
 
         # Constants
+        self.BOX = box
+        self.N = box * box  # rows, columns and digits
         self.WIDTH = 630
         self.HEIGHT = 700
-        self.GRID_SIZE = 540
-        self.CELL_SIZE = self.GRID_SIZE // 9
+        self.CELL_SIZE = 540 // self.N
+        self.GRID_SIZE = self.CELL_SIZE * self.N
         self.GRID_OFFSET = 50
 
         # Colors
@@ -29,15 +46,17 @@ class SudokuGame:
         self.RED = (231, 76, 60)
         self.GREEN = (46, 204, 113)
         self.LIGHT_BLUE = (200, 220, 255)
+        self.LIGHT_RED = (255, 210, 205)
 
         # Setup display
         self.screen = pygame.display.set_mode((self.WIDTH, self.HEIGHT))
         pygame.display.set_caption("Sudoku Game")
 
         # Fonts
-        self.num_font = pygame.font.Font(None, 50)
+        self.num_font = pygame.font.Font(None, 50 * self.CELL_SIZE // 60)
         self.small_font = pygame.font.Font(None, 36)
         self.button_font = pygame.font.Font(None, 32)
+        self.stats_font = pygame.font.Font(None, 24)
 
 
 
@@ -47,6 +66,28 @@ class SudokuGame:
         self.difficulty_index = 1  # Start at Medium (index 1)
         self.difficulty = self.difficulties[self.difficulty_index].lower()
 
+        # Fixed layout
+        self.SOLVE_RECT = pygame.Rect(50, 610, 150, 50)
+        self.NEW_RECT = pygame.Rect(220, 610, 150, 50)
+        self.CLEAR_RECT = pygame.Rect(390, 610, 150, 50)
+        self.LEFT_ARROW = pygame.Rect(220, 10, self.ARROW_SIZE, self.ARROW_SIZE)
+        self.RIGHT_ARROW = pygame.Rect(360, 10, self.ARROW_SIZE, self.ARROW_SIZE)
+        self.SELECTOR_AREA = pygame.Rect(215, 0, 175, 40)
+        self.TIMER_AREA = pygame.Rect(395, 0, 235, 40)
+        self.STATS_AREA = pygame.Rect(0, 665, self.WIDTH, 35)
+        self.COMPLETE_RECT = pygame.Rect(200, 575, 200, 35)
+
+        # Rendering: only dirty cells and changed widgets are redrawn each frame
+        self.build_render_cache()
+        self.dirty_cells = set()
+        self.full_redraw = True
+        self.shown_seconds = None
+        self.shown_stats = None
+        self.shown_difficulty = None
+        self.shown_complete = False
+        self.FPS = 60
+        self.MAX_STEPS_PER_FRAME = 5000
+
         # Game state
         #self.difficulty = "medium"  # default
         self.selected = None
@@ -54,411 +95,525 @@ class SudokuGame:
         self.original_board = None
         self.start_time = None
         self.full_solution = None
-        self.solve_stack = []
-        self.generate_puzzle()
-
+        self.solve_stack = []  # cells (flat indexes) filled by the visual solver, most recent last
+        self.solver = None
+        self.solve_events = None  # self.solver.steps() generator of the visual solver, None once it is over
+        self.solve_stats = SearchStats()  # counters of the visual solver
+
+        # The visual solver records its moves into a trace and the board shows
+        # the trace through a player, so it can be played back both ways and
+        # scrubbed without searching again
+        self.trace = None
+        self.player = None
+        self.solve_direction = 1  # 1 plays forward, -1 backward
+
+        # Generation and instant solves run in a background job, polled every frame
+        self.job = None
+        self.job_kind = None  # "generate" or "solve"
+        self.SPINNER = "|/-\\"
+
+        # A short note (a failed job...) shown in the status line for a few seconds
+        self.message = None  # (text, time.time() it goes away)
+        self.MESSAGE_SECONDS = 5
+
+        # Ready-made puzzles, kept filled by a background process, and the puzzle
+        # database filled by `sudoku_cli generate --store` if there is one (9x9 only)
+        self.POOL_WATERMARK = 5
+        self.pool = None
+        self.store = None
+        if self.N == 9:
+            self.pool = PuzzlePool(watermark=self.POOL_WATERMARK)
+            self.pool.start()
+            if os.path.exists(DEFAULT_STORE_PATH):
+                self.store = PuzzleStore(DEFAULT_STORE_PATH, writable=False)
 
         self.visualize_mode = False
         self.auto_solve = False
         self.last_step_time = 0
-        self.step_delay = 0.3  # seconds per step
+        self.step_delay = 0.3  # seconds per step, '+'/'-' change it tenfold
+        self.MIN_STEP_DELAY = 1e-6
+        self.load_puzzle(Board(size=self.N), Board(size=self.N))  # empty grid until the first puzzle is ready
+        self.generate_puzzle()
 
     def generate_puzzle(self):
-        """Generate a completely new random Sudoku puzzle with unique solution."""
-        # Step 1: Generate a full valid board
-        self.board = [[0 for _ in range(9)] for _ in range(9)]
-        self.original_board = [row[:] for row in self.board]
-
-        self.fill_diagonal_boxes()
-        # ← MOVE THIS LINE HERE:
-        self.original_board = [row[:] for row in self.board]  # Save FULL solution
-        self.solve_from(0, 0)  # Fill the rest using backtracking
-        #self.original_board = [row[:] for row in self.board]  # Save solved
-
+        """
+        Take a new puzzle with unique solution from the pool or the puzzle store,
+        or start generating one in the background when neither has one ready
+        for this difficulty. A generation still running is cancelled.
+        """
+        self.cancel_job()
+        entry = self.pool.pop(self.difficulty) if self.pool is not None else None
+        if entry is None and self.store is not None:
+            stored = self.store.sample(self.difficulty)
+            if stored is not None:
+                entry = stored.puzzle, stored.solution
+        if entry is None:
+            self.start_job("generate", generate_job, self.difficulty, self.BOX)
+        else:
+            self.load_puzzle(*entry)
+
+    def show_trace(self, trace):
+        """Load the puzzle of a saved trace and play the trace back."""
+        self.cancel_job()
+        puzzle = Board(bytearray(trace.puzzle))
+        self.load_puzzle(puzzle, None)
+        self.solver = None
+        self.solve_events = None
+        self.start_playback(trace)
+
+    def load_puzzle(self, puzzle, solution):
+        """Show a new puzzle (Board) and start the timer."""
         # save the full solution
-        self.full_solution = [row[:] for row in self.board]
-
-        # Step 2: Remove cells to make puzzle (keep unique solution)
-        if self.difficulty == "easy":
-            self.remove_cells_symmetrically(35)
-        elif self.difficulty == "medium":
-            self.remove_cells_symmetrically(45)
-        elif self.difficulty == "hard":
-            self.remove_cells_symmetrically(55)
+        self.full_solution = solution
 
         #Puzzle with holes
-        self.original_board = [row[:] for row in self.board]
-        self.solve_from(0, 0)
+        self.board = puzzle
+        self.original_board = self.board.copy()
+        self.tracker = ConflictTracker(self.board)
         self.start_time = time.time()
-
-    def fill_diagonal_boxes(self):
-        """Fill the three diagonal 3x3 boxes with random valid numbers."""
-        for box in range(0, 9, 3):
-            nums = list(range(1, 10))
-            random.shuffle(nums)
-            idx = 0
-            for i in range(3):
-                for j in range(3):
-                    self.board[box + i][box + j] = nums[idx]
-                    idx += 1
-
-    def solve_from(self, row, col):
-        """Recursive backtracking to fill non-diagonal cells."""
-        if col == 9:
-            row += 1
-            col = 0
-        if row == 9:
-            return True
-
-        # Skip diagonal 3x3 boxes if already filled
-        box_row, box_col = 3 * (row // 3), 3 * (col // 3)
-        if box_row == box_col and self.board[row][col] != 0:
-            return self.solve_from(row, col + 1)
-
-        # Try numbers 1-9
-        nums = list(range(1, 10))
-        random.shuffle(nums)
-        for num in nums:
-            if self.is_valid_move(self.board, row, col, num):
-                self.board[row][col] = num
-                if self.solve_from(row, col + 1):
-                    return True
-                self.board[row][col] = 0
-        return False
+        self.full_redraw = True
+
+    def start_job(self, kind, target, *args):
+        """Run target(*args) in the background; poll_job() picks up the result."""
+        self.job = BackgroundJob(target, *args)
+        self.job_kind = kind
+
+    def cancel_job(self):
+        """Drop the background job, if any (its result is never used)."""
+        if self.job is not None:
+            self.job.cancel()
+        self.job = None
+        self.job_kind = None
+
+    def poll_job(self):
+        """Apply the result of the background job if it has finished (never blocks)."""
+        if self.job is None or not self.job.done():
+            return
+        job, kind = self.job, self.job_kind
+        self.job = None
+        self.job_kind = None
+        try:
+            result = job.result()
+        except Exception as error:
+            # Keep the game going on the board as it is and say what went wrong
+            self.show_message(f"{'Generating' if kind == 'generate' else 'Solving'} failed: {error}")
+            if kind == "solve":
+                self.stop_visual_solve()
+                self.tracker.sync(self.board)
+            self.full_redraw = True
+            return
+
+        if kind == "generate":
+            self.load_puzzle(*result)
+        else:
+            self.finish_instant_solve(result)
+
+    def show_message(self, text):
+        """Show text in the status line for MESSAGE_SECONDS."""
+        self.message = text, time.time() + self.MESSAGE_SECONDS
+
+    def start_visual_solve(self):
+        """Reset the board to the puzzle and start a step-by-step backtracking search on it."""
+        self.board.restore(self.original_board)
+        self.tracker.sync(self.board)
+        self.solve_stats.reset()
+        self.solver = SudokuSolver(self.original_board, "backtracking", self.solve_stats)
+        self.solve_events = self.solver.steps()
+        self.start_playback(Trace(self.original_board))
+
+    def start_playback(self, trace):
+        """Show trace from its first step on the board (which holds its puzzle) and start playing it."""
+        self.trace = trace
+        self.player = TracePlayer(trace, self.board)
+        self.solve_stack = self.player.stack
+        self.solve_direction = 1
+        self.visualize_mode = True
+        self.auto_solve = True
+        self.last_step_time = time.time()
+        self.full_redraw = True
 
     def solve_step(self):
-        """Perform ONE step of backtracking. Return True if solved."""
-        # Initialize stack on first call
-        if not self.solve_stack:
-            empty = self.find_empty_cell(self.board)
-            if empty:
-                self.solve_stack.append(empty)
-            else:
-                return True  # Already solved
-
-        if not self.solve_stack:
-            return True
-
-        row, col = self.solve_stack[-1]
-        start_num = self.board[row][col] + 1 if self.board[row][col] > 0 else 1
-
-        for num in range(start_num, 10):
-            if self.is_valid_move(self.board, row, col, num):
-                self.board[row][col] = num
-                next_empty = self.find_empty_cell(self.board)
-                if next_empty:
-                    self.solve_stack.append(next_empty)
-                else:
-                    return True  # Solved
-                return False  # Step done
-
-        # Backtrack
-        self.board[row][col] = 0
-        self.solve_stack.pop()
+        """
+        Play ONE step of the trace in solve_direction; going forward past its
+        end runs the search one more move and records it. Return True when
+        playback has to stop: the search is over, or back at the start.
+        """
+        # Solver moves never clash, so the player writes the board directly and
+        # the conflict tracker is only brought up to date when playback stops
+        if self.solve_direction > 0:
+            if self.player.at_end():
+                event = next(self.solve_events, None) if self.solve_events is not None else None
+                if event is None:
+                    self.end_visual_solve()
+                    return True
+                self.trace.append(*event)
+            cell = self.player.forward()
+        else:
+            cell = self.player.backward()
+            if cell is None:
+                self.pause_visual_solve()
+                return True
+        self.dirty_cells.add(cell)
         return False
 
-    def count_solutions(self, board):
-        """Count number of solutions (for uniqueness check)."""
-        empty = self.find_empty_cell(board)
-        if not empty:
-            return 1
-        row, col = empty
-        count = 0
-        for num in range(1, 10):
-            if self.is_valid_move(board, row, col, num):
-            # self.is_valid_in_board(board, row, col, num):
-                board[row][col] = num
-                count += self.count_solutions(board)
-                board[row][col] = 0
-                if count > 1:
-                    return count  # Early exit if more than 1
-        return count
-
-    def find_empty_cell(self, board):
-        """Return (row, col) of first empty cell in board, or None."""
-        for i in range(9):
-            for j in range(9):
-                if board[i][j] == 0:
-                    return i, j
-        return None
-
-    def remove_cells_symmetrically(self, cells_to_remove):
-        """Remove cells in pairs (symmetric) to keep puzzle nice, ensure unique solution."""
-        positions = [(i, j) for i in range(9) for j in range(9)]
-        random.shuffle(positions)
-
-        removed = 0
-        while removed < cells_to_remove and positions:
-            row, col = positions.pop()
-            if self.board[row][col] == 0:
-                continue
-
-            # Symmetric pair
-            sym_row, sym_col = 8 - row, 8 - col
-
-            # Backup values
-            backup = self.board[row][col]
-            backup_sym = self.board[sym_row][sym_col] if (row != sym_row or col != sym_col) else None
-
-            # Try removing
-            self.board[row][col] = 0
-            if row != sym_row or col != sym_col:
-                self.board[sym_row][sym_col] = 0
-
-            # Check if still unique
-            test_board = [r[:] for r in self.board]
-            if self.count_solutions(test_board) == 1:
-                removed += 2 if (row != sym_row or col != sym_col) else 1
-            else:
-                # Revert
-                self.board[row][col] = backup
-                if row != sym_row or col != sym_col:
-                    self.board[sym_row][sym_col] = backup_sym
-
-    def is_valid_move(self, board, row, col, num):
-        """Check if num can be placed at board[row][col]. Works on any board."""
-        if num in board[row]: return False
-        if num in [board[i][col] for i in range(9)]: return False
-        br, bc = 3 * (row // 3), 3 * (col // 3)
-        for i in range(3):
-            for j in range(3):
-                if board[br + i][bc + j] == num: return False
-        return True
-
-    def solve(self):
-        """Solve the Sudoku puzzle using backtracking."""
-        empty = self.find_empty_cell(self.board)
-
-        if not empty:
-            return True
-
-        row, col = empty
-
-        for num in range(1, 10):
-            if self.is_valid_move(self.board, row, col, num):
-                self.board[row][col] = num
-
-                if self.solve():
-                    return True
+    def seek_trace(self, step):
+        """Jump the playback to step of the trace recorded so far (paused)."""
+        self.pause_visual_solve()
+        self.dirty_cells.update(self.player.seek(step))
+        self.solve_stack = self.player.stack
+
+    def save_trace(self):
+        """Save the trace recorded so far under TRACE_DIR and return its path."""
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        path = os.path.join(TRACE_DIR, time.strftime("trace-%Y%m%d-%H%M%S.trace"))
+        self.trace.save(path)
+        return path
+
+    def skip_visual_solve(self):
+        """
+        Stop stepping and solve the puzzle in the background instead; the
+        solution is shown when it arrives (see finish_instant_solve).
+        """
+        self.auto_solve = False
+        self.solve_events = None
+        self.trace = self.player = None
+        self.start_job("solve", solve_job, self.original_board)
+
+    def finish_instant_solve(self, solution):
+        """Show the solution Board found in the background (None if there is none)."""
+        if solution is not None:
+            self.board.restore(solution)
+            self.solve_stack = [i for i, num in enumerate(self.original_board.cells) if num == 0]
+        else:
+            self.solve_stack = []
+        self.end_visual_solve()
+        self.visualize_mode = False
 
-                self.board[row][col] = 0
+    def pause_visual_solve(self):
+        """Stop stepping (playback can go on later) and bring the tracker and the screen back in line with the board."""
+        self.auto_solve = False
+        self.tracker.sync(self.board)
+        self.full_redraw = True
+
+    def end_visual_solve(self):
+        """Stop stepping for good: the search is over (its trace can still be played back)."""
+        self.pause_visual_solve()
+        self.solve_events = None
+
+    def stop_visual_solve(self):
+        """Drop the visual solver and its instant solve, if running (New Game, Clear)."""
+        if self.job_kind == "solve":
+            self.cancel_job()
+        self.visualize_mode = False
+        self.auto_solve = False
+        self.solve_events = None
+        self.trace = self.player = None
+        self.solve_stack = []
 
-        return False
+    def set_cell(self, row, col, num):
+        """Write num (0 to clear) into the board and keep the conflict tracker in step."""
+        if self.player is not None:
+            # Editing the board ends the playback
+            self.stop_visual_solve()
+            self.full_redraw = True
+        self.board[row, col] = num
+        self.dirty_cells.add(row * self.N + col)
+        self.dirty_cells.update(self.tracker.set(row * self.N + col, num))
+
+    def select(self, cell):
+        """Move the selection to cell (row, col), redrawing the old and new cells."""
+        for old_new in (self.selected, cell):
+            if old_new is not None:
+                self.dirty_cells.add(old_new[0] * self.N + old_new[1])
+        self.selected = cell
 
     def is_complete(self):
-        """Check if the puzzle is completely and correctly solved."""
-        for i in range(9):
-            for j in range(9):
-                if self.board[i][j] == 0:
-                    return False
-                # Check if current number is valid
-                num = self.board[i][j]
-                self.board[i][j] = 0
-                if not self.is_valid_move(self.board, i, j, num):
-                    self.board[i][j] = num
-                    return False
-                self.board[i][j] = num
-        return True
+        """Check if the puzzle is completely and correctly solved (O(1), read from the tracker)."""
+        return self.tracker.is_complete()
 
     # UI Functions
 
-    def draw_grid(self):
-        """Draw the Sudoku grid."""
-        # Draw cells
-        for i in range(9):
-            for j in range(9):
+    def build_render_cache(self):
+        """Pre-render everything that never changes: digit glyphs, labels and the background."""
+        # One glyph per digit and color, blitted instead of calling font.render per cell
+        self.glyphs = {}
+        for color in (self.BLACK, self.BLUE, self.RED, self.GREEN):
+            for num in range(1, self.N + 1):
+                self.glyphs[num, color] = self.num_font.render(DIGIT_CHARS[num - 1], True, color)
+        self.difficulty_labels = [self.small_font.render(name, True, self.BLACK) for name in self.difficulties]
+        self.complete_label = self.small_font.render("COMPLETED!", True, self.WHITE)
+
+        # Grid lines on their own transparent layer, laid back over a cell after redrawing it
+        self.grid_lines = pygame.Surface((self.WIDTH, self.HEIGHT), pygame.SRCALPHA)
+        self.draw_grid_lines(self.grid_lines)
+
+        # Title, buttons and the empty grid
+        self.background = pygame.Surface((self.WIDTH, self.HEIGHT))
+        self.background.fill(self.WHITE)
+        title_text = self.small_font.render("SUDOKU", True, self.BLACK)
+        self.background.blit(title_text, (50, 5))
+        self.draw_buttons(self.background)
+        self.background.blit(self.grid_lines, (0, 0))
+        self.background = self.background.convert()
+
+    def draw_grid_lines(self, surface):
+        """Draw the cell borders and the thick box lines onto surface."""
+        for i in range(self.N):
+            for j in range(self.N):
                 x = self.GRID_OFFSET + j * self.CELL_SIZE
                 y = self.GRID_OFFSET + i * self.CELL_SIZE
+                pygame.draw.rect(surface, self.BLACK, (x, y, self.CELL_SIZE, self.CELL_SIZE), 1)
 
-                # Highlight selected cell
-                if self.selected == (i, j):
-                    pygame.draw.rect(self.screen, self.LIGHT_BLUE,
-                                     (x, y, self.CELL_SIZE, self.CELL_SIZE))
-
-                # Draw cell border
-                pygame.draw.rect(self.screen, self.BLACK,
-                                 (x, y, self.CELL_SIZE, self.CELL_SIZE), 1)
-
-                # Draw number
-                if self.board[i][j] != 0:
-                    num = self.board[i][j]
-
-                    # Visual solve: highlight current cell being tried
-                    if (self.visualize_mode and self.solve_stack and(i, j) == self.solve_stack[-1] and self.original_board[i][j] == 0):
-                        color = self.RED  # Current trial
-                    elif (self.visualize_mode and self.solve_stack and len(self.solve_stack) > 1 and (i, j) == self.solve_stack[-2]):
-                        color = self.GREEN  # Previous (locked in)
-                    elif self.original_board[i][j] != 0:
-                        color = self.BLACK
-                    else:
-                        color = self.BLUE
-
-
-                    # Different color: BLACK for original, BLUE for user input
-                    #if self.original_board[i][j] != 0:
-                    #    color = self.BLACK  # Original numbers
-                        # else:
-                    #   color = self.BLUE   # User input
-
-                    text = self.num_font.render(str(int(num)), True, color)
-                    text_rect = text.get_rect(center=(x + self.CELL_SIZE//2, y + self.CELL_SIZE//2))
-                    self.screen.blit(text, text_rect)
-
-        # Draw thick lines for 3x3 boxes
-        for i in range(10):
-            thickness = 4 if i % 3 == 0 else 1
+        for i in range(self.N + 1):
+            thickness = 4 if i % self.BOX == 0 else 1
             # Horizontal lines
-            pygame.draw.line(self.screen, self.BLACK,
+            pygame.draw.line(surface, self.BLACK,
                              (self.GRID_OFFSET, self.GRID_OFFSET + i * self.CELL_SIZE),
                              (self.GRID_OFFSET + self.GRID_SIZE, self.GRID_OFFSET + i * self.CELL_SIZE),
                              thickness)
             # Vertical lines
-            pygame.draw.line(self.screen, self.BLACK,
+            pygame.draw.line(surface, self.BLACK,
                              (self.GRID_OFFSET + i * self.CELL_SIZE, self.GRID_OFFSET),
                              (self.GRID_OFFSET + i * self.CELL_SIZE, self.GRID_OFFSET + self.GRID_SIZE),
                              thickness)
 
-    def draw_buttons(self):
-        """Draw control buttons."""
-        # Solve button
-        solve_rect = pygame.Rect(50, 610, 150, 50)
-        pygame.draw.rect(self.screen, self.GREEN, solve_rect)
-        pygame.draw.rect(self.screen, self.BLACK, solve_rect, 2)
-        solve_text = self.button_font.render("Solve", True, self.WHITE)
-        self.screen.blit(solve_text, solve_text.get_rect(center=solve_rect.center))
-
-        # New Game button
-        new_rect = pygame.Rect(220, 610, 150, 50)
-        pygame.draw.rect(self.screen, self.BLUE, new_rect)
-        pygame.draw.rect(self.screen, self.BLACK, new_rect, 2)
-        new_text = self.button_font.render("New Game", True, self.WHITE)
-        self.screen.blit(new_text, new_text.get_rect(center=new_rect.center))
+    def draw_cell(self, i, j):
+        """Redraw one cell (background, highlight, digit, lines) and return its rect."""
+        x = self.GRID_OFFSET + j * self.CELL_SIZE
+        y = self.GRID_OFFSET + i * self.CELL_SIZE
+        rect = pygame.Rect(x, y, self.CELL_SIZE, self.CELL_SIZE)
+        self.screen.blit(self.background, rect, rect)
+
+        # Highlight selected cell, then cells clashing with another one
+        if self.selected == (i, j):
+            self.screen.fill(self.LIGHT_BLUE, rect)
+        elif i * self.N + j in self.tracker.conflicts:
+            self.screen.fill(self.LIGHT_RED, rect)
+
+        num = self.board[i, j]
+        if num != 0:
+            # Visual solve: highlight current cell being tried
+            cell = i * self.N + j
+            if (self.visualize_mode and self.solve_stack and cell == self.solve_stack[-1] and self.original_board[i, j] == 0):
+                color = self.RED  # Current trial
+            elif (self.visualize_mode and len(self.solve_stack) > 1 and cell == self.solve_stack[-2]):
+                color = self.GREEN  # Previous (locked in)
+            elif self.original_board[i, j] != 0:
+                color = self.BLACK  # Original numbers
+            else:
+                color = self.BLUE  # User input
 
-        # Clear button
-        clear_rect = pygame.Rect(390, 610, 150, 50)
-        pygame.draw.rect(self.screen, self.RED, clear_rect)
-        pygame.draw.rect(self.screen, self.BLACK, clear_rect, 2)
-        clear_text = self.button_font.render("Clear", True, self.WHITE)
-        self.screen.blit(clear_text, clear_text.get_rect(center=clear_rect.center))
+            glyph = self.glyphs[num, color]
+            self.screen.blit(glyph, glyph.get_rect(center=rect.center))
 
+        self.screen.blit(self.grid_lines, rect, rect)
+        return rect
 
-        return solve_rect, new_rect, clear_rect
+    def draw_grid(self):
+        """Draw the whole Sudoku grid."""
+        for i in range(self.N):
+            for j in range(self.N):
+                self.draw_cell(i, j)
+
+    def draw_buttons(self, surface):
+        """Draw control buttons onto surface."""
+        for rect, color, label in ((self.SOLVE_RECT, self.GREEN, "Solve"),
+                                   (self.NEW_RECT, self.BLUE, "New Game"),
+                                   (self.CLEAR_RECT, self.RED, "Clear")):
+            pygame.draw.rect(surface, color, rect)
+            pygame.draw.rect(surface, self.BLACK, rect, 2)
+            text = self.button_font.render(label, True, self.WHITE)
+            surface.blit(text, text.get_rect(center=rect.center))
+
+        return self.SOLVE_RECT, self.NEW_RECT, self.CLEAR_RECT
+
+    def elapsed_seconds(self):
+        return int(time.time() - self.start_time)
 
     def draw_timer(self):
-        """Draw the elapsed time."""
-        elapsed = int(time.time() - self.start_time)
+        """Draw the elapsed time and return the area that changed."""
+        elapsed = self.elapsed_seconds()
         minutes = elapsed // 60
         seconds = elapsed % 60
+        self.screen.blit(self.background, self.TIMER_AREA, self.TIMER_AREA)
         timer_text = self.small_font.render(f"Time: {minutes:02d}:{seconds:02d}",
                                             True, self.BLACK)
         self.screen.blit(timer_text, (400, 5))
-
-    def draw_title2(self):
-        """Draw the game title."""
-        title_text = self.small_font.render("SUDOKU", True, self.BLACK)
-        self.screen.blit(title_text, (50, 5))
+        self.shown_seconds = elapsed
+        return self.TIMER_AREA
+
+    def solve_stats_text(self):
+        """Text of the background job spinner, a message or the visual solver counters, None when there is none."""
+        if self.job is not None:
+            label = "Generating puzzle" if self.job_kind == "generate" else "Solving"
+            return f"{label}...  {self.SPINNER[int(time.time() * 8) % 4]}"
+        if self.message is not None:
+            text, until = self.message
+            if time.time() < until:
+                return text
+            self.message = None
+        if not self.visualize_mode:
+            return None
+        stats = self.solve_stats
+        if self.solver is not None:
+            text = (f"Nodes: {stats.nodes}   Backtracks: {stats.backtracks}   "
+                    f"Depth: {len(self.solve_stack)}/{stats.max_depth}   Speed: {1 / self.step_delay:.0f}/s")
+        else:
+            # A trace loaded from disk: no search counters
+            text = f"Depth: {len(self.solve_stack)}   Speed: {1 / self.step_delay:.0f}/s"
+        if self.player is not None:
+            text += f"   Step: {self.player.position}/{len(self.trace)}{' (rev)' if self.solve_direction < 0 else ''}"
+        return text
+
+    def draw_solve_stats(self):
+        """Draw the visual solver counters under the buttons and return the area that changed."""
+        text = self.solve_stats_text()
+        self.screen.blit(self.background, self.STATS_AREA, self.STATS_AREA)
+        if text is not None:
+            self.screen.blit(self.stats_font.render(text, True, self.BLACK), (50, 672))
+        self.shown_stats = text
+        return self.STATS_AREA
 
     def draw_title(self):
-        """Draw the game title with difficulty selector."""
-        title_text = self.small_font.render("SUDOKU", True, self.BLACK)
-        self.screen.blit(title_text, (50, 5))
-
-        # Difficulty selector (right of title)
-        diff_x = 220
-        diff_y = 10
+        """Draw the difficulty selector (the title itself is part of the background)."""
+        diff_x, diff_y = self.LEFT_ARROW.topleft
+        self.screen.blit(self.background, self.SELECTOR_AREA, self.SELECTOR_AREA)
 
         # Left arrow
-        left_arrow = pygame.Rect(diff_x, diff_y, self.ARROW_SIZE, self.ARROW_SIZE)
         pygame.draw.polygon(self.screen, self.GRAY if self.difficulty_index == 0 else self.BLUE,
                             [(diff_x + self.ARROW_SIZE, diff_y),
                              (diff_x, diff_y + self.ARROW_SIZE // 2),
                              (diff_x + self.ARROW_SIZE, diff_y + self.ARROW_SIZE)])
 
         # Difficulty text
-        diff_text = self.small_font.render(self.difficulties[self.difficulty_index], True, self.BLACK)
-        diff_rect = diff_text.get_rect(center=(diff_x + 80, diff_y + self.ARROW_SIZE // 2))
-        self.screen.blit(diff_text, diff_rect)
+        diff_text = self.difficulty_labels[self.difficulty_index]
+        self.screen.blit(diff_text, diff_text.get_rect(center=(diff_x + 80, diff_y + self.ARROW_SIZE // 2)))
 
         # Right arrow
-        right_arrow = pygame.Rect(diff_x + 140, diff_y, self.ARROW_SIZE, self.ARROW_SIZE)
         pygame.draw.polygon(self.screen, self.GRAY if self.difficulty_index == 2 else self.BLUE,
                             [(diff_x + 140, diff_y),
                              (diff_x + 140 + self.ARROW_SIZE, diff_y + self.ARROW_SIZE // 2),
                              (diff_x + 140, diff_y + self.ARROW_SIZE)])
 
-        return left_arrow, right_arrow
+        self.shown_difficulty = self.difficulty_index
+        return self.SELECTOR_AREA
+
+    def draw_complete(self):
+        """Draw the COMPLETED banner and return its rect."""
+        pygame.draw.rect(self.screen, self.GREEN, self.COMPLETE_RECT, border_radius=8)
+        self.screen.blit(self.complete_label, self.complete_label.get_rect(center=self.COMPLETE_RECT.center))
+        return self.COMPLETE_RECT
+
+    def render(self):
+        """Redraw only what changed since the last frame and push just those areas to the display."""
+        if self.full_redraw:
+            self.screen.blit(self.background, (0, 0))
+            self.draw_grid()
+            self.draw_title()
+            self.draw_timer()
+            self.draw_solve_stats()
+            rects = [self.screen.get_rect()]
+            self.full_redraw = False
+        else:
+            rects = [self.draw_cell(*divmod(i, self.N)) for i in self.dirty_cells]
+            if self.shown_difficulty != self.difficulty_index:
+                rects.append(self.draw_title())
+            if self.shown_seconds != self.elapsed_seconds():
+                rects.append(self.draw_timer())
+            if self.shown_stats != self.solve_stats_text():
+                rects.append(self.draw_solve_stats())
+        self.dirty_cells.clear()
+
+        # The banner sits over the bottom row: put it back when cells under it were redrawn
+        complete = self.is_complete()
+        if complete and (not self.shown_complete or self.COMPLETE_RECT.collidelist(rects) >= 0):
+            rects.append(self.draw_complete())
+        elif not complete and self.shown_complete:
+            self.screen.blit(self.background, self.COMPLETE_RECT, self.COMPLETE_RECT)
+            rects.extend(self.draw_cell(self.N - 1, j) for j in range(self.N))
+            rects.append(self.COMPLETE_RECT)
+        self.shown_complete = complete
+
+        if rects:
+            pygame.display.update(rects)
 
     def handle_click(self, pos, solve_rect, new_rect, clear_rect, left_arrow, right_arrow):
         x, y = pos
 
         # Grid click
-        if (self.GRID_OFFSET <= x <= self.GRID_OFFSET + self.GRID_SIZE and
-                self.GRID_OFFSET <= y <= self.GRID_OFFSET + self.GRID_SIZE):
+        if (self.GRID_OFFSET <= x < self.GRID_OFFSET + self.GRID_SIZE and
+                self.GRID_OFFSET <= y < self.GRID_OFFSET + self.GRID_SIZE):
             col = (x - self.GRID_OFFSET) // self.CELL_SIZE
             row = (y - self.GRID_OFFSET) // self.CELL_SIZE
-            self.selected = (row, col)
+            self.select((row, col))
 
         # === BUTTONS: Check in this order ===
         elif solve_rect.collidepoint(pos):
 
-            if not self.visualize_mode:
-                # Reset to puzzle
-                self.board = [row[:] for row in self.original_board]
-                # Reset solver state
-                self.solve_stack = []
-                self.visualize_mode = True
-                self.auto_solve = True
-                self.last_step_time = time.time()
+            if self.job is not None:
+                pass  # busy generating or solving
+
+            elif not self.visualize_mode:
+                self.start_visual_solve()
 
             else:
                 # Instant solve if already visualizing
-                self.board = [row[:] for row in self.original_board]
-                self.solve()
-                self.visualize_mode = False
-                self.auto_solve = False
-
-
-            #self.board = [row[:] for row in self.original_board]
-            #self.solve()
+                self.skip_visual_solve()
 
         elif new_rect.collidepoint(pos):
+            self.stop_visual_solve()
             self.generate_puzzle()  # This now uses self.difficulty
 
         elif clear_rect.collidepoint(pos):
-            for i in range(9):
-                for j in range(9):
-                    if self.original_board[i][j] == 0:
-                        self.board[i][j] = 0
+            # Only user digits differ from the puzzle, so this clears them all
+            self.stop_visual_solve()
+            self.board.restore(self.original_board)
+            self.tracker.sync(self.board)
+            self.full_redraw = True
 
         # Arrow clicks for difficulty
         elif left_arrow.collidepoint(pos) and self.difficulty_index > 0:
-            self.difficulty_index -= 1
-            self.difficulty = self.difficulties[self.difficulty_index].lower()
+            self.set_difficulty(self.difficulty_index - 1)
         elif right_arrow.collidepoint(pos) and self.difficulty_index < 2:
-            self.difficulty_index += 1
-            self.difficulty = self.difficulties[self.difficulty_index].lower()
+            self.set_difficulty(self.difficulty_index + 1)
+
+    def set_difficulty(self, index):
+        """Change the difficulty; a puzzle being generated is swapped for one of the new difficulty."""
+        self.difficulty_index = index
+        self.difficulty = self.difficulties[index].lower()
+        if self.job_kind == "generate":
+            self.generate_puzzle()
 
     def handle_key(self, key):
         """Handle keyboard input."""
+        arrows = (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT)
+        if self.job is not None and key not in arrows:
+            return  # the board is about to be replaced
+
+        if self.player is not None and self.handle_playback_key(key):
+            return
+        if self.auto_solve and key not in arrows:
+            return  # no editing while the solver owns the board
+
         if self.selected:
             row, col = self.selected
 
             # Handle arrow keys (always available)
             if key == pygame.K_UP and row > 0:
-                self.selected = (row - 1, col)
-            elif key == pygame.K_DOWN and row < 8:
-                self.selected = (row + 1, col)
+                self.select((row - 1, col))
+            elif key == pygame.K_DOWN and row < self.N - 1:
+                self.select((row + 1, col))
             elif key == pygame.K_LEFT and col > 0:
-                self.selected = (row, col - 1)
-            elif key == pygame.K_RIGHT and col < 8:
-                self.selected = (row, col + 1)
+                self.select((row, col - 1))
+            elif key == pygame.K_RIGHT and col < self.N - 1:
+                self.select((row, col + 1))
 
             # Only allow number input in cells that were originally empty
-            elif self.original_board[row][col] == 0:
+            elif self.original_board[row, col] == 0:
                 # Handle number keys from main keyboard
                 if pygame.K_1 <= key <= pygame.K_9:
                     num = key - pygame.K_0
-                    self.board[row][col] = num
+                    self.set_cell(row, col, num)
                 # Handle numpad keys separately with correct mapping
                 elif pygame.K_KP1 <= key <= pygame.K_KP9:
                     # Map numpad keys correctly
@@ -468,56 +623,138 @@ class SudokuGame:
                         pygame.K_KP6: 6, pygame.K_KP7: 7, pygame.K_KP8: 8,
                         pygame.K_KP9: 9
                     }
-                    self.board[row][col] = numpad_map[key]
+                    self.set_cell(row, col, numpad_map[key])
+                # Letters a, b, ... are the digits above 9 on bigger boards
+                elif pygame.K_a <= key < pygame.K_a + self.N - 9:
+                    self.set_cell(row, col, 10 + key - pygame.K_a)
                 elif key in (pygame.K_DELETE, pygame.K_BACKSPACE, pygame.K_0, pygame.K_KP0):
-                    self.board[row][col] = 0
+                    self.set_cell(row, col, 0)
+
+    def handle_playback_key(self, key):
+        """
+        Keys of the visual solver and its trace; return True if key was one.
+        '+'/'-' speed playback up or slow it down, Enter skips to the solution,
+        Space pauses and resumes, 'r' reverses the direction, ','/'.' step
+        back/forward once, Home/End jump to the start/end of what is recorded
+        and 's' saves the trace.
+        """
+        if key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+            self.step_delay = max(self.step_delay / 10, self.MIN_STEP_DELAY)
+        elif key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            self.step_delay = min(self.step_delay * 10, 1.0)
+        elif key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+            self.skip_visual_solve()
+        elif key == pygame.K_SPACE:
+            if self.auto_solve:
+                self.pause_visual_solve()
+            else:
+                self.auto_solve = True
+                self.last_step_time = time.time()
+        elif key == pygame.K_r:
+            self.solve_direction = -self.solve_direction
+        elif key in (pygame.K_COMMA, pygame.K_PERIOD):
+            self.pause_visual_solve()
+            direction = self.solve_direction
+            self.solve_direction = 1 if key == pygame.K_PERIOD else -1
+            self.solve_step()
+            self.solve_direction = direction
+        elif key == pygame.K_HOME:
+            self.seek_trace(0)
+        elif key == pygame.K_END:
+            self.seek_trace(len(self.trace))
+        elif key == pygame.K_s:
+            try:
+                path = self.save_trace()
+            except OSError as error:
+                self.show_message(f"Saving the trace failed: {error}")
+            else:
+                home = os.path.expanduser("~")
+                if path.startswith(home + os.sep):
+                    path = "~" + path[len(home):]  # keeps it on one status line
+                self.show_message(f"Trace saved to {path}")
+        else:
+            return False
+        return True
 
     def run(self):
-        """Main game loop."""
+        """
+        Main game loop. Frames are only drawn when something changed: while idle
+        the loop sleeps until the next input event or timer tick, and while the
+        visual solver runs it is capped at FPS and takes as many steps per frame
+        as step_delay asks for. A background job keeps the loop at FPS too, so
+        its spinner turns and its result is picked up on the next frame.
+        """
         clock = pygame.time.Clock()
         running = True
 
         while running:
-            self.screen.fill(self.WHITE)
-
-            # Draw game elements
-            left_arrow, right_arrow = self.draw_title()
-            self.draw_timer()
-            self.draw_grid()
-            solve_rect, new_rect, clear_rect = self.draw_buttons()
-
-            # Check if puzzle is complete
-            if self.is_complete():
-                complete_bg = pygame.Rect(200, 575, 200, 35)
-                pygame.draw.rect(self.screen, self.GREEN, complete_bg, border_radius=8)
-                complete_text = self.small_font.render("COMPLETED!", True, self.WHITE)
-                self.screen.blit(complete_text, complete_text.get_rect(center=complete_bg.center))
-
+            animating = (self.auto_solve and self.visualize_mode) or self.job is not None
+            if animating:
+                events = pygame.event.get()
+            else:
+                # Wake up for the next input event or when the timer display changes
+                wait_ms = 1000 - int((time.time() - self.start_time) * 1000) % 1000
+                events = [pygame.event.wait(wait_ms)] + pygame.event.get()
 
             # Event handling
-            for event in pygame.event.get():
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
                 elif event.type == pygame.MOUSEBUTTONDOWN:
-                    self.handle_click(event.pos, solve_rect, new_rect, clear_rect, left_arrow, right_arrow)
+                    self.handle_click(event.pos, self.SOLVE_RECT, self.NEW_RECT, self.CLEAR_RECT,
+                                      self.LEFT_ARROW, self.RIGHT_ARROW)
                 elif event.type == pygame.KEYDOWN:
                     self.handle_key(event.key)
 
-            pygame.display.flip()
-            clock.tick(60)
+            self.poll_job()
 
             # Auto-step visual solver
             if self.auto_solve and self.visualize_mode:
-                now = time.time()
-                if now - self.last_step_time >= self.step_delay:
-                    if self.solve_step():
-                        self.auto_solve = False  # Done
-                    self.last_step_time = now
+                self.run_solve_steps()
+
+            self.render()
+            if animating:
+                clock.tick(self.FPS)
 
+        self.cancel_job()
+        if self.pool is not None:
+            self.pool.close()
+        if self.store is not None:
+            self.store.close()
         pygame.quit()
         sys.exit()
 
+    def run_solve_steps(self):
+        """Take every visual solver step due since the last frame (at most MAX_STEPS_PER_FRAME)."""
+        before = self.solve_stack[-2:]
+        now = time.time()
+        steps = 0
+        while now - self.last_step_time >= self.step_delay and steps < self.MAX_STEPS_PER_FRAME:
+            steps += 1
+            self.last_step_time += self.step_delay
+            if self.solve_step():
+                self.auto_solve = False  # Done
+                break
+        if steps == self.MAX_STEPS_PER_FRAME:
+            self.last_step_time = now  # Too far behind, drop the backlog
+
+        # The red/green highlight follows the top of the stack
+        self.dirty_cells.update(before + self.solve_stack[-2:])
+
 
 if __name__ == "__main__":
-    game = SudokuGame()
+    parser = argparse.ArgumentParser(description="Play Sudoku")
+    parser.add_argument("--box", type=int, choices=(3, 4, 5), default=3,
+                        help="box size: 3 for 9x9 (default), 4 for 16x16, 5 for 25x25")
+    parser.add_argument("--trace", help="play back a solver trace saved with 's' or by sudoku_cli trace")
+    args = parser.parse_args()
+    if args.trace:
+        try:
+            trace = Trace.load(args.trace)
+        except (OSError, ValueError) as error:
+            parser.error(str(error))
+        game = SudokuGame(Board(bytearray(trace.puzzle)).box_size)
+        game.show_trace(trace)
+    else:
+        game = SudokuGame(args.box)
     game.run()
@@ -0,0 +1,150 @@
+"""
+Sudoku Symmetry
+Transforms that map a valid puzzle onto another valid puzzle: digit
+relabeling, row swaps within a band, column swaps within a stack, band and
+stack swaps, and transposition. Used to find a canonical representative of a
+puzzle, so equivalent puzzles can share one cached solution.
+"""
+
+from itertools import islice, permutations, product
+
+from board import Board
+
+# Orderings tried per orientation when canonicalizing; puzzles with many
+# indistinguishable rows/columns may get a different representative than an
+# equivalent puzzle, which only costs a cache miss
+CANDIDATE_CAP = 32
+
+_IDENTITY = tuple(range(81))
+_TRANSPOSE = tuple((i % 9) * 9 + i // 9 for i in range(81))
+_PERMS3 = tuple(permutations(range(3)))
+_FILLED = bytes([0] + [1] * 255)
+
+
+class Transform:
+
+    __slots__ = ("cells", "digits")
+
+    def __init__(self, cells=_IDENTITY, digits=tuple(range(10))):
+        """
+        cells[i] is the cell of the input that lands in cell i of the output,
+        digits[d] the digit d becomes (digits[0] is always 0).
+        """
+        self.cells = tuple(cells)
+        self.digits = tuple(digits)
+
+    @classmethod
+    def from_moves(cls, rows=range(9), cols=range(9), transpose=False, digits=tuple(range(10))):
+        """
+        Build a transform from its moves: the grid is transposed first (if asked),
+        then output row r is row rows[r] and output column c is column cols[c].
+        rows must keep rows in bands and cols columns in stacks for the result to
+        be a valid puzzle.
+        """
+        source = _TRANSPOSE if transpose else _IDENTITY
+        return cls([source[rows[r] * 9 + cols[c]] for r in range(9) for c in range(9)], digits)
+
+    def apply(self, board):
+        """Return the transformed copy of a Board."""
+        cells = board.cells
+        return Board(bytearray(bytes(cells[i] for i in self.cells).translate(bytes(self.digits) + bytes(246))))
+
+    def inverse(self):
+        """Return the transform that undoes this one."""
+        cells = [0] * 81
+        for i, src in enumerate(self.cells):
+            cells[src] = i
+        digits = [0] * 10
+        for d, new in enumerate(self.digits):
+            digits[new] = d
+        return Transform(cells, digits)
+
+    def then(self, other):
+        """Return the transform applying this one, then other."""
+        return Transform([self.cells[i] for i in other.cells], [other.digits[d] for d in self.digits])
+
+    def __eq__(self, other):
+        if not isinstance(other, Transform):
+            return NotImplemented
+        return self.cells == other.cells and self.digits == other.digits
+
+    def __repr__(self):
+        return f"Transform(cells={list(self.cells)}, digits={list(self.digits)})"
+
+
+def random_transform(rng):
+    """Return a uniformly random transform of the symmetry group, drawn from rng (random.Random)."""
+    def lines():
+        bands = rng.sample(range(3), 3)
+        return [3 * band + k for band in bands for k in rng.sample(range(3), 3)]
+
+    digits = [0] + rng.sample(range(1, 10), 9)
+    return Transform.from_moves(lines(), lines(), rng.random() < 0.5, digits)
+
+
+def _orderings(keys):
+    """
+    Yield the orders of the 9 lines (rows or columns) that sort bands, and lines
+    inside each band, by key. Lines or bands with equal keys give one order per
+    arrangement.
+    """
+    def sorted_orders(first, key):
+        return [(first + a, first + b, first + c) for a, b, c in _PERMS3
+                if key[first + a] <= key[first + b] <= key[first + c]]
+
+    line_orders = [sorted_orders(3 * b, keys) for b in range(3)]
+    band_key = [sorted(keys[3 * b:3 * b + 3]) for b in range(3)]
+    for bands in sorted_orders(0, band_key):
+        for inside in product(*(line_orders[b] for b in bands)):
+            yield tuple(line for group in inside for line in group)
+
+
+def canonical_form(board, cap=CANDIDATE_CAP):
+    """
+    Return (canonical Board, Transform taking board to it).
+
+    Bands, stacks, rows and columns are ordered by clue-count signatures that
+    digit relabeling and the other moves don't change, both orientations are
+    tried, and digits are renumbered by first appearance. When several
+    orderings tie, up to cap of them per orientation are compared and the
+    lexicographically smallest result wins. Equivalent puzzles nearly always
+    get the same representative; when they don't it only costs a cache miss,
+    since the result is a genuine transform of the input either way.
+    """
+    original = bytes(board.cells)
+
+    # Cheap pass first: compare only which cells are filled
+    candidates = []
+    for transpose in (False, True):
+        grid = bytes(original[i] for i in _TRANSPOSE) if transpose else original
+        row_count = [9 - grid[r * 9:r * 9 + 9].count(0) for r in range(9)]
+        col_count = [9 - grid[c::9].count(0) for c in range(9)]
+        row_key = [(row_count[r], sorted(col_count[c] for c in range(9) if grid[r * 9 + c])) for r in range(9)]
+        col_key = [(col_count[c], sorted(row_count[r] for r in range(9) if grid[r * 9 + c])) for c in range(9)]
+
+        columns = [grid[c::9] for c in range(9)]
+        col_permuted = {}  # column order -> the 9 rows with their columns in that order
+        for rows, cols in islice(product(list(_orderings(row_key)), list(_orderings(col_key))), cap):
+            lines = col_permuted.get(cols)
+            if lines is None:
+                by_column = b"".join([columns[c] for c in cols])
+                lines = col_permuted[cols] = [by_column[r::9] for r in range(9)]
+            candidate = b"".join([lines[r] for r in rows])
+            candidates.append((candidate.translate(_FILLED), candidate, (rows, cols, transpose)))
+
+    # Then renumber digits by first appearance (digits that don't appear come
+    # last) on the candidates with the smallest pattern only
+    smallest = min(pattern for pattern, _, _ in candidates)
+    best = best_moves = None
+    for pattern, candidate, moves in candidates:
+        if pattern != smallest:
+            continue
+        table = bytearray(256)
+        for label, (_, num) in enumerate(sorted((candidate.find(d) % 100, d) for d in range(1, 10)), 1):
+            table[num] = label
+        candidate = candidate.translate(table)
+        if best is None or candidate < best:
+            best, best_moves = candidate, moves + (table[:10],)
+
+    rows, cols, transpose, digits = best_moves
+    return Board(bytearray(best)), Transform.from_moves(rows, cols, transpose, digits)